@@ -6,11 +6,10 @@ import asyncio
 from dotenv import load_dotenv, find_dotenv
 from google.adk import Runner
 from google.adk.agents import BaseAgent
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 from ai_fashion_house.agents.fashion_design_agent.agent import root_agent
+from ai_fashion_house.utils.adk_services import create_artifact_service, create_session_service
 
 load_dotenv(find_dotenv())
 
@@ -30,8 +29,8 @@ async def call_agent_async(agent: BaseAgent, prompt: str) -> None:
     USER_ID = os.getenv("USER_ID", str(uuid.uuid4()))
     SESSION_ID = os.getenv("SESSION_ID", str(uuid.uuid4()))
 
-    session_service = InMemorySessionService()
-    artifact_service = InMemoryArtifactService()
+    session_service = create_session_service()
+    artifact_service = create_artifact_service()
 
     runner = Runner(
         agent=agent,
@@ -7,6 +7,7 @@ from ai_fashion_house.agents.fashion_design_agent.prompts import get_instruction
 from ai_fashion_house.agents.fashion_design_agent.tools import get_fashion_model_details
 from ai_fashion_house.agents.met_rag_agent.agent import root_agent as met_rag_agent
 from ai_fashion_house.agents.search_agent.agent import root_agent as search_agent
+from ai_fashion_house.utils.adk_utils import DeadlineAgent
 from google.adk.models.llm_request import LlmRequest
 from google.genai import types
 
@@ -35,7 +36,14 @@ research_agent = ParallelAgent(
     description="Coordinates the execution of the met_rag_agent and search agent agents to gather fashion inspiration and insights.",
     sub_agents=[
         met_rag_agent,
-        search_agent,
+        # The web search can be skipped when it would not finish before the design's deadline
+        DeadlineAgent(
+            name="web_search_step",
+            description="Runs the search agent within the web search stage's time budget.",
+            stage="web_search",
+            output_key=search_agent.output_key,
+            sub_agents=[search_agent],
+        ),
     ]
 )
 prompt_writer_agent = Agent(
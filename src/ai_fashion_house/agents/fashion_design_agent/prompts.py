@@ -1,5 +1,22 @@
-def get_instructions() -> str:
-    return """You are **PromptWriterAgent**, a fashion-savvy orchestration assistant tasked with transforming visual references and historical context into a vivid, couture-level prompt for an AI image generation model.
+import typing
+
+
+def get_instructions(model_details: typing.Optional[str] = None) -> str:
+    """
+    Returns the instructions of the prompt writer agent.
+
+    Args:
+        model_details (Optional[str]): The model's physical description. When given, it is written into the
+            instructions instead of being retrieved with the `get_model_details` tool, saving a tool call turn.
+
+    Returns:
+        str: Instructions for the prompt writer agent.
+    """
+    if model_details:
+        model_details_step = f"2. Use the model’s physical attributes to inform the model’s appearance in the scene: {model_details}"
+    else:
+        model_details_step = "2. Retrieve the model’s physical attributes by calling the `get_model_details` tool. Use this to inform the model’s appearance in the scene."
+    return f"""You are **PromptWriterAgent**, a fashion-savvy orchestration assistant tasked with transforming visual references and historical context into a vivid, couture-level prompt for an AI image generation model.
 
     Your objective is to seamlessly **blend modern and historical fashion aesthetics** into a richly detailed, visually evocative description—based solely on the input materials provided.
 
@@ -15,7 +32,7 @@ def get_instructions() -> str:
        - Fabric and texture details  
        - Color palette and ornamentation  
        - Historical influence, mood, and era  
-    2. Retrieve the model’s physical attributes by calling the `get_model_details` tool. Use this to inform the model’s appearance in the scene.
+    {model_details_step}
     3. Compose a single, cohesive fashion prompt that fuses modern and historical aesthetics with emotional and visual richness.
 
     🚶‍♀️ Model Movement:
@@ -30,7 +47,7 @@ def get_instructions() -> str:
     MAKE SURE that there is only one fashion model in the image.
     
     Enhanced Prompt: [A vivid fashion description combining modern and historical visual elements.]  
-    Model Details: [The model’s physical appearance as described by `get_model_details`.]  x
+    Model Details: [The model’s physical appearance as described above.]  x
     Model Animation and Motion: [A detailed description of the model’s movement, captured mid-stride with runway elegance.]
 
     ❌ Do not include JSON, lists, URLs, tool outputs, or explanatory text.
@@ -8,30 +8,65 @@ from typing import Optional
 
 from dotenv import load_dotenv, find_dotenv
 from google.adk.tools import ToolContext
-from google.cloud import storage
 from google.genai import types
 from PIL import Image
+from pydantic import BaseModel
+
+from ai_fashion_house.agents.marketing_agent.prompts import get_image_selection_prompt
+from ai_fashion_house.utils.admission import admission_slot
+from ai_fashion_house.utils.client_registry import generate_content, get_genai_client
+from ai_fashion_house.utils.deadlines import stage_deadline
 from ai_fashion_house.utils.gcp_utils import (
-    get_authenticated_genai_client,
-    parse_gcs_uri, download_media_file_from_gcs
+    parse_gcs_uri, download_media_file_from_gcs, async_download_media_file_from_gcs
 )
+from ai_fashion_house.utils.image_utils import score_image_candidate
+from ai_fashion_house.utils.media_cache import CachedMedia, MediaCache, build_media_cache_key, get_media_cache
+from ai_fashion_house.utils.metrics import timed
+from ai_fashion_house.utils.single_flight import coalesce
 
 logger = logging.getLogger(__name__)
 
 load_dotenv(find_dotenv())
 
 
-genai_client = get_authenticated_genai_client()
-gcs_client = storage.Client()
+# Imagen returns at most this many images per request; larger candidate counts fan out across requests
+IMAGEN_MAX_IMAGES_PER_REQUEST = 4
+
+
+class ImageSelection(BaseModel):
+    """
+    Gemini's choice among generated image candidates.
+    """
+    best_candidate: int
+
+
+async def save_image_bytes(image_bytes: bytes, image_mime_type: str, output_folder: Path, tool_context: Optional[ToolContext] = None) -> None:
+    """
+    Save image bytes to a specified output folder and optionally save as an artifact using the ToolContext.
+    :param image_bytes: The encoded image bytes.
+    :param image_mime_type: The MIME type of the image.
+    :param output_folder: The folder where the images will be saved.
+    :param tool_context:
+    :return:
+    """
+    if tool_context:
+        await tool_context.save_artifact("generated_image.png", types.Part.from_bytes(
+            data=image_bytes, mime_type=image_mime_type
+        ))
+
+    image = Image.open(BytesIO(image_bytes))
+    output_path = output_folder / f"generated_image.png"
+    image.save(output_path)
+    logger.info(f"Image saved to {output_path} successfully.")
 
 
-async def save_generated_image(image: types.Image, output_folder: Path, tool_context: Optional[ToolContext] = None) -> None:
+async def save_generated_image(image: types.Image, output_folder: Path, tool_context: Optional[ToolContext] = None) -> tuple[bytes, str]:
     """
     Save generated images to a specified output folder and optionally save as an artifact using the ToolContext.
     :param image: The generated image object containing the image bytes.
     :param output_folder: The folder where the images will be saved.
     :param tool_context:
-    :return:
+    :return: The downloaded image bytes and MIME type.
     """
     image_gcs_uri = image.gcs_uri
     if not image_gcs_uri:
@@ -45,23 +80,162 @@ async def save_generated_image(image: types.Image, output_folder: Path, tool_con
     )
     logger.debug(f"Media bytes: {image_bytes}")
     logger.debug(f"Mime type: {image_mime_type}")
-    if tool_context:
-        await tool_context.save_artifact("generated_image.png", types.Part.from_bytes(
-            data=image_bytes, mime_type=image_mime_type
-        ))
+    await save_image_bytes(image_bytes, image_mime_type, output_folder, tool_context)
+    return image_bytes, image_mime_type
 
-    image = Image.open(BytesIO(image_bytes))
-    output_path = output_folder / f"generated_image.png"
-    image.save(output_path)
-    logger.info(f"Image saved to {output_path} successfully.")
 
+async def request_image_candidates(model_id: str, enhanced_prompt: str, config: types.GenerateImagesConfig, num_candidates: int) -> typing.List[types.Image]:
+    """
+    Requests image candidates from Imagen, fanning out concurrent requests when more candidates
+    are needed than a single request can return.
 
-async def generate_image(enhanced_prompt: str, tool_context: Optional[ToolContext] = None) -> typing.Dict[str, str]:
+    Args:
+        model_id (str): The Imagen model identifier.
+        enhanced_prompt (str): The text prompt for image generation.
+        config (types.GenerateImagesConfig): Base generation config.
+        num_candidates (int): Total number of images to request.
+
+    Returns:
+        List[types.Image]: The generated images.
+    """
+    batch_sizes = [
+        min(IMAGEN_MAX_IMAGES_PER_REQUEST, num_candidates - start)
+        for start in range(0, num_candidates, IMAGEN_MAX_IMAGES_PER_REQUEST)
+    ]
+
+    async def request_batch(batch_size: int) -> types.GenerateImagesResponse:
+        # Each request holds an Imagen slot, so concurrent designs share the quota fairly
+        async with admission_slot("imagen"), timed("imagen_generate", {"gen_ai.request.model": model_id, "imagen.number_of_images": batch_size}):
+            return await asyncio.to_thread(
+                get_genai_client().models.generate_images,
+                model=model_id,
+                prompt=enhanced_prompt,
+                config=config.model_copy(update={"number_of_images": batch_size}),
+            )
+
+    responses = await asyncio.gather(*(request_batch(batch_size) for batch_size in batch_sizes))
+    return [generated.image for response in responses for generated in (response.generated_images or [])]
+
+
+def select_best_image_with_gemini(enhanced_prompt: str, candidates: typing.List[typing.Tuple[bytes, str]]) -> int:
+    """
+    Asks Gemini to pick the candidate that best matches the prompt, in a single batched call.
+
+    Args:
+        enhanced_prompt (str): The prompt the candidates were generated from.
+        candidates (List[Tuple[bytes, str]]): Candidate image bytes and MIME types.
+
+    Returns:
+        int: Index of the selected candidate.
+    """
+    parts = [types.Part.from_bytes(data=data, mime_type=mime_type) for data, mime_type in candidates]
+    parts.append(types.Part.from_text(text=get_image_selection_prompt(enhanced_prompt, len(candidates))))
+    response = generate_content(
+        "select_best_image",
+        model="gemini-2.5-flash",
+        contents=parts,
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=ImageSelection
+        )
+    )
+    selection: ImageSelection = response.parsed
+    if selection is None or not 0 <= selection.best_candidate < len(candidates):
+        raise ValueError(f"Invalid candidate selection: {response.text}")
+    return selection.best_candidate
+
+
+def select_best_image_candidate(
+    enhanced_prompt: str,
+    candidates: typing.List[typing.Tuple[bytes, str]],
+    target_aspect_ratio: float,
+    selector: str = "local",
+) -> int:
+    """
+    Picks the best generated image, using Gemini when requested and falling back to the local scorer.
+
+    Args:
+        enhanced_prompt (str): The prompt the candidates were generated from.
+        candidates (List[Tuple[bytes, str]]): Candidate image bytes and MIME types.
+        target_aspect_ratio (float): The requested width / height ratio.
+        selector (str): "gemini" for a batched Gemini judgment, "local" for sharpness and aspect fit.
+
+    Returns:
+        int: Index of the selected candidate.
+    """
+    if len(candidates) == 1:
+        return 0
+    if selector == "gemini":
+        try:
+            return select_best_image_with_gemini(enhanced_prompt, candidates)
+        except Exception as e:
+            logger.warning(f"Gemini candidate selection failed, using local scorer: {e}")
+
+    scores = [score_image_candidate(Image.open(BytesIO(data)), target_aspect_ratio) for data, _ in candidates]
+    logger.info(f"Image candidate scores: {scores}")
+    return max(range(len(scores)), key=scores.__getitem__)
+
+
+async def generate_best_image(
+    model_id: str,
+    enhanced_prompt: str,
+    config: types.GenerateImagesConfig,
+    num_candidates: int,
+    selector: str,
+    media_cache: Optional[MediaCache] = None,
+    cache_key: Optional[str] = None,
+) -> tuple[bytes, str, str]:
+    """
+    Generates image candidates, downloads them concurrently and keeps the best one.
+
+    Args:
+        model_id (str): The Imagen model identifier.
+        enhanced_prompt (str): The text prompt for image generation.
+        config (types.GenerateImagesConfig): Base generation config.
+        num_candidates (int): Number of candidate images to generate.
+        selector (str): Candidate selector, "local" or "gemini".
+        media_cache (Optional[MediaCache]): Cache to store the selected image in, if enabled.
+        cache_key (Optional[str]): Key of the selected image in the media cache.
+
+    Returns:
+        tuple[bytes, str, str]: The selected image bytes, MIME type and GCS URI.
+    """
+    generated_images = await request_image_candidates(model_id, enhanced_prompt, config, num_candidates)
+    if not generated_images:
+        raise RuntimeError("No images were generated. Check the prompt and model configuration.")
+
+    logger.info(f"Generated {len(generated_images)} image(s).")
+    logger.info(generated_images)
+    candidates = await asyncio.gather(*(
+        async_download_media_file_from_gcs(*parse_gcs_uri(image.gcs_uri)) for image in generated_images
+    ))
+    width, height = map(int, config.aspect_ratio.split(":"))
+    async with timed("imagen_select", {"imagen.selector": selector, "imagen.candidates": len(candidates)}):
+        best_index = await asyncio.to_thread(
+            select_best_image_candidate, enhanced_prompt, candidates, width / height, selector
+        )
+    logger.info(f"Selected image candidate {best_index + 1} of {len(candidates)}.")
+    image_gcs_uri = generated_images[best_index].gcs_uri
+    image_bytes, image_mime_type = candidates[best_index]
+    if media_cache:
+        await asyncio.to_thread(media_cache.put, cache_key, CachedMedia(
+            data=image_bytes, mime_type=image_mime_type, metadata={"gcs_uri": image_gcs_uri}
+        ))
+    return image_bytes, image_mime_type, image_gcs_uri
+
+
+async def generate_image(enhanced_prompt: str, num_candidates: int = 1, use_cache: bool = True, tool_context: Optional[ToolContext] = None) -> typing.Dict[str, str]:
     """
     Generate an image using a text prompt. Optionally save the result via a ToolContext.
 
+    When more than one candidate is requested, all candidates are generated and downloaded concurrently
+    and the best one is kept. When the media cache is enabled, an identical earlier request is served
+    from the cache instead of calling Imagen again, and concurrent identical requests share one generation.
+
     Args:
         enhanced_prompt (str): A descriptive text prompt for image generation.
+        num_candidates (int): Number of candidate images to generate before picking the best one, at most IMAGEN_MAX_CANDIDATES.
+        use_cache (bool): Set to False to skip the media cache and request coalescing and always generate a fresh variation.
         tool_context (Optional[ToolContext]): Optional context to save the artifact remotely.
 
     Returns:
@@ -77,30 +251,55 @@ async def generate_image(enhanced_prompt: str, tool_context: Optional[ToolContex
     try:
         if not enhanced_prompt.strip():
             raise ValueError("Prompt must not be empty.")
-        response = genai_client.models.generate_images(
-            model=os.getenv("IMAGEN_MODEL_ID","imagen-4.0-generate-preview-06-06"),
-            prompt=enhanced_prompt,
-            config=types.GenerateImagesConfig(
-                aspect_ratio="16:9",
-                number_of_images=1,
-                output_gcs_uri=media_files_bucket_gs_uri,
-            ),
+        model_id = os.getenv("IMAGEN_MODEL_ID","imagen-4.0-generate-preview-06-06")
+        if num_candidates < 1:
+            raise ValueError("num_candidates must be at least 1.")
+        # The count comes from a model turn, so it is capped to bound the Imagen requests a single call fans out to
+        max_candidates = int(os.getenv("IMAGEN_MAX_CANDIDATES", 4))
+        num_candidates = min(max(num_candidates, int(os.getenv("IMAGEN_NUM_CANDIDATES", 1))), max_candidates)
+        selector = os.getenv("IMAGEN_CANDIDATE_SELECTOR", "local").strip().lower()
+        config = types.GenerateImagesConfig(
+            aspect_ratio="16:9",
+            number_of_images=1,
+            output_gcs_uri=media_files_bucket_gs_uri,
+        )
+        media_cache = get_media_cache() if use_cache else None
+        cache_key = build_media_cache_key(
+            model_id,
+            enhanced_prompt,
+            {
+                **config.model_dump(exclude_none=True, exclude={"output_gcs_uri"}),
+                "num_candidates": num_candidates,
+                "selector": selector,
+            },
         )
-        if not response.generated_images:
-            raise RuntimeError("No images were generated. Check the prompt and model configuration.")
+        cached_image = await asyncio.to_thread(media_cache.get, cache_key) if media_cache else None
 
-        logger.info(f"Generated {len(response.generated_images)} image(s).")
-        logger.info(response.generated_images)
-        generated_image = response.generated_images[0].image
-        await save_generated_image(generated_image, media_files_local_path,  tool_context)
+        if cached_image:
+            logger.info(f"Serving image from media cache: {cache_key}")
+            image_gcs_uri = cached_image.metadata["gcs_uri"]
+            await save_image_bytes(cached_image.data, cached_image.mime_type, media_files_local_path, tool_context)
+        else:
+            # Designs with the same prompt share one generation while it is in flight, unless a fresh variation is requested
+            async with stage_deadline("imagen"):
+                image_bytes, image_mime_type, image_gcs_uri = await coalesce(
+                    "imagen",
+                    enhanced_prompt,
+                    lambda: generate_best_image(model_id, enhanced_prompt, config, num_candidates, selector, media_cache, cache_key),
+                    model_id,
+                    num_candidates,
+                    selector,
+                    enabled=use_cache,
+                )
+            await save_image_bytes(image_bytes, image_mime_type, media_files_local_path, tool_context)
 
         if tool_context:
-            tool_context.state["generated_image_url"] = generated_image.gcs_uri
+            tool_context.state["generated_image_url"] = image_gcs_uri
 
         return {
             "status": "success",
             "message": "Image generated and saved successfully.",
-            "image_gcs_uri": generated_image.gcs_uri
+            "image_gcs_uri": image_gcs_uri
         }
     except Exception as e:
         logger.error(f"Error generating image: {e}")
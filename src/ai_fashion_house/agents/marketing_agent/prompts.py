@@ -28,3 +28,14 @@ def get_image_caption_prompt() -> str:
         "Focus on conveying the atmosphere of the scene while giving special attention to the dress’s craftsmanship, "
         "visual impact, and how it flows or reacts to the model’s movement."
     )
+
+
+def get_image_selection_prompt(enhanced_prompt: str, num_candidates: int) -> str:
+    return (
+        f"You are given {num_candidates} candidate fashion images, numbered from 0 in the order they appear. "
+        "All of them were generated from the following prompt:\n\n"
+        f"{enhanced_prompt}\n\n"
+        "Pick the single candidate that best matches the prompt, with the most faithful garment details, "
+        "a natural-looking model, sharp focus and no visual artifacts. "
+        "Return the number of the best candidate."
+    )
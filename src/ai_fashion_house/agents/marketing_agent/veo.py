@@ -2,7 +2,6 @@ import asyncio
 import logging
 import mimetypes
 import os
-import time
 from io import BytesIO
 from pathlib import Path
 from typing import Optional
@@ -10,21 +9,26 @@ from typing import Optional
 import aiofiles
 from dotenv import load_dotenv, find_dotenv
 from google.adk.tools import ToolContext
-from google.cloud import storage
 from google.genai import types
 from google.genai.errors import ClientError
 
 from ai_fashion_house.agents.marketing_agent.prompts import get_image_caption_prompt
-from ai_fashion_house.utils.gcp_utils import get_authenticated_genai_client, parse_gcs_uri, upload_media_file_to_gcs, \
+from ai_fashion_house.utils.admission import admission_slot
+from ai_fashion_house.utils.client_registry import generate_content, get_genai_client, get_storage_client
+from ai_fashion_house.utils.deadlines import DeadlineExceeded, degrade_or_raise, stage_deadline
+from ai_fashion_house.utils.gcp_utils import parse_gcs_uri, async_upload_media_file_to_gcs, \
     download_media_file_from_gcs
+from ai_fashion_house.utils.media_cache import CachedMedia, MediaCache, build_media_cache_key, get_media_cache
+from ai_fashion_house.utils.metrics import timed
+from ai_fashion_house.utils.single_flight import coalesce
+from ai_fashion_house.utils.tracing import set_span_attributes
 
 # Load environment variables
 load_dotenv(find_dotenv())
 
 logger = logging.getLogger(__name__)
 
-genai_client = get_authenticated_genai_client()
-gcs_client = storage.Client()
+VEO_POLL_INTERVAL_SECONDS = float(os.getenv("VEO_POLL_INTERVAL_SECONDS", 20))
 
 
 def caption_image(image_uri: str) -> str:
@@ -38,7 +42,8 @@ def caption_image(image_uri: str) -> str:
         str: A descriptive prompt/caption for the image.
     """
 
-    response = genai_client.models.generate_content(
+    response = generate_content(
+        "caption_image",
         model="gemini-2.5-flash",
           contents=[types.Part.from_uri(
             file_uri=image_uri,
@@ -48,13 +53,35 @@ def caption_image(image_uri: str) -> str:
     return response.text
 
 
-async def save_generated_video(video: types.Video, output_folder: Path, tool_context: Optional[ToolContext] = None) -> None:
+async def save_video_bytes(video_bytes: bytes, video_mime_type: str, video_gcs_uri: str, output_folder: Path, tool_context: Optional[ToolContext] = None) -> None:
+    """
+    Save video bytes to a specified output folder and optionally save as an artifact using the ToolContext.
+    :param video_bytes: The encoded video bytes.
+    :param video_mime_type: The MIME type of the video.
+    :param video_gcs_uri: The GCS URI the video was generated to.
+    :param output_folder: The folder where the video will be saved.
+    :param tool_context:
+    :return:
+    """
+    if tool_context:
+        await tool_context.save_artifact("generated_video.mp4", types.Part.from_bytes(
+            data=video_bytes, mime_type=video_mime_type
+        ))
+        tool_context.state["generated_video_url"] = video_gcs_uri
+
+    output_path = output_folder / f"generated_video.mp4"
+    async with aiofiles.open(output_path, "wb") as out_file:
+        await out_file.write(video_bytes)
+    logger.info(f"Video saved to {output_path} successfully.")
+
+
+async def save_generated_video(video: types.Video, output_folder: Path, tool_context: Optional[ToolContext] = None) -> tuple[bytes, str]:
     """
     Save generated images to a specified output folder and optionally save as an artifact using the ToolContext.
     :param image: The generated image object containing the image bytes.
     :param output_folder: The folder where the images will be saved.
     :param tool_context:
-    :return:
+    :return: The downloaded video bytes and MIME type.
     """
     video_gcs_uri = video.uri
     if not video_gcs_uri:
@@ -68,32 +95,92 @@ async def save_generated_video(video: types.Video, output_folder: Path, tool_con
     )
     logger.debug(f"Media bytes: {video_bytes}")
     logger.debug(f"Mime type: {video_mime_type}")
-    if tool_context:
-        await tool_context.save_artifact("generated_video.mp4", types.Part.from_bytes(
-            data=video_bytes, mime_type=video_mime_type
-        ))
-        tool_context.state["generated_video_url"] = video_gcs_uri
+    await save_video_bytes(video_bytes, video_mime_type, video_gcs_uri, output_folder, tool_context)
+    return video_bytes, video_mime_type
 
-    output_path = output_folder / f"generated_video.mp4"
-    async with aiofiles.open(output_path, "wb") as out_file:
-        await out_file.write(video_bytes)
-    logger.info(f"Video saved to {output_path} successfully.")
+
+def get_gcs_image_hash(image_gcs_uri: str) -> str:
+    """
+    Returns the content hash GCS keeps for an image, so the image does not need to be downloaded to key the cache.
+
+    Args:
+        image_gcs_uri (str): The GCS URI of the image.
+
+    Returns:
+        str: The blob's MD5 (or CRC32C for composite objects) hash.
+    """
+    bucket_name, blob_path = parse_gcs_uri(image_gcs_uri)
+    blob = get_storage_client().bucket(bucket_name).get_blob(blob_path)
+    if blob is None:
+        raise ValueError(f"Image not found in GCS: {image_gcs_uri}")
+    return blob.md5_hash or blob.crc32c
+
+
+async def render_video(
+    prompt: str,
+    image_gcs_uri: str,
+    media_cache: Optional[MediaCache] = None,
+    cache_key: Optional[str] = None,
+) -> tuple[bytes, str, str]:
+    """
+    Generates a video from an image with Veo and downloads it, retrying with a Gemini-written prompt
+    if Veo rejects the original one.
+
+    Args:
+        prompt (str): The descriptive prompt for the fashion scene.
+        image_gcs_uri (str): The GCS URI of the input image.
+        media_cache (Optional[MediaCache]): Cache to store the video in, if enabled.
+        cache_key (Optional[str]): Key of the video in the media cache.
+
+    Returns:
+        tuple[bytes, str, str]: The video bytes, MIME type and GCS URI.
+    """
+    try:
+        # attempt to generate image-to-video directly
+        logger.info("Attempting to generate video from image...")
+        async with admission_slot("veo"), timed("veo_generate"):
+            generated_video = await try_generate_video(prompt, gcs_image_uri=image_gcs_uri)
+    except ClientError as e:
+        logger.warning(f"Initial video generation failed: {e}")
+        if e.code != 400:
+            raise
+        # Fallback: use Gemini to generate a caption prompt from the image and retry
+        logger.info("Retrying with Gemini-generated prompt...")
+        async with timed("veo_caption", {"gen_ai.request.model": "gemini-2.5-flash"}):
+            prompt = await asyncio.to_thread(caption_image, image_gcs_uri)
+        async with admission_slot("veo"), timed("veo_generate"):
+            generated_video = await try_generate_video(prompt, gcs_image_uri=None)
+
+    if not generated_video.uri:
+        raise ValueError("Video GCS URI is not provided in the generated video object.")
+    video_bytes, video_mime_type = await asyncio.to_thread(
+        download_media_file_from_gcs, *parse_gcs_uri(generated_video.uri)
+    )
+    if media_cache:
+        await asyncio.to_thread(media_cache.put, cache_key, CachedMedia(
+            data=video_bytes, mime_type=video_mime_type, metadata={"gcs_uri": generated_video.uri}
+        ))
+    return video_bytes, video_mime_type, generated_video.uri
 
 
-async def generate_video(image_gcs_uri: str, tool_context: Optional[ToolContext] = None):
+async def generate_video(image_gcs_uri: str, use_cache: bool = True, tool_context: Optional[ToolContext] = None):
     """
     Main entry point to generate a fashion-themed video from a single input image.
 
     This function supports loading from a ToolContext or directly from local disk,
     uploading the image to GCS, and using Gemini to generate video content with a fallback
-    to dynamic prompt generation if the initial request fails.
+    to dynamic prompt generation if the initial request fails. When the media cache is enabled,
+    an earlier video generated from the same image is served from the cache instead, and concurrent
+    requests for the same image share one render.
 
     Args:
         image_gcs_uri (str): The GCS URI of the input image to use for video generation.
+        use_cache (bool): Set to False to skip the media cache and request coalescing and always generate a fresh variation.
         tool_context (Optional[ToolContext]): Optional context for loading artifacts.
 
     Returns:
-        dict[str, Any]: A dictionary containing the result status and message.
+        dict[str, Any]: A dictionary containing the result status and message. The status is "degraded" when
+            the video was skipped because it could not finish before the design's deadline.
     """
     try:
         media_files_bucket_gs_uri = os.getenv("MEDIA_FILES_BUCKET_GCS_URI", None)
@@ -103,42 +190,83 @@ async def generate_video(image_gcs_uri: str, tool_context: Optional[ToolContext]
             raise ValueError("MEDIA_FILES_BUCKET_GCS_URI environment variable is not set.")
 
 
+        prompt = "The fashion model in the image walks toward the camera with a smile."
+        media_cache = get_media_cache() if use_cache else None
+        cache_key = None
+        if media_cache:
+            cache_key = build_media_cache_key(
+                os.getenv("VEO2_MODEL_ID", "veo-3.0-generate-preview"),
+                prompt,
+                get_video_generation_config().model_dump(exclude_none=True, exclude={"output_gcs_uri"}),
+                image_hash=await asyncio.to_thread(get_gcs_image_hash, image_gcs_uri),
+            )
+            cached_video = await asyncio.to_thread(media_cache.get, cache_key)
+            if cached_video:
+                logger.info(f"Serving video from media cache: {cache_key}")
+                video_gcs_uri = cached_video.metadata["gcs_uri"]
+                await save_video_bytes(cached_video.data, cached_video.mime_type, video_gcs_uri, media_files_local_path, tool_context)
+                return {
+                    "status": "success",
+                    "message": "Video generated successfully",
+                    "video_gcs_uri": video_gcs_uri
+                }
+
         try:
-            # attempt to generate image-to-video directly
-            logger.info("Attempting to generate video from image...")
-            prompt = "The fashion model in the image walks toward the camera with a smile."
-            generated_video = try_generate_video(prompt, gcs_image_uri=image_gcs_uri)
-
-
-        except ClientError as e:
-            logger.warning(f"Initial video generation failed: {e}")
-            if e.code != 400:
-                raise
-            # Fallback: use Gemini to generate a caption prompt from the image and retry
-            logger.info("Retrying with Gemini-generated prompt...")
-            prompt = caption_image(image_gcs_uri)
-            generated_video =  try_generate_video(prompt, gcs_image_uri=None)
-
-        await save_generated_video(generated_video, media_files_local_path, tool_context)
-        logger.info(f"Video generation response: {generated_video.uri}")
+            # Designs animating the same image share one render while it is in flight, unless a fresh variation is requested
+            async with stage_deadline("veo"):
+                video_bytes, video_mime_type, video_gcs_uri = await coalesce(
+                    "veo",
+                    prompt,
+                    lambda: render_video(prompt, image_gcs_uri, media_cache, cache_key),
+                    image_gcs_uri,
+                    enabled=use_cache,
+                )
+        except DeadlineExceeded as e:
+            degrade_or_raise(e)
+            return {"status": "degraded", "message": f"Video skipped to meet the deadline: {e.reason}"}
+        await save_video_bytes(video_bytes, video_mime_type, video_gcs_uri, media_files_local_path, tool_context)
+        logger.info(f"Video generation response: {video_gcs_uri}")
         logger.info("Video generated successfully")
         return {
             "status": "success",
             "message": "Video generated successfully",
-            "video_gcs_uri": generated_video.uri
+            "video_gcs_uri": video_gcs_uri
         }
     except Exception as e:
         logger.exception("Error in generate_video")
         return {"status": "error", "message": str(e)}
 
 
-def try_generate_video(
+def get_video_generation_config() -> types.GenerateVideosConfig:
+    """
+    Builds the Veo generation config shared by every video request.
+
+    Returns:
+        types.GenerateVideosConfig: The video generation configuration.
+    """
+    media_files_bucket_gs_uri = os.getenv("MEDIA_FILES_BUCKET_GCS_URI", None)
+    if not media_files_bucket_gs_uri:
+        raise ValueError("MEDIA_FILES_BUCKET_GCS_URI environment variable is not set.")
+
+    return types.GenerateVideosConfig(
+        number_of_videos=1,
+        person_generation="allow_adult",
+        aspect_ratio="16:9",
+        duration_seconds=8,
+        output_gcs_uri=media_files_bucket_gs_uri,
+    )
+
+
+async def try_generate_video(
     prompt: str,
     gcs_image_uri: Optional[str] = None
 ) -> types.Video:
     """
     Attempts to generate a video using a given prompt and optional image URI.
 
+    The operation is polled without blocking the event loop, so cancelling the calling task stops polling
+    at the next interval (VEO_POLL_INTERVAL_SECONDS).
+
     Args:
         prompt (str): The descriptive prompt for the fashion scene.
         gcs_image_uri (Optional[str]): GCS URI of the reference image (optional).
@@ -150,10 +278,6 @@ def try_generate_video(
         ClientError: If the generation fails due to API or validation errors.
     """
 
-    media_files_bucket_gs_uri = os.getenv("MEDIA_FILES_BUCKET_GCS_URI", None)
-    if not media_files_bucket_gs_uri:
-        raise ValueError("MEDIA_FILES_BUCKET_GCS_URI environment variable is not set.")
-
     image_input = None
     if gcs_image_uri:
         image_input = types.Image(
@@ -162,24 +286,30 @@ def try_generate_video(
         )
 
     # Launch video generation
-    video_generation_operation = genai_client.models.generate_videos(
-        model=os.getenv("VEO2_MODEL_ID", "veo-3.0-generate-preview"),
+    model_id = os.getenv("VEO2_MODEL_ID", "veo-3.0-generate-preview")
+    video_generation_operation = await asyncio.to_thread(
+        get_genai_client().models.generate_videos,
+        model=model_id,
         prompt=prompt,
         image=image_input,
-        config=types.GenerateVideosConfig(
-            number_of_videos=1,
-            person_generation="allow_adult",
-            aspect_ratio="16:9",
-            duration_seconds=8,
-            output_gcs_uri=media_files_bucket_gs_uri,
-        ),
+        config=get_video_generation_config(),
     )
     # Wait for the operation to complete
-    while not video_generation_operation.done:
-        time.sleep(20)
-        video_generation_operation = genai_client.operations.get(video_generation_operation)
-        if video_generation_operation.error:
-            raise ClientError(f"Video generation failed: {video_generation_operation.error}")
+    try:
+        async with timed("veo_poll", {"gen_ai.request.model": model_id, "veo.operation": video_generation_operation.name}):
+            polls = 0
+            while not video_generation_operation.done:
+                await asyncio.sleep(VEO_POLL_INTERVAL_SECONDS)
+                video_generation_operation = await asyncio.to_thread(
+                    get_genai_client().operations.get, video_generation_operation
+                )
+                polls += 1
+                set_span_attributes({"veo.polls": polls})
+                if video_generation_operation.error:
+                    raise ClientError(f"Video generation failed: {video_generation_operation.error}")
+    except asyncio.CancelledError:
+        logger.info(f"Stopped polling cancelled video generation {video_generation_operation.name}")
+        raise
 
     # Check the response for generated videos
     video_generation_operation_response = video_generation_operation.response
@@ -198,15 +328,13 @@ async def main():
     media_files_bucket_gs_uri = os.getenv("MEDIA_FILES_BUCKET_GCS_URI", None)
 
     test_image_path = "/Users/haruiz/open-source/ai-fashion-house/outputs/generated_image_1.png"
-    async with aiofiles.open(test_image_path, "rb") as f:
-        image_bytes = await f.read()
     image_mimetype = mimetypes.guess_type(test_image_path)[0]
     image_gcs_path = f"{media_files_bucket_gs_uri}/{os.path.basename(test_image_path)}"
     bucket_name, blob_path = parse_gcs_uri(image_gcs_path)
-    upload_media_file_to_gcs(
+    await async_upload_media_file_to_gcs(
         bucket_name=bucket_name,
         blob_path=blob_path,
-        media_bytes=image_bytes,
+        media=test_image_path,
         mime_type=image_mimetype
     )
     output = await generate_video(image_gcs_path)
@@ -0,0 +1,122 @@
+from google.adk.agents import Agent, ParallelAgent
+from google.genai import types
+
+from ai_fashion_house.agents.fashion_design_agent.prompts import get_instructions as get_prompt_writer_instructions
+from ai_fashion_house.agents.fashion_design_agent.tools import get_fashion_model_details
+from ai_fashion_house.agents.marketing_agent.imagen import generate_image
+from ai_fashion_house.agents.marketing_agent.veo import generate_video
+from ai_fashion_house.agents.marketing_workflow.prompts import get_prompt_writer_inputs, get_social_media_post_instructions
+from ai_fashion_house.agents.marketing_workflow.steps import PipelineAgent, ToolStep
+from ai_fashion_house.agents.met_rag_agent.tools import retrieve_met_images
+from ai_fashion_house.agents.search_agent.agent import root_agent as search_agent
+from ai_fashion_house.utils.adk_utils import DeadlineAgent
+
+
+USER_QUERY_KEY = "user_query"
+
+
+def format_met_rag_results(response: dict) -> str:
+    """Render retrieved Met images in the format the met_rag_agent answers with."""
+    return "\n".join(
+        f"image_path: {image_path}\ncaption: {caption}\n"
+        for image_path, caption in zip(response["result"], response["captions"])
+    )
+
+
+def create_root_agent(pipelined: bool = False) -> PipelineAgent:
+    """
+    Build the workflow orchestrator graph, with new agent instances on every call.
+
+    Args:
+        pipelined (bool): Write the social media post while the video renders instead of after it,
+            so the final response is ready as soon as the video lands.
+
+    Returns:
+        PipelineAgent: Root of the graph.
+    """
+    met_rag_step = ToolStep(
+        name="met_rag_agent",
+        description="Retrieves historical fashion images from The Met for the user's concept.",
+        tool=retrieve_met_images,
+        build_args=lambda ctx: {"user_query": ctx.session.state[USER_QUERY_KEY]},
+        output_key="met_rag_results",
+        render_output=format_met_rag_results,
+        # The prompt can still be written from the web search results
+        required=False,
+    )
+
+    research_agent = ParallelAgent(
+        name="research_agent",
+        description="Gathers historical and modern fashion references in parallel.",
+        sub_agents=[
+            met_rag_step,
+            DeadlineAgent(
+                name="web_search_step",
+                description="Runs the search agent within the web search stage's time budget.",
+                stage="web_search",
+                output_key=search_agent.output_key,
+                # A copy, since an agent can only have one parent and the LLM orchestrator's graph owns the original
+                sub_agents=[search_agent.model_copy(update={"parent_agent": None})],
+            ),
+        ],
+    )
+
+    prompt_writer_agent = Agent(
+        name="prompt_writer_agent",
+        description="Transforms visual references and historical context into a vivid, fashion-forward prompt for AI media generation.",
+        model="gemini-2.0-flash",
+        # The model details are fixed, so they are written into the instructions instead of fetched with a tool turn
+        instruction=get_prompt_writer_instructions(get_fashion_model_details()) + get_prompt_writer_inputs(),
+        # The research results are templated in a fixed order instead of read from the interleaved parallel events,
+        # so a replayed design sends an identical request (and can be served from the LLM response cache)
+        include_contents="none",
+        output_key="enhanced_prompt",
+        generate_content_config=types.GenerateContentConfig(temperature=0.5),
+    )
+
+    image_step = ToolStep(
+        name="image_generation_step",
+        description="Generates the fashion image from the enhanced prompt.",
+        tool=generate_image,
+        build_args=lambda ctx: {"enhanced_prompt": ctx.session.state["enhanced_prompt"]},
+    )
+
+    video_step = ToolStep(
+        name="video_generation_step",
+        description="Animates the generated image into a runway video.",
+        tool=generate_video,
+        build_args=lambda ctx: {"image_gcs_uri": ctx.session.state["generated_image_url"]},
+        # When the post is written first, the video reply is the last event, so clients stop waiting once it lands
+        render_output=(lambda response: f"Runway video ready: {response['video_gcs_uri']}") if pipelined else None,
+    )
+
+    social_media_writer = Agent(
+        name="social_media_writer",
+        description="Writes the social media post announcing the design.",
+        model="gemini-2.0-flash",
+        instruction=get_social_media_post_instructions(),
+        # Everything the post needs is templated into the instructions from the session state
+        include_contents="none",
+        output_key="social_media_post",
+        generate_content_config=types.GenerateContentConfig(temperature=0.5),
+    )
+
+    if pipelined:
+        # The post only needs the prompt, the image and the research results, so it is written while Veo renders
+        media_stages = [ParallelAgent(
+            name="video_and_post_agent",
+            description="Renders the runway video and writes the social media post concurrently.",
+            sub_agents=[video_step, social_media_writer],
+        )]
+    else:
+        media_stages = [video_step, social_media_writer]
+
+    return PipelineAgent(
+        name="marketing_workflow",
+        description="Runs the fashion creative pipeline as a fixed sequence of steps, calling the LLM only to write content.",
+        sub_agents=[research_agent, prompt_writer_agent, image_step, *media_stages],
+        user_query_key=USER_QUERY_KEY,
+    )
+
+
+root_agent = create_root_agent()
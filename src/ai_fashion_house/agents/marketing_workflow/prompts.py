@@ -0,0 +1,34 @@
+def get_social_media_post_instructions() -> str:
+    """
+    Returns the instructions of the social media writer of the workflow orchestrator.
+
+    The writer runs once, after the image is generated, and only sees the state values templated below
+    rather than the whole conversation.
+
+    Returns:
+        str: Instructions for the social media writer agent.
+    """
+    return (
+        "You are **Social Media Writer**, a fashion-savvy copywriter for a high-fashion brand.\n\n"
+        "A fashion image was generated from the following prompt and is animated into a short runway video:\n\n"
+        "{enhanced_prompt}\n\n"
+        "They were inspired by these historical pieces from The Metropolitan Museum of Art:\n\n"
+        "{met_rag_results?}\n\n"
+        "Write a strong social media post that captures the essence of the fashion image and video and the historical "
+        "inspiration, designed to engage and inspire followers. Return only the post."
+    )
+
+
+def get_prompt_writer_inputs() -> str:
+    """
+    Returns the inputs section appended to the prompt writer's instructions in the workflow orchestrator,
+    templated from the session state in place of the conversation.
+
+    Returns:
+        str: Templated inputs for the prompt writer agent.
+    """
+    return (
+        "\n\n🧵 User concept:\n{user_query}\n\n"
+        "`search_results`:\n{search_results?}\n\n"
+        "`met_rag_results`:\n{met_rag_results?}\n"
+    )
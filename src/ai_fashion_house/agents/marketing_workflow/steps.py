@@ -0,0 +1,111 @@
+import logging
+import typing
+import uuid
+
+from google.adk.agents import BaseAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.tools import ToolContext
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+ToolFunction = typing.Callable[..., typing.Awaitable[dict[str, typing.Any]]]
+
+
+class ToolStep(BaseAgent):
+    """
+    Calls one tool in plain code, with arguments read from the session state, instead of having an LLM turn decide to call it.
+
+    The call and its response are emitted as function call and function response events, like the ones of an LLM agent,
+    and the tool saves its artifacts and state through a regular ToolContext. A failed required step escalates, which
+    stops a `PipelineAgent`.
+    """
+
+    tool: ToolFunction
+    """The tool coroutine; it must accept a `tool_context` keyword argument."""
+    build_args: typing.Callable[[InvocationContext], dict[str, typing.Any]]
+    """Returns the tool arguments, e.g. from `ctx.session.state`."""
+    output_key: typing.Optional[str] = None
+    """Session state key the rendered output is saved to, like the output_key of an LLM agent."""
+    render_output: typing.Optional[typing.Callable[[dict[str, typing.Any]], str]] = None
+    """Turns a successful tool response into the text reply of the step, saved under `output_key`."""
+    required: bool = True
+    """Whether the pipeline stops when the tool does not succeed."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> typing.AsyncGenerator[Event, None]:
+        tool_name = self.tool.__name__
+        try:
+            args = self.build_args(ctx)
+        except KeyError as e:
+            yield self._reply(ctx, f"Cannot run {tool_name}: {e} is missing from the session state.", escalate=True)
+            return
+
+        function_call_id = f"adk-{uuid.uuid4()}"
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[
+                types.Part(function_call=types.FunctionCall(id=function_call_id, name=tool_name, args=args))
+            ]),
+        )
+
+        tool_context = ToolContext(ctx, function_call_id=function_call_id)
+        response = await self.tool(**args, tool_context=tool_context)
+        function_response = types.Part.from_function_response(name=tool_name, response=response)
+        function_response.function_response.id = function_call_id
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="user", parts=[function_response]),
+            actions=tool_context.actions,
+        )
+
+        if response.get("status") == "degraded":
+            # The tool was skipped to meet the design's deadline; the remaining steps go on without its output
+            yield self._reply(ctx, response.get("message", f"{tool_name} was skipped to meet the deadline"))
+        elif response.get("status") != "success":
+            message = response.get("message", f"{tool_name} returned status '{response.get('status')}'")
+            logger.warning(f"[⚠️] Step {self.name} did not succeed: {message}")
+            yield self._reply(ctx, f"{tool_name} did not succeed: {message}", escalate=self.required)
+        elif self.render_output:
+            yield self._reply(ctx, self.render_output(response))
+
+    def _reply(self, ctx: InvocationContext, text: str, escalate: bool = False) -> Event:
+        event = Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.ModelContent(text),
+        )
+        if self.output_key:
+            event.actions.state_delta[self.output_key] = text
+        event.actions.escalate = escalate or None
+        return event
+
+
+class PipelineAgent(SequentialAgent):
+    """
+    Runs its sub-agents in order, like a SequentialAgent, but stops at the first one that escalates.
+    """
+
+    user_query_key: typing.Optional[str] = None
+    """Session state key the user's message is saved to before the first step, so steps can template it."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> typing.AsyncGenerator[Event, None]:
+        if self.user_query_key:
+            parts = ctx.user_content.parts if ctx.user_content else None
+            event = Event(invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch)
+            event.actions.state_delta[self.user_query_key] = "".join(part.text for part in parts or [] if part.text)
+            yield event
+
+        for sub_agent in self.sub_agents:
+            escalated = False
+            async for event in sub_agent.run_async(ctx):
+                escalated = escalated or bool(event.actions.escalate)
+                yield event
+            if escalated:
+                logger.warning(f"[⚠️] Pipeline {self.name} stopped after {sub_agent.name}")
+                return
@@ -8,11 +8,15 @@ import google.genai.types as types
 import pandas as pd
 from dotenv import load_dotenv, find_dotenv
 from google.adk.tools import ToolContext
-from google.cloud import bigquery, storage
 from pydantic import BaseModel
 
-from ai_fashion_house.utils.gcp_utils import get_authenticated_genai_client
+from ai_fashion_house.utils.admission import admission_slot
+from ai_fashion_house.utils.client_registry import generate_content, get_bigquery_client, get_storage_client
+from ai_fashion_house.utils.deadlines import DeadlineExceeded, degrade_or_raise, stage_deadline
 from ai_fashion_house.utils.image_utils import pil_image_to_png_bytes, create_moodboard
+from ai_fashion_house.utils.metrics import timed
+from ai_fashion_house.utils.single_flight import coalesce
+from ai_fashion_house.utils.tracing import set_span_attributes
 
 logger = logging.getLogger(__name__)
 
@@ -28,13 +32,11 @@ BIGQUERY_EMBEDDINGS_MODEL_ID = os.getenv("BIGQUERY_EMBEDDINGS_MODEL_ID")
 BIGQUERY_REGION= os.getenv("BIGQUERY_REGION", "US")
 BIGQUERY_VECTOR_INDEX_ID = os.getenv("BIGQUERY_VECTOR_INDEX_ID")
 BIGQUERY_TABLE_ID = os.getenv("BIGQUERY_TABLE_ID")
+# Fraction of the vector index's lists searched, recorded by `setup-rag` from a recall/latency sweep
+VECTOR_SEARCH_FRACTION = float(os.getenv("VECTOR_SEARCH_FRACTION", 0.01))
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-# --- Initialize Clients ---
-bq_client = bigquery.Client(project=GOOGLE_PROJECT_ID, location=BIGQUERY_REGION)
-gcs_client = storage.Client(project=GOOGLE_PROJECT_ID)
-genai_client = get_authenticated_genai_client()
+BIGQUERY_POLL_INTERVAL_SECONDS = float(os.getenv("BIGQUERY_POLL_INTERVAL_SECONDS", 0.5))
 
 class TimePeriod(BaseModel):
     """
@@ -60,7 +62,7 @@ def execute_sql_bigquery(sql: str) -> pd.DataFrame:
         RuntimeError: If the query execution fails.
     """
     try:
-        job = bq_client.query(sql)
+        job = get_bigquery_client(GOOGLE_PROJECT_ID, BIGQUERY_REGION).query(sql)
         result = job.result()
         logger.info(f"[✅] Query succeeded: Job ID {job.job_id}")
         return result.to_dataframe()
@@ -69,6 +71,43 @@ def execute_sql_bigquery(sql: str) -> pd.DataFrame:
         raise
 
 
+async def execute_sql_bigquery_async(sql: str) -> pd.DataFrame:
+    """
+    Executes a BigQuery SQL query without blocking the event loop and returns the results as a DataFrame.
+
+    If the calling task is cancelled while the query runs, the BigQuery job is cancelled too, so abandoned
+    searches stop consuming slots.
+
+    Args:
+        sql (str): SQL query to execute.
+
+    Returns:
+        pd.DataFrame: Results from the executed query.
+    """
+    job = await asyncio.to_thread(get_bigquery_client(GOOGLE_PROJECT_ID, BIGQUERY_REGION).query, sql)
+    set_span_attributes({"bigquery.job_id": job.job_id, "bigquery.location": job.location})
+    try:
+        while not await asyncio.to_thread(job.done):
+            await asyncio.sleep(BIGQUERY_POLL_INTERVAL_SECONDS)
+    except asyncio.CancelledError:
+        logger.info(f"[🛑] Cancelling BigQuery job {job.job_id}")
+        await asyncio.shield(asyncio.to_thread(job.cancel))
+        raise
+    try:
+        result = await asyncio.to_thread(job.result)
+        logger.info(f"[✅] Query succeeded: Job ID {job.job_id}")
+        results = await asyncio.to_thread(result.to_dataframe)
+        set_span_attributes({
+            "bigquery.total_bytes_processed": job.total_bytes_processed,
+            "bigquery.cache_hit": job.cache_hit,
+            "bigquery.rows": len(results),
+        })
+        return results
+    except Exception as e:
+        logger.exception(f"[❌] Query failed: {e}")
+        raise
+
+
 def enhance_query(query: str) -> str:
     """
     Enhances the user query by appending additional context for fashion-related searches,
@@ -120,7 +159,8 @@ def enhance_query(query: str) -> str:
     """
 
     # Run prompt through Gemini model
-    response = genai_client.models.generate_content(
+    response = generate_content(
+        "enhance_query",
         model="gemini-2.5-flash",
         contents=[types.Part.from_text(text=rag_query_prompt)]
     )
@@ -145,7 +185,8 @@ def extract_start_end_year_from_prompt(prompt: str) -> TimePeriod:
         "User Query: "
         f"{prompt}"
     )
-    response = genai_client.models.generate_content(
+    response = generate_content(
+        "extract_time_period",
         model="gemini-2.5-flash",
         contents=[types.Part.from_text(text=query)],
         config=types.GenerateContentConfig(
@@ -156,23 +197,23 @@ def extract_start_end_year_from_prompt(prompt: str) -> TimePeriod:
     return response.parsed
 
 
-def search_fashion_embeddings(
+def build_fashion_search_sql(
     query: str,
     top_k: int = 6,
-    search_fraction: float = 0.01,
+    search_fraction: float = VECTOR_SEARCH_FRACTION,
     time_period: TimePeriod = None
-) -> pd.DataFrame:
+) -> str:
     """
-    Performs a vector similarity search using a fashion-related query on a BigQuery embedding table.
+    Builds the vector similarity search SQL for a fashion-related query.
 
     Args:
         query (str): Text to embed and search against the vector database.
         top_k (int): Number of top results to return. Defaults to 6.
-        search_fraction (float): Fraction of the vector index to search. Defaults to 0.01.
+        search_fraction (float): Fraction of the vector index to search. Defaults to VECTOR_SEARCH_FRACTION.
         time_period (TimePeriod, optional): Filter results by start and/or end year.
 
     Returns:
-        pd.DataFrame: A DataFrame with matching results including content, distance, and image URL.
+        str: The search query.
     """
     embedding_subquery = f"""
         SELECT text_embedding, content AS query
@@ -211,10 +252,75 @@ def search_fashion_embeddings(
         sql += " WHERE " + " AND ".join(filters)
 
     sql += " ORDER BY distance ASC"
-    return execute_sql_bigquery(sql)
+    return sql
 
 
-async def retrieve_met_images(user_query: str, top_k: int = 6, search_fraction: float = 0.01, tool_context: ToolContext = None) -> dict:
+def search_fashion_embeddings(
+    query: str,
+    top_k: int = 6,
+    search_fraction: float = VECTOR_SEARCH_FRACTION,
+    time_period: TimePeriod = None
+) -> pd.DataFrame:
+    """
+    Performs a vector similarity search using a fashion-related query on a BigQuery embedding table.
+
+    Args:
+        query (str): Text to embed and search against the vector database.
+        top_k (int): Number of top results to return. Defaults to 6.
+        search_fraction (float): Fraction of the vector index to search. Defaults to VECTOR_SEARCH_FRACTION.
+        time_period (TimePeriod, optional): Filter results by start and/or end year.
+
+    Returns:
+        pd.DataFrame: A DataFrame with matching results including content, distance, and image URL.
+    """
+    return execute_sql_bigquery(build_fashion_search_sql(query, top_k, search_fraction, time_period))
+
+
+async def search_met_collection(user_query: str, top_k: int = 6, search_fraction: float = VECTOR_SEARCH_FRACTION) -> tuple[pd.DataFrame, Optional[bytes]]:
+    """
+    Refines the user query, searches the MET embeddings and renders a moodboard of the matches.
+
+    Args:
+        user_query (str): Initial query string describing the desired fashion style.
+        top_k (int, optional): Number of top image results to return. Defaults to 6.
+        search_fraction (float, optional): Search scope for approximate vector match. Defaults to VECTOR_SEARCH_FRACTION.
+
+    Returns:
+        tuple[pd.DataFrame, Optional[bytes]]: The matching results and the moodboard as PNG bytes,
+        or None when nothing matched.
+    """
+    logger.info(f"[🔍] User query: {user_query}")
+    async with timed("extract_time_period", {"gen_ai.request.model": "gemini-2.5-flash"}):
+        time_period: TimePeriod = await asyncio.to_thread(extract_start_end_year_from_prompt, user_query)
+    logger.info(f"[📅] Extracted date period: {time_period}")
+
+    async with timed("enhance_query", {"gen_ai.request.model": "gemini-2.5-flash"}):
+        enhanced_query = (await asyncio.to_thread(enhance_query, user_query)).replace('"', '\\"')  # Escape quotes safely
+    logger.info(f"[🔍] Enhanced query: {enhanced_query}")
+
+    async with admission_slot("bigquery"), timed("bigquery_search", {"bigquery.top_k": top_k, "bigquery.search_fraction": search_fraction}):
+        results = await execute_sql_bigquery_async(
+            build_fashion_search_sql(enhanced_query, top_k=top_k, search_fraction=search_fraction, time_period=None)
+        )
+    if results.empty:
+        return results, None
+
+    logger.info(f"[✅] Retrieved {len(results)} matching results.")
+    async with timed("moodboard_render", {"moodboard.images": len(results)}):
+        moodboard_image = await asyncio.to_thread(
+            create_moodboard,
+            results['gcs_url'].dropna().tolist(),
+            gcs_client=get_storage_client(GOOGLE_PROJECT_ID),
+            watermark_position="center",
+            moodboard_watermark_text="Fashion Moodboard — Inspired by The Met Collection",
+            moodboard_watermark_font_ratio=0.06,
+            moodboard_watermark_font_path=str(FONTS_FOLDER / "GreatVibes-Regular.ttf"),
+        )
+        moodboard_png = await asyncio.to_thread(pil_image_to_png_bytes, moodboard_image)
+    return results, moodboard_png
+
+
+async def retrieve_met_images(user_query: str, top_k: int = 6, search_fraction: float = VECTOR_SEARCH_FRACTION, tool_context: ToolContext = None) -> dict:
     """
     Orchestrates the full RAG pipeline: refines the user query, retrieves similar embeddings,
     and returns a list of matching GCS image URLs.
@@ -224,21 +330,29 @@ async def retrieve_met_images(user_query: str, top_k: int = 6, search_fraction:
     Args:
         user_query (str): Initial query string describing the desired fashion style.
         top_k (int, optional): Number of top image results to return. Defaults to 6.
-        search_fraction (float, optional): Search scope for approximate vector match. Defaults to 0.01.
+        search_fraction (float, optional): Search scope for approximate vector match. Defaults to VECTOR_SEARCH_FRACTION.
         tool_context (ToolContext, optional): Context for tool execution, if needed.
 
     Returns:
-        Optional[List[str]]: A list of GCS URLs to matching images, or None if no matches found.
+        dict: The status, the GCS URLs of the matching images under "result" and their captions under "captions".
     """
     try:
-        logger.info(f"[🔍] User query: {user_query}")
-        time_period: TimePeriod = extract_start_end_year_from_prompt(user_query)
-        logger.info(f"[📅] Extracted date period: {time_period}")
-
-        enhanced_query = enhance_query(user_query).replace('"', '\\"')  # Escape quotes safely
-        logger.info(f"[🔍] Enhanced query: {enhanced_query}")
-
-        results = search_fashion_embeddings(enhanced_query , top_k=top_k, search_fraction=search_fraction, time_period=None)
+        try:
+            # Designs with the same query share one retrieval and moodboard render while it is in flight
+            async with stage_deadline("bigquery"):
+                results, moodboard_png = await coalesce(
+                    "met_retrieval",
+                    user_query,
+                    lambda: search_met_collection(user_query, top_k=top_k, search_fraction=search_fraction),
+                    top_k,
+                    search_fraction,
+                )
+        except DeadlineExceeded as e:
+            degrade_or_raise(e)
+            return {
+                "status": "degraded",
+                "message": f"Met retrieval skipped to meet the deadline: {e.reason}",
+            }
         if results.empty:
             logger.warning("[⚠️] No matches found.")
             return {
@@ -246,20 +360,10 @@ async def retrieve_met_images(user_query: str, top_k: int = 6, search_fraction:
                 "message": "No matching images found for the given query."
             }
 
-        logger.info(f"[✅] Retrieved {len(results)} matching results.")
-
-        image_urls = results['gcs_url'].dropna().tolist()
-        moodboard_image = create_moodboard(
-            image_urls,
-            gcs_client=gcs_client,
-            watermark_position="center",
-            moodboard_watermark_text="Fashion Moodboard — Inspired by The Met Collection",
-            moodboard_watermark_font_ratio=0.06,
-            moodboard_watermark_font_path=str(FONTS_FOLDER / "GreatVibes-Regular.ttf"),
-        )
+        matches = results.dropna(subset=['gcs_url'])
         if tool_context:
             # Save moodboard to GCS if tool context is provided
-            moodboard_artifact_part = types.Part.from_bytes(mime_type="image/png",data=pil_image_to_png_bytes(moodboard_image))
+            moodboard_artifact_part = types.Part.from_bytes(mime_type="image/png", data=moodboard_png)
             await tool_context.save_artifact("moodboard.png", moodboard_artifact_part)
             met_rag_results = types.Part.from_bytes(
                 mime_type="text/csv",
@@ -271,12 +375,13 @@ async def retrieve_met_images(user_query: str, top_k: int = 6, search_fraction:
         output_folder = Path(os.getenv("OUTPUT_FOLDER", "outputs"))
         output_folder.mkdir(parents=True, exist_ok=True)
         output_file = output_folder / "moodboard.png"
-        moodboard_image.save(output_file)
+        output_file.write_bytes(moodboard_png)
         logger.info(f"[🖼️] Moodboard saved @ {output_file}")
         logger.info(f"[📸] Retrieved results: {results}")
         return {
             "status": "success",
-            "result": image_urls,
+            "result": matches['gcs_url'].tolist(),
+            "captions": matches['content'].fillna("").tolist(),
         }
     except Exception as e:
         logger.error(f"[❌] Error during retrieval: {e}")
@@ -289,7 +394,7 @@ async def retrieve_met_images(user_query: str, top_k: int = 6, search_fraction:
 def run_retrieve_met_images_sync(
     user_query: str,
     top_k: int = 6,
-    search_fraction: float = 0.01,
+    search_fraction: float = VECTOR_SEARCH_FRACTION,
     tool_context: Optional[ToolContext] = None
 ) -> dict:
     """
@@ -317,7 +422,7 @@ def run_retrieve_met_images_sync(
 if __name__ == '__main__':
 
     logger.info("[📂] Listing tables in MET dataset...")
-    tables = bq_client.list_tables("bigquery-public-data.the_met")
+    tables = get_bigquery_client(GOOGLE_PROJECT_ID, BIGQUERY_REGION).list_tables("bigquery-public-data.the_met")
     for table in tables:
         logger.info(f"• {table.project}.{table.table_id}")
 
@@ -328,7 +433,6 @@ if __name__ == '__main__':
     image_results = run_retrieve_met_images_sync(
         user_query=query,
         top_k=8,
-        search_fraction=0.01
     )
     if image_results:
         logger.info(f"[📸] Retrieved image URLs:\n{image_results}")
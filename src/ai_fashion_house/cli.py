@@ -5,7 +5,6 @@ from typing import Optional
 import typer
 from dotenv import load_dotenv, find_dotenv
 from typing_extensions import Annotated
-from ai_fashion_house.create_rag import main as create_rag
 
 # Load environment variables from a .env file
 load_dotenv(find_dotenv())
@@ -57,11 +56,47 @@ def start(
 
 
 @app.command(name="setup-rag")
-def setup_rag():
+def setup_rag(
+    full_refresh: Annotated[bool, typer.Option("--full-refresh", help="Rebuild every RAG table instead of only adding missing objects")] = False,
+) -> None:
+    """
+    Set up the MET RAG dataset, models and tables on BigQuery, captioning and embedding only new objects.
+    """
+    # Imported here so other commands don't pay for loading the BigQuery SDKs
+    from ai_fashion_house.create_rag import main as create_rag
+
+    create_rag(full_refresh=full_refresh)
+
+
+@app.command(name="startup-report")
+def startup_report(
+    modules: Annotated[Optional[list[str]], typer.Argument(help="Modules to profile")] = None,
+    top: Annotated[int, typer.Option("--top", help="Number of slowest imports to show per module")] = 10,
+) -> None:
     """
-    Deploy the FastAPI app to Google Cloud Run.
+    Report import time for the CLI, the web app and the agent graph, with a breakdown of the slowest imports.
     """
-    create_rag()
+    from ai_fashion_house.utils.startup_profile import print_import_time_report
+
+    print_import_time_report(modules or None, top=top)
+
+
+@app.command(name="trace-report")
+def trace_report(
+    trace_id: Annotated[Optional[str], typer.Argument(help="Trace id (or prefix) to show; defaults to the latest trace")] = None,
+    trace_file: Annotated[Optional[str], typer.Option("--file", help="JSON lines trace file (default: TRACE_FILE)")] = None,
+    list_traces: Annotated[bool, typer.Option("--list", help="List recent traces instead of showing one")] = False,
+) -> None:
+    """
+    Show a waterfall of the spans of a design run recorded with TRACE_EXPORTER=json.
+    """
+    from ai_fashion_house.utils.trace_export import get_trace_file, print_trace_list, print_trace_waterfall
+
+    path = trace_file or get_trace_file()
+    if list_traces:
+        print_trace_list(path)
+    else:
+        print_trace_waterfall(path, trace_id)
 
 
 def main():
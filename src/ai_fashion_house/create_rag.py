@@ -1,13 +1,23 @@
+import json
+import math
 import os
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-from dotenv import load_dotenv, find_dotenv
+from dotenv import load_dotenv, find_dotenv, set_key
+from google.api_core.exceptions import GoogleAPIError
 from google.cloud import bigquery
 from google.cloud import bigquery_connection_v1 as bq_connection
-from google.cloud.exceptions import NotFound
+from google.cloud.exceptions import BadRequest, Forbidden, NotFound
 from rich import print
 from rich.progress import Progress
+from rich.table import Table
+
+from ai_fashion_house.utils.client_registry import get_bigquery_client
+from ai_fashion_house.utils.step_graph import Step, run_step_graph, wait_until_ready
 
 # Load environment variables
 load_dotenv(find_dotenv())
@@ -24,18 +34,44 @@ bigquery_caption_model_id = os.getenv("BIGQUERY_CAPTIONING_MODEL_ID")
 bigquery_caption_model = os.getenv("BIGQUERY_CAPTIONING_MODEL")
 bigquery_table_id = os.getenv("BIGQUERY_TABLE_ID")
 bigquery_vector_index_id = os.getenv("BIGQUERY_VECTOR_INDEX_ID")
+# An incremental build splits the objects to caption and embed into shards of this many objects, one query each,
+# run RAG_BUILD_PARALLELISM at a time to stay within the remote models' quotas
+rag_build_shard_size = int(os.getenv("RAG_BUILD_SHARD_SIZE", 200))
+rag_build_parallelism = int(os.getenv("RAG_BUILD_PARALLELISM", 4))
+# Failed rows and failed shard queries (quota, timeouts) are retried this many times, with exponential backoff
+rag_build_max_retries = int(os.getenv("RAG_BUILD_MAX_RETRIES", 2))
+rag_build_retry_backoff_seconds = float(os.getenv("RAG_BUILD_RETRY_BACKOFF_SECONDS", 10))
+# How long model creation waits for new IAM grants to propagate to the connection's service account
+rag_setup_ready_timeout_seconds = float(os.getenv("RAG_SETUP_READY_TIMEOUT_SECONDS", 300))
+# Vector index tuning: the sampled embeddings used as held-out queries, the fractions of lists tried, and the recall
+# against exact search the recommended fraction must reach
+rag_tuning_queries = int(os.getenv("RAG_TUNING_QUERIES", 50))
+rag_tuning_fractions = [float(f) for f in os.getenv("RAG_TUNING_FRACTIONS", "0.005,0.01,0.02,0.05,0.1,0.2").split(",")]
+rag_tuning_target_recall = float(os.getenv("RAG_TUNING_TARGET_RECALL", 0.95))
+rag_tuning_top_k = int(os.getenv("RAG_TUNING_TOP_K", 6))
+# How long the tuning waits for BigQuery to populate a new vector index
+rag_index_ready_timeout_seconds = float(os.getenv("RAG_INDEX_READY_TIMEOUT_SECONDS", 900))
+# BigQuery never populates vector indexes of tables under 10 MB; searches on them are exact
+VECTOR_INDEX_MIN_TABLE_BYTES = 10 * 1024 * 1024
+# Recorded next to VECTOR_SEARCH_FRACTION: the number of lists it was tuned for, or "exact" for unindexed tables
+VECTOR_SEARCH_TUNED_FOR_KEY = "VECTOR_SEARCH_TUNED_FOR"
+DEFAULT_VECTOR_SEARCH_FRACTION = 0.01
 
-# Initialize BigQuery client
-client = bigquery.Client(project=project_id)
+def run_bq_job(sql: str, query_parameters: list = None, use_query_cache: bool = True) -> bigquery.QueryJob:
+    """
+    Executes a SQL query using the BigQuery client, waits for it and returns the finished job.
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters or [], use_query_cache=use_query_cache)
+    query_job = get_bigquery_client(project_id).query(sql, job_config=job_config)
+    query_job.result()
+    print(f"[green]Executed query job:[/green] {query_job.job_id}")
+    return query_job
 
-def run_bq_query(sql: str):
+def run_bq_query(sql: str, query_parameters: list = None):
     """
     Executes a SQL query using the BigQuery client and returns the result.
     """
-    query_job = client.query(sql)
-    result = query_job.result()
-    print(f"[green]Executed query job:[/green] {query_job.job_id}")
-    return result
+    return run_bq_job(sql, query_parameters).result()
 
 def create_bigquery_dataset(dataset_id: str):
     """
@@ -45,10 +81,10 @@ def create_bigquery_dataset(dataset_id: str):
     dataset = bigquery.Dataset(dataset_ref)
     dataset.location = bigquery_region
     try:
-        client.get_dataset(dataset)
+        get_bigquery_client(project_id).get_dataset(dataset)
         print(f"[yellow]Dataset {dataset_ref} already exists[/yellow]")
     except NotFound:
-        client.create_dataset(dataset, timeout=30)
+        get_bigquery_client(project_id).create_dataset(dataset, timeout=30)
         print(f"[green]Created dataset {dataset_ref}[/green]")
 
 def create_bigquery_connection(connection_id: str) -> str:
@@ -74,17 +110,57 @@ def create_bigquery_connection(connection_id: str) -> str:
         )
         return f"serviceAccount:{response.cloud_resource.service_account_id}"
 
-def setup_project_permissions(project_id: str, conn_service_account: str):
+def connection_api_enabled() -> bool:
+    """
+    Checks whether the BigQuery Connection API is enabled on the project.
+    """
+    result = subprocess.run(
+        ["gcloud", "services", "list", "--enabled", f"--project={project_id}",
+         "--filter=config.name=bigqueryconnection.googleapis.com", "--format=value(config.name)"],
+        capture_output=True, text=True,
+    )
+    return result.returncode == 0 and "bigqueryconnection.googleapis.com" in result.stdout
+
+def enable_connection_api():
+    """
+    Enables the BigQuery Connection API.
+    """
+    print("[cyan]Enabling BigQuery Connection API...[/cyan]")
+    subprocess.run(["gcloud", "services", "enable", "bigqueryconnection.googleapis.com", f"--project={project_id}"],
+                   capture_output=True, text=True)
+
+def get_granted_roles(project_id: str, member: str) -> set[str]:
     """
-    Grants required IAM roles and enables the BigQuery Connection API.
+    Returns the project roles granted to a member, or an empty set if the IAM policy cannot be read.
+    """
+    result = subprocess.run(
+        ["gcloud", "projects", "get-iam-policy", project_id, "--format=json"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return set()
+    bindings = json.loads(result.stdout).get("bindings", [])
+    return {binding["role"] for binding in bindings if member in binding.get("members", [])}
+
+def setup_project_permissions(project_id: str, conn_service_account: str) -> list[str]:
+    """
+    Grants the connection's service account the IAM roles it is missing.
+
+    Returns:
+        list[str]: The roles granted; new grants take a while to propagate.
     """
     roles = [
         'roles/serviceusage.serviceUsageConsumer',
         'roles/bigquery.connectionUser',
         'roles/aiplatform.user'
     ]
+    granted_roles = get_granted_roles(project_id, conn_service_account)
 
+    granted = []
     for role in roles:
+        if role in granted_roles:
+            print(f"[yellow]{role} already granted[/yellow]")
+            continue
         cmd = [
             "gcloud", "projects", "add-iam-policy-binding", project_id,
             "--condition=None", "--no-user-output-enabled",
@@ -95,12 +171,25 @@ def setup_project_permissions(project_id: str, conn_service_account: str):
             print(f"[red]Failed to assign {role}[/red]: {result.stderr.strip()}")
         else:
             print(f"[green]Granted {role}[/green]")
+            granted.append(role)
+    return granted
 
-    print("[cyan]Enabling BigQuery Connection API...[/cyan]")
-    subprocess.run(["gcloud", "services", "enable", "bigqueryconnection.googleapis.com"],
-                   capture_output=True, text=True)
-    print("[yellow]Waiting 60 seconds for IAM propagation...[/yellow]")
-    time.sleep(60)
+def is_permission_error(error: Exception) -> bool:
+    """
+    Checks whether a BigQuery error is caused by IAM grants that have not propagated yet.
+    """
+    return isinstance(error, (Forbidden, BadRequest)) and "permission" in str(error).lower()
+
+def model_is_current(model_id: str, model_endpoint: str) -> bool:
+    """
+    Checks whether a remote model exists and points to the configured endpoint.
+    """
+    try:
+        model = get_bigquery_client(project_id).get_model(f"{project_id}.{bigquery_dataset_id}.{model_id}")
+    except NotFound:
+        return False
+    endpoint = model.to_api_repr().get("remoteModelInfo", {}).get("endpoint", "")
+    return endpoint.rstrip("/").endswith(f"/{model_endpoint}") or endpoint == model_endpoint
 
 def create_model(connection_id: str, model_id: str, model_endpoint: str):
     """
@@ -113,18 +202,11 @@ def create_model(connection_id: str, model_id: str, model_endpoint: str):
     """
     return run_bq_query(sql)
 
-def create_gemini_captions_table():
+def get_source_objects_sql() -> str:
     """
-    Creates a BigQuery table using `ML.GENERATE_TEXT` to produce captions from metadata.
+    Returns the query selecting the Costume Institute dresses to caption, one image per object, with their caption prompt.
     """
-    sql = f"""
-    CREATE OR REPLACE TABLE `{bigquery_dataset_id}.{bigquery_table_id}` AS
-    SELECT
-      ml_generate_text_result['candidates'][0]['content'] AS generated_text,
-      * EXCEPT (ml_generate_text_result)
-    FROM
-      ML.GENERATE_TEXT(
-        MODEL `{bigquery_dataset_id}.{bigquery_caption_model_id}`,(
+    return f"""
          SELECT
         objects.object_id,
         objects.object_name,
@@ -184,47 +266,291 @@ def create_gemini_captions_table():
           LOWER(objects.object_name) LIKE "%dress%"
           OR LOWER(objects.object_name) LIKE "%evening dress%"
         )
-      ORDER BY 
-        objects.title
-    ),
-    STRUCT(
-      1.0 AS temperature,
-      500 AS max_output_tokens
-    )
-  );
     """
-    return run_bq_query(sql)
 
-def create_gemini_formatted_captions_table():
+
+def get_captions_select_sql(source_sql: str, successful_only: bool = False) -> str:
     """
-    Creates a new table that extracts plain text from Gemini's JSON-formatted captions.
+    Returns the query captioning the objects selected by `source_sql` with `ML.GENERATE_TEXT`.
+
+    With `successful_only`, objects whose captioning failed are left out, so a later incremental run retries them.
+    """
+    status_filter = "WHERE ml_generate_text_status = ''" if successful_only else ""
+    return f"""
+    SELECT
+      ml_generate_text_result['candidates'][0]['content'] AS generated_text,
+      * EXCEPT (ml_generate_text_result)
+    FROM
+      ML.GENERATE_TEXT(
+        MODEL `{bigquery_dataset_id}.{bigquery_caption_model_id}`,
+        ({source_sql}),
+        STRUCT(
+          1.0 AS temperature,
+          500 AS max_output_tokens
+        )
+      )
+    {status_filter}
+    """
+
+
+def create_gemini_captions_table():
+    """
+    Creates a BigQuery table using `ML.GENERATE_TEXT` to produce captions from metadata.
     """
     sql = f"""
-    CREATE OR REPLACE TABLE `{bigquery_dataset_id}.{bigquery_table_id}_formatted` AS
+    CREATE OR REPLACE TABLE `{bigquery_dataset_id}.{bigquery_table_id}` AS
+    {get_captions_select_sql(get_source_objects_sql() + " ORDER BY objects.title")}
+    """
+    return run_bq_query(sql)
+
+def get_formatted_captions_select_sql(captions_table: str) -> str:
+    """
+    Returns the query extracting plain text from Gemini's JSON-formatted captions.
+    """
+    return f"""
     SELECT
       * EXCEPT (generated_text),
       JSON_VALUE(generated_text, '$.parts[0].text') AS generated_text
-    FROM `{bigquery_dataset_id}.{bigquery_table_id}`;
+    FROM {captions_table}
     """
-    return run_bq_query(sql)
 
-def create_fashion_embeddings_table():
+
+def get_embeddings_select_sql(source_sql: str, successful_only: bool = False) -> str:
     """
-    Generates text embeddings using `ML.GENERATE_TEXT_EMBEDDING` and stores the result in BigQuery.
+    Returns the query embedding the formatted captions selected by `source_sql` with `ML.GENERATE_TEXT_EMBEDDING`.
+
+    With `successful_only`, captions whose embedding failed are left out, so a later incremental run retries them.
     """
-    sql = f"""
-    CREATE OR REPLACE TABLE `{bigquery_dataset_id}.{bigquery_table_id}_embeddings` AS
+    status_filter = "WHERE ml_embed_text_status = ''" if successful_only else ""
+    return f"""
     SELECT * FROM ML.GENERATE_TEXT_EMBEDDING(
       MODEL `{bigquery_dataset_id}.{bigquery_embedding_model_id}`,
       (
         SELECT * EXCEPT(generated_text), generated_text AS content
-        FROM `{bigquery_dataset_id}.{bigquery_table_id}_formatted`
+        FROM ({source_sql})
         WHERE gcs_url IS NOT NULL
       )
-    );
+    )
+    {status_filter}
+    """
+
+
+def create_gemini_formatted_captions_table():
+    """
+    Creates a new table that extracts plain text from Gemini's JSON-formatted captions.
+    """
+    sql = f"""
+    CREATE OR REPLACE TABLE `{bigquery_dataset_id}.{bigquery_table_id}_formatted` AS
+    {get_formatted_captions_select_sql(f"`{bigquery_dataset_id}.{bigquery_table_id}`")};
     """
     return run_bq_query(sql)
 
+def create_fashion_embeddings_table():
+    """
+    Generates text embeddings using `ML.GENERATE_TEXT_EMBEDDING` and stores the result in BigQuery.
+    """
+    sql = f"""
+    CREATE OR REPLACE TABLE `{bigquery_dataset_id}.{bigquery_table_id}_embeddings` AS
+    {get_embeddings_select_sql(f"SELECT * FROM `{bigquery_dataset_id}.{bigquery_table_id}_formatted`")};
+    """
+    return run_bq_query(sql)
+
+def table_exists(table_id: str) -> bool:
+    """
+    Checks whether a table of the RAG dataset exists.
+    """
+    try:
+        get_bigquery_client(project_id).get_table(f"{project_id}.{bigquery_dataset_id}.{table_id}")
+        return True
+    except NotFound:
+        return False
+
+def find_missing_object_ids(source_sql: str, table_id: str) -> list[int]:
+    """
+    Returns the ids of the objects selected by `source_sql` that are not in the given table yet, in id order.
+    """
+    missing_filter = (
+        f"WHERE object_id NOT IN (SELECT object_id FROM `{bigquery_dataset_id}.{table_id}`)"
+        if table_exists(table_id) else ""
+    )
+    sql = f"""
+    SELECT DISTINCT object_id FROM ({source_sql})
+    {missing_filter}
+    ORDER BY object_id
+    """
+    return [row.object_id for row in run_bq_query(sql)]
+
+def find_missing_in_table(table_id: str, object_ids: list[int]) -> list[int]:
+    """
+    Returns the given object ids that are not in the table.
+    """
+    sql = f"""
+    SELECT object_id FROM UNNEST(@object_ids) AS object_id
+    WHERE object_id NOT IN (SELECT object_id FROM `{bigquery_dataset_id}.{table_id}`)
+    ORDER BY object_id
+    """
+    parameters = [bigquery.ArrayQueryParameter("object_ids", "INT64", object_ids)]
+    return [row.object_id for row in run_bq_query(sql, parameters)]
+
+def get_shard_sql(source_sql: str) -> str:
+    """
+    Returns the query selecting the objects of `source_sql` whose ids are in the @object_ids parameter.
+    """
+    return f"SELECT * FROM ({source_sql}) WHERE object_id IN UNNEST(@object_ids)"
+
+def create_empty_table(table_id: str, select_sql: str, query_parameters: list = None):
+    """
+    Creates the table with the schema of `select_sql` and no rows, if it does not exist yet.
+    """
+    sql = f"""
+    CREATE TABLE IF NOT EXISTS `{bigquery_dataset_id}.{table_id}` AS
+    SELECT * FROM ({select_sql}) WHERE FALSE
+    """
+    run_bq_job(sql, query_parameters)
+
+def merge_new_rows(table_id: str, select_sql: str, query_parameters: list = None) -> int:
+    """
+    Inserts the rows of `select_sql` whose object is not in the table yet, creating the table empty on first use.
+
+    Rows are keyed on object_id, so running it again after an interruption never duplicates rows. It inserts rather
+    than merges so that shards write concurrently, as BigQuery queues concurrent MERGE statements on a table.
+
+    Returns:
+        int: Number of rows added by this statement.
+    """
+    table_ref = f"`{bigquery_dataset_id}.{table_id}`"
+    if not table_exists(table_id):
+        create_empty_table(table_id, select_sql, query_parameters)
+    sql = f"""
+    INSERT INTO {table_ref}
+    SELECT * FROM ({select_sql})
+    WHERE object_id NOT IN (SELECT object_id FROM {table_ref})
+    """
+    return run_bq_job(sql, query_parameters).num_dml_affected_rows or 0
+
+def run_shard(source_sql: str, table_id: str, build_select_sql, object_ids: list[int]) -> int:
+    """
+    Generates and adds the rows of one shard of objects, retrying the rows that failed and failed queries.
+
+    Returns:
+        int: Number of rows added; the objects still missing are retried on the next run.
+    """
+    pending = object_ids
+    added = 0
+    for attempt in range(rag_build_max_retries + 1):
+        if attempt:
+            time.sleep(rag_build_retry_backoff_seconds * 2 ** (attempt - 1))
+        try:
+            if attempt:
+                pending = find_missing_in_table(table_id, pending) if table_exists(table_id) else pending
+                if not pending:
+                    break
+                print(f"[yellow]Retrying {len(pending)} objects of shard {object_ids[0]}-{object_ids[-1]} (attempt {attempt}).[/yellow]")
+            parameters = [bigquery.ArrayQueryParameter("object_ids", "INT64", pending)]
+            added += merge_new_rows(table_id, build_select_sql(get_shard_sql(source_sql)), parameters)
+        except GoogleAPIError as e:
+            print(f"[red]Shard {object_ids[0]}-{object_ids[-1]} failed:[/red] {e}")
+            continue
+        if added == len(object_ids):
+            break
+    return added
+
+def merge_in_shards(stage: str, source_sql: str, table_id: str, build_select_sql, progress: Progress,
+                    shard_size: int = rag_build_shard_size, parallelism: int = rag_build_parallelism) -> int:
+    """
+    Adds the objects of `source_sql` missing from a table, split into shards of consecutive object ids that run
+    concurrently and are committed on their own.
+
+    The table itself is the checkpoint: an interrupted run resumes at the objects still missing, and objects that
+    failed to generate after the retries are retried on the next run.
+
+    Args:
+        stage (str): Stage name shown in the progress bar.
+        source_sql (str): Query selecting the input objects.
+        table_id (str): Target table.
+        build_select_sql (Callable[[str], str]): Builds the generating query from the shard's input query.
+        progress (Progress): Progress bar the rows are reported to.
+        shard_size (int): Objects per shard.
+        parallelism (int): Shards run at the same time.
+
+    Returns:
+        int: Number of rows added.
+    """
+    object_ids = find_missing_object_ids(source_sql, table_id)
+    if not object_ids:
+        print(f"[cyan]{stage}: {table_id} is up to date.[/cyan]")
+        return 0
+
+    shards = [object_ids[start:start + shard_size] for start in range(0, len(object_ids), shard_size)]
+    task = progress.add_task(f"[bold green]{stage} ({len(shards)} shards)", total=len(object_ids))
+    added = failed = 0
+    lock = threading.Lock()
+
+    def run(shard: list[int]) -> None:
+        nonlocal added, failed
+        shard_added = run_shard(source_sql, table_id, build_select_sql, shard)
+        with lock:
+            added += shard_added
+            failed += len(shard) - shard_added
+            progress.update(task, advance=len(shard), description=f"[bold green]{stage}[/bold green] added {added}, failed {failed}")
+
+    if not table_exists(table_id):
+        # Create the table before the shards insert into it concurrently; no object is selected, so nothing is generated
+        parameters = [bigquery.ArrayQueryParameter("object_ids", "INT64", [])]
+        create_empty_table(table_id, build_select_sql(get_shard_sql(source_sql)), parameters)
+    with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+        list(executor.map(run, shards))
+
+    print(f"[green]{stage}: added {added} rows to {table_id}.[/green]")
+    if failed:
+        print(f"[yellow]{stage}: {failed} objects failed and will be retried on the next run.[/yellow]")
+    return added
+
+def prune_removed_objects(source_sql: str, table_id: str):
+    """
+    Deletes the rows of objects no longer selected by `source_sql`, e.g. removed from The Met's open access data.
+    """
+    sql = f"""
+    DELETE FROM `{bigquery_dataset_id}.{table_id}`
+    WHERE object_id NOT IN (SELECT object_id FROM ({source_sql}))
+    """
+    return run_bq_query(sql)
+
+def update_rag_tables(progress: Progress):
+    """
+    Brings the captions, formatted captions and embeddings tables up to date with the source data, generating
+    captions and embeddings only for the objects missing from them.
+    """
+    captions_table = f"`{bigquery_dataset_id}.{bigquery_table_id}`"
+    formatted_table = f"`{bigquery_dataset_id}.{bigquery_table_id}_formatted`"
+    table_ids = (bigquery_table_id, f"{bigquery_table_id}_formatted", f"{bigquery_table_id}_embeddings")
+
+    merge_in_shards(
+        "Captioning",
+        get_source_objects_sql(),
+        bigquery_table_id,
+        lambda batch_sql: get_captions_select_sql(batch_sql, successful_only=True),
+        progress,
+    )
+    if not table_exists(bigquery_table_id):
+        print("[yellow]No captions were generated; nothing to embed yet.[/yellow]")
+        return
+
+    # Formatting needs no model calls, so every missing caption is added at once
+    merge_new_rows(table_ids[1], get_formatted_captions_select_sql(captions_table))
+    merge_in_shards(
+        "Embedding",
+        f"SELECT * FROM {formatted_table}",
+        table_ids[2],
+        lambda batch_sql: get_embeddings_select_sql(batch_sql, successful_only=True),
+        progress,
+    )
+
+    source_sql = get_source_objects_sql()
+    for table_id in table_ids:
+        if table_exists(table_id):
+            prune_removed_objects(source_sql, table_id)
+
 def create_vector_index(num_lists: int = 10):
     """
     Creates a vector index on the text embeddings using IVF and COSINE distance.
@@ -240,33 +566,269 @@ def create_vector_index(num_lists: int = 10):
     """
     return run_bq_query(sql)
 
-def main():
-    with Progress() as progress:
-        task = progress.add_task("[bold green]Setting up RAG pipeline...", total=8)
+def get_num_lists(row_count: int) -> int:
+    """
+    Derives the number of IVF lists from the number of embeddings: about the square root of the row count,
+    which balances the lists scanned per search against the rows scanned per list.
+    """
+    return min(max(round(math.sqrt(row_count)), 1), 5000)
 
-        create_bigquery_dataset(bigquery_dataset_id)
-        progress.advance(task)
+def get_vector_index_num_lists() -> int:
+    """
+    Returns the number of lists of the existing vector index, or 0 if there is none.
+    """
+    sql = f"""
+    SELECT option_value FROM `{bigquery_dataset_id}.INFORMATION_SCHEMA.VECTOR_INDEX_OPTIONS`
+    WHERE index_name = '{bigquery_vector_index_id}'
+      AND table_name = '{bigquery_table_id}_embeddings'
+      AND option_name = 'ivf_options'
+    """
+    rows = list(run_bq_query(sql))
+    return json.loads(rows[0].option_value).get("num_lists", 0) if rows else 0
 
-        conn_service_account = create_bigquery_connection(bigquery_connection_id)
-        progress.advance(task)
+def get_embeddings_table() -> Optional[bigquery.Table]:
+    """
+    Returns the embeddings table, or None if it does not exist.
+    """
+    try:
+        return get_bigquery_client(project_id).get_table(
+            f"{project_id}.{bigquery_dataset_id}.{bigquery_table_id}_embeddings"
+        )
+    except NotFound:
+        return None
+
+def get_embeddings_row_count() -> int:
+    """
+    Returns the number of rows of the embeddings table, or 0 if it does not exist.
+    """
+    table = get_embeddings_table()
+    return (table.num_rows or 0) if table is not None else 0
+
+def update_vector_index() -> int:
+    """
+    Creates the vector index with a number of lists derived from the row count, or recreates it once the corpus
+    has grown or shrunk enough for the existing number of lists to be off by more than a factor of two.
+
+    Returns:
+        int: The number of lists if the index was (re)created, 0 if the existing index was kept or there are
+        no embeddings to index.
+    """
+    row_count = get_embeddings_row_count()
+    if not row_count:
+        print("[yellow]Embeddings table is missing or empty; skipping the vector index[/yellow]")
+        return 0
+    num_lists = get_num_lists(row_count)
+    current_num_lists = get_vector_index_num_lists()
+    if current_num_lists and 0.5 <= current_num_lists / num_lists <= 2:
+        print(f"[yellow]Vector index has {current_num_lists} lists for {row_count} rows; keeping it[/yellow]")
+        return 0
+    print(f"[cyan]Creating vector index with {num_lists} lists for {row_count} rows...[/cyan]")
+    create_vector_index(num_lists=num_lists)
+    return num_lists
+
+class VectorIndexNotReady(Exception):
+    """
+    The vector index is still being populated, so searches would not use it yet.
+    """
+
+def check_vector_index_ready():
+    """
+    Raises VectorIndexNotReady until BigQuery has populated the vector index for every row.
+    """
+    sql = f"""
+    SELECT index_status, coverage_percentage FROM `{bigquery_dataset_id}.INFORMATION_SCHEMA.VECTOR_INDEXES`
+    WHERE index_name = '{bigquery_vector_index_id}' AND table_name = '{bigquery_table_id}_embeddings'
+    """
+    rows = list(run_bq_query(sql))
+    coverage = (rows[0].coverage_percentage or 0) if rows else 0
+    if not rows or rows[0].index_status != "ACTIVE" or coverage < 100:
+        status = f"{rows[0].index_status}, {coverage}% covered" if rows else "not found"
+        raise VectorIndexNotReady(f"vector index {bigquery_vector_index_id} is {status}")
+
+def run_sample_searches(options: dict) -> tuple[dict[int, list[int]], bigquery.QueryJob]:
+    """
+    Searches the embeddings of a fixed sample of objects, each standing for a held-out query: its own row is
+    left out of its results.
+
+    Returns:
+        tuple[dict[int, list[int]], QueryJob]: The ids of the nearest objects of every query, closest first,
+        and the finished search job.
+    """
+    embeddings_table = f"`{bigquery_dataset_id}.{bigquery_table_id}_embeddings`"
+    sql = f"""
+    SELECT query.query_id, base.object_id, distance
+    FROM VECTOR_SEARCH(
+      TABLE {embeddings_table},
+      'text_embedding',
+      (
+        SELECT object_id AS query_id, text_embedding FROM {embeddings_table}
+        ORDER BY FARM_FINGERPRINT(CAST(object_id AS STRING))
+        LIMIT {rag_tuning_queries}
+      ),
+      top_k => {rag_tuning_top_k + 1},
+      options => '{json.dumps(options)}'
+    )
+    WHERE base.object_id != query.query_id
+    ORDER BY query.query_id, distance
+    """
+    # Cached results would report no latency
+    job = run_bq_job(sql, use_query_cache=False)
+    neighbours: dict[int, list[int]] = {}
+    for row in job.result():
+        neighbours.setdefault(row.query_id, []).append(row.object_id)
+    return {query_id: ids[:rag_tuning_top_k] for query_id, ids in neighbours.items()}, job
 
-        setup_project_permissions(project_id, conn_service_account)
-        progress.advance(task)
+def tune_search_fraction(num_lists: int) -> float:
+    """
+    Measures the recall and latency of approximate searches against exact search for each candidate
+    `fraction_lists_to_search`, and records the smallest fraction reaching the target recall as
+    VECTOR_SEARCH_FRACTION in the .env file read by the retrieval tools.
+
+    Args:
+        num_lists (int): Number of lists of the vector index.
+
+    Returns:
+        float: The recommended fraction.
+    """
+    exact, _ = run_sample_searches({"use_brute_force": True})
+    # A fraction below one list searches one list anyway
+    fractions = sorted({min(max(fraction, 1 / num_lists), 1.0) for fraction in rag_tuning_fractions})
+
+    table = Table(title=f"Vector search sweep ({len(exact)} queries, top {rag_tuning_top_k}, {num_lists} lists)")
+    for column in ("fraction_lists_to_search", "recall", "seconds", "slot seconds"):
+        table.add_column(column, justify="right")
+    recommended = None
+    for fraction in fractions:
+        approximate, job = run_sample_searches({"fraction_lists_to_search": fraction})
+        hits = sum(len(set(ids) & set(approximate.get(query_id, []))) for query_id, ids in exact.items())
+        recall = hits / max(sum(len(ids) for ids in exact.values()), 1)
+        table.add_row(
+            f"{fraction:g}", f"{recall:.3f}",
+            f"{(job.ended - job.started).total_seconds():.2f}", f"{(job.slot_millis or 0) / 1000:.1f}",
+        )
+        if recommended is None and recall >= rag_tuning_target_recall:
+            recommended = fraction
+    print(table)
+
+    if recommended is None:
+        recommended = fractions[-1]
+        print(f"[yellow]No fraction reached a recall of {rag_tuning_target_recall}; using the largest one tried[/yellow]")
+    record_search_fraction(recommended, str(num_lists))
+    return recommended
+
+def record_search_fraction(fraction: float, tuned_for: str):
+    """
+    Writes the search fraction, and what it was tuned for, to the .env file read by the retrieval tools.
+    """
+    env_file = find_dotenv() or ".env"
+    set_key(env_file, "VECTOR_SEARCH_FRACTION", f"{fraction:g}", quote_mode="never")
+    set_key(env_file, VECTOR_SEARCH_TUNED_FOR_KEY, tuned_for, quote_mode="never")
+    os.environ["VECTOR_SEARCH_FRACTION"], os.environ[VECTOR_SEARCH_TUNED_FOR_KEY] = f"{fraction:g}", tuned_for
+    print(f"[green]Recorded VECTOR_SEARCH_FRACTION={fraction:g} ({VECTOR_SEARCH_TUNED_FOR_KEY}={tuned_for}) in {env_file}[/green]")
+
+def tune_vector_index(results: dict):
+    """
+    Tunes the search fraction of the vector index once BigQuery has populated it, unless it was already tuned
+    for the index's current number of lists.
+
+    Only a new or recreated index is waited for. An existing index that is not populated yet is left for a later
+    run, and a table too small to be indexed records the default fraction, as its searches are exact anyway.
+    """
+    created_num_lists = results.get("vector_index")
+    tuned_for = os.getenv(VECTOR_SEARCH_TUNED_FOR_KEY, "")
+    if not created_num_lists and os.getenv("VECTOR_SEARCH_FRACTION") and tuned_for and tuned_for != "exact":
+        print(f"[yellow]Vector index unchanged and already tuned for {tuned_for} lists; skipping tuning[/yellow]")
+        return None
+    table = get_embeddings_table()
+    if table is None or not table.num_rows:
+        print("[yellow]Embeddings table is missing or empty; skipping tuning[/yellow]")
+        return None
+    if (table.num_bytes or 0) < VECTOR_INDEX_MIN_TABLE_BYTES:
+        if tuned_for != "exact":
+            print(f"[yellow]Embeddings table is {table.num_bytes} bytes, too small to be indexed; searches are exact[/yellow]")
+            record_search_fraction(DEFAULT_VECTOR_SEARCH_FRACTION, "exact")
+        return None
+    num_lists = created_num_lists or get_vector_index_num_lists()
+    if not num_lists:
+        print("[yellow]No vector index to tune; skipping tuning[/yellow]")
+        return None
+    if not created_num_lists and tuned_for == str(num_lists):
+        print(f"[yellow]Vector index already tuned for {num_lists} lists; skipping tuning[/yellow]")
+        return None
+    try:
+        if created_num_lists:
+            wait_until_ready(
+                check_vector_index_ready,
+                "BigQuery to populate the vector index",
+                lambda error: isinstance(error, VectorIndexNotReady),
+                timeout=rag_index_ready_timeout_seconds,
+                interval=15,
+            )
+        else:
+            check_vector_index_ready()
+    except VectorIndexNotReady as e:
+        print(f"[yellow]Skipping tuning: {e}. Run setup-rag again once it is populated; "
+              f"searches fall back to exact search until then.[/yellow]")
+        return None
+    return tune_search_fraction(num_lists)
 
-        create_model(bigquery_connection_id, bigquery_embedding_model_id, bigquery_embedding_model)
-        progress.advance(task)
+def get_setup_steps(progress: Progress, full_refresh: bool = False) -> list[Step]:
+    """
+    Returns the steps of the RAG setup and their dependencies; steps whose outputs exist are skipped.
+    """
+    def create_remote_model(name: str, model_id: str, model_endpoint: str) -> Step:
+        return Step(
+            name=name,
+            # Creating the model is what fails until the connection's IAM grants have propagated
+            run=lambda results: wait_until_ready(
+                lambda: create_model(bigquery_connection_id, model_id, model_endpoint),
+                "IAM grants to propagate to the BigQuery connection",
+                is_permission_error,
+                timeout=rag_setup_ready_timeout_seconds,
+            ),
+            depends_on=("dataset", "permissions"),
+            skip_if=lambda: model_is_current(model_id, model_endpoint),
+        )
 
-        create_model(bigquery_connection_id, bigquery_caption_model_id, bigquery_caption_model)
-        progress.advance(task)
+    def build_tables(results: dict):
+        if full_refresh:
+            create_gemini_captions_table()
+            create_gemini_formatted_captions_table()
+            create_fashion_embeddings_table()
+        else:
+            update_rag_tables(progress)
 
-        create_gemini_captions_table()
-        progress.advance(task)
+    return [
+        Step("dataset", lambda results: create_bigquery_dataset(bigquery_dataset_id)),
+        Step("connection_api", lambda results: enable_connection_api(), skip_if=connection_api_enabled),
+        Step("connection", lambda results: create_bigquery_connection(bigquery_connection_id), depends_on=("connection_api",)),
+        Step(
+            "permissions",
+            lambda results: setup_project_permissions(project_id, results["connection"]),
+            depends_on=("connection",),
+        ),
+        create_remote_model("embedding_model", bigquery_embedding_model_id, bigquery_embedding_model),
+        create_remote_model("caption_model", bigquery_caption_model_id, bigquery_caption_model),
+        Step("tables", build_tables, depends_on=("embedding_model", "caption_model")),
+        Step("vector_index", lambda results: update_vector_index(), depends_on=("tables",)),
+        Step("vector_index_tuning", tune_vector_index, depends_on=("vector_index",)),
+    ]
+
+def main(full_refresh: bool = False):
+    """
+    Sets up the RAG pipeline, running independent steps concurrently and skipping the ones already done.
+
+    By default only objects missing from the tables are captioned and embedded; `full_refresh` rebuilds every
+    table from scratch.
+    """
+    with Progress() as progress:
+        steps = get_setup_steps(progress, full_refresh)
+        task = progress.add_task("[bold green]Setting up RAG pipeline...", total=len(steps))
 
-        create_gemini_formatted_captions_table()
-        progress.advance(task)
+        def on_step_done(name: str, skipped: bool):
+            print(f"[cyan]{name}: {'up to date' if skipped else 'done'}[/cyan]")
+            progress.advance(task)
 
-        create_fashion_embeddings_table()
-        # create_vector_index(num_lists=10)
-        progress.advance(task)
+        run_step_graph(steps, on_step_done=on_step_done)
 
-    print("\n[bold cyan]\u2705 RAG setup complete.[/bold cyan]")
\ No newline at end of file
+    print("\n[bold cyan]\u2705 RAG setup complete.[/bold cyan]")
@@ -0,0 +1,646 @@
+import asyncio
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+from google.adk.artifacts import BaseArtifactService, InMemoryArtifactService
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, DatabaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from google.genai import types
+
+from ai_fashion_house.utils.job_store import DEFAULT_JOB_TTL_SECONDS, BaseJobStore, InMemoryJobStore, SQLiteJobStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_FOLDER = ".data"
+DEFAULT_SESSION_CACHE_MAX_ENTRIES = 256
+DEFAULT_SESSION_CACHE_TTL_SECONDS = 15 * 60
+DEFAULT_ARTIFACT_CACHE_MAX_BYTES = 256 * 1024 ** 2
+DEFAULT_ARTIFACT_CACHE_TTL_SECONDS = 15 * 60
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+DEFAULT_STORE_RETENTION_SECONDS = DEFAULT_JOB_TTL_SECONDS
+# Expired sessions and artifacts are purged on writes, at most this often per process
+STORE_PURGE_INTERVAL_SECONDS = 15 * 60
+
+ValueT = typing.TypeVar("ValueT")
+
+
+class ArtifactLocation(typing.NamedTuple):
+    """Where one version of a file-backed artifact is stored."""
+    version: int
+    mime_type: str
+    path: Path
+    size: int
+
+
+class BoundedLRUCache(typing.Generic[ValueT]):
+    """
+    In-memory LRU cache bounded by entry count, total size and time-to-live.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        max_bytes: typing.Optional[int] = None,
+        size_of: typing.Callable[[ValueT], int] = lambda value: 0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.total_bytes = 0
+        self._entries: OrderedDict[typing.Hashable, tuple[ValueT, float, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: typing.Hashable) -> typing.Optional[ValueT]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at < time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: typing.Hashable, value: ValueT) -> None:
+        self.pop(key)
+        size = self.size_of(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+        self.total_bytes += size
+        self._evict()
+
+    def touch(self, key: typing.Hashable) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = (entry[0], time.monotonic() + self.ttl_seconds, entry[2])
+            self._entries.move_to_end(key)
+
+    def pop(self, key: typing.Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def pop_matching(self, predicate: typing.Callable[[typing.Hashable], bool]) -> None:
+        for key in [key for key in self._entries if predicate(key)]:
+            self.pop(key)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at, _) in self._entries.items() if expires_at < now]:
+            self.pop(key)
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self.pop(key)
+
+
+class ThreadedSessionService(BaseSessionService):
+    """
+    Runs every call of a session service whose async methods block, such as ADK's DatabaseSessionService
+    (synchronous SQLAlchemy), in a worker thread, so database reads and writes never stall the event loop.
+    """
+
+    def __init__(self, backend: BaseSessionService):
+        self.backend = backend
+
+    @staticmethod
+    async def _run(coroutine: typing.Coroutine) -> typing.Any:
+        # The coroutine does not await anything real, so it runs to completion on the worker thread's own loop
+        return await asyncio.to_thread(asyncio.run, coroutine)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: typing.Optional[dict[str, typing.Any]] = None,
+        session_id: typing.Optional[str] = None,
+    ) -> Session:
+        return await self._run(self.backend.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        ))
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: typing.Optional[GetSessionConfig] = None,
+    ) -> typing.Optional[Session]:
+        return await self._run(self.backend.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        ))
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return await self._run(self.backend.list_sessions(app_name=app_name, user_id=user_id))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._run(self.backend.delete_session(app_name=app_name, user_id=user_id, session_id=session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        return await self._run(self.backend.append_event(session, event))
+
+
+class RetainedDatabaseSessionService(DatabaseSessionService):
+    """
+    ADK's DatabaseSessionService that deletes sessions, with their events, once they have not been updated
+    for `retention_seconds`. Expired sessions are purged when a session is created.
+    """
+
+    def __init__(self, db_url: str, retention_seconds: typing.Optional[float] = None):
+        super().__init__(db_url=db_url)
+        self.retention_seconds = retention_seconds
+        self._next_purge_at = 0.0
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: typing.Optional[dict[str, typing.Any]] = None,
+        session_id: typing.Optional[str] = None,
+    ) -> Session:
+        self._purge_expired()
+        return await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+
+    def _purge_expired(self) -> None:
+        if not self.retention_seconds or time.monotonic() < self._next_purge_at:
+            return
+        self._next_purge_at = time.monotonic() + STORE_PURGE_INTERVAL_SECONDS
+        # Update times are stored by the database's now(), which is UTC without a time zone for SQLite
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.retention_seconds)
+        with self.database_session_factory() as db:
+            expired = db.execute(
+                StorageSession.__table__.select()
+                .with_only_columns(StorageSession.app_name, StorageSession.user_id, StorageSession.id)
+                .where(StorageSession.update_time < cutoff)
+            ).all()
+            # Events are deleted explicitly, as SQLite does not enforce the cascade unless foreign keys are enabled
+            for app_name, user_id, session_id in expired:
+                db.execute(StorageEvent.__table__.delete().where(
+                    StorageEvent.app_name == app_name,
+                    StorageEvent.user_id == user_id,
+                    StorageEvent.session_id == session_id,
+                ))
+                db.execute(StorageSession.__table__.delete().where(
+                    StorageSession.app_name == app_name,
+                    StorageSession.user_id == user_id,
+                    StorageSession.id == session_id,
+                ))
+            db.commit()
+        if expired:
+            logger.info(f"[🧹] Purged {len(expired)} sessions not updated for {self.retention_seconds:.0f}s")
+
+
+class CachedSessionService(BaseSessionService):
+    """
+    Session service that keeps recently used sessions in a bounded in-memory tier
+    in front of a persistent backend such as ADK's DatabaseSessionService.
+
+    When the backend is shared by several workers, set `refresh_on_hit` so every cache hit
+    fetches the events and state other workers have written since the cached copy was last updated.
+    """
+
+    def __init__(
+        self,
+        backend: BaseSessionService,
+        max_entries: int = DEFAULT_SESSION_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_SESSION_CACHE_TTL_SECONDS,
+        refresh_on_hit: bool = False,
+    ):
+        self.backend = backend
+        self.refresh_on_hit = refresh_on_hit
+        self._cache: BoundedLRUCache[Session] = BoundedLRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: typing.Optional[dict[str, typing.Any]] = None,
+        session_id: typing.Optional[str] = None,
+    ) -> Session:
+        session = await self.backend.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._cache.put((app_name, user_id, session.id), session)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: typing.Optional[GetSessionConfig] = None,
+    ) -> typing.Optional[Session]:
+        # Filtered reads return partial event lists, so they always go to the backend and are never cached
+        if config is not None:
+            return await self.backend.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+        key = (app_name, user_id, session_id)
+        session = self._cache.get(key)
+        if session is not None and self.refresh_on_hit:
+            session = await self._refresh(session)
+            if session is None:
+                self._cache.pop(key)
+        elif session is None:
+            session = await self.backend.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            if session is not None:
+                self._cache.put(key, session)
+        return session
+
+    async def _refresh(self, session: Session) -> typing.Optional[Session]:
+        """Bring a cached session up to date with events other workers appended since it was cached."""
+        # Backends such as SQLite store update times with one-second resolution, so new writes are
+        # detected by event id, reading only events at or after the last one already cached
+        latest = await self.backend.get_session(
+            app_name=session.app_name,
+            user_id=session.user_id,
+            session_id=session.id,
+            config=GetSessionConfig(after_timestamp=session.events[-1].timestamp) if session.events else None,
+        )
+        if latest is None:
+            return None
+        known_ids = {event.id for event in session.events}
+        new_events = [event for event in latest.events if event.id not in known_ids]
+        if new_events:
+            session.events.extend(new_events)
+            session.state = latest.state
+            session.last_update_time = max(session.last_update_time, latest.last_update_time)
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return await self.backend.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._cache.pop((app_name, user_id, session_id))
+        await self.backend.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await self.backend.append_event(session, event)
+        self._cache.touch((session.app_name, session.user_id, session.id))
+        return event
+
+
+class FileArtifactService(BaseArtifactService):
+    """
+    Artifact service that stores artifact bytes as files and indexes versions in SQLite,
+    with a bounded in-memory tier for recently loaded artifacts.
+
+    With `retention_seconds`, versions older than that are deleted, files and index rows alike,
+    when artifacts are saved.
+    """
+
+    def __init__(
+        self,
+        root_folder: Path,
+        cache_max_bytes: int = DEFAULT_ARTIFACT_CACHE_MAX_BYTES,
+        cache_ttl_seconds: float = DEFAULT_ARTIFACT_CACHE_TTL_SECONDS,
+        retention_seconds: typing.Optional[float] = None,
+    ):
+        self.root_folder = Path(root_folder)
+        self.retention_seconds = retention_seconds
+        self._next_purge_at = 0.0
+        self.root_folder.mkdir(parents=True, exist_ok=True)
+        self._cache: BoundedLRUCache[types.Part] = BoundedLRUCache(
+            max_entries=1024,
+            ttl_seconds=cache_ttl_seconds,
+            max_bytes=cache_max_bytes,
+            size_of=lambda part: len(part.inline_data.data) if part.inline_data else len(part.text or ""),
+        )
+        self._lock = threading.Lock()
+        # WAL and a busy timeout let several worker processes share the index safely
+        self._db = sqlite3.connect(self.root_folder / "artifacts.db", timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                app_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                mime_type TEXT,
+                is_text INTEGER NOT NULL DEFAULT 0,
+                path TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (app_name, user_id, scope, filename, version)
+            )
+            """
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _scope(session_id: str, filename: str) -> str:
+        # Filenames prefixed with "user:" are shared by all sessions of a user, as in ADK's built-in services
+        return "user" if filename.startswith("user:") else session_id
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+            return rows
+
+    def _save(self, app_name: str, user_id: str, scope: str, filename: str, artifact: types.Part) -> int:
+        with self._lock:
+            # Take the write lock before reading the latest version, so two processes cannot claim the same one
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT MAX(version) FROM artifacts WHERE app_name=? AND user_id=? AND scope=? AND filename=?",
+                    (app_name, user_id, scope, filename),
+                ).fetchone()
+                version = 0 if row[0] is None else row[0] + 1
+                folder = self.root_folder / quote(app_name, safe="") / quote(user_id, safe="") / quote(scope, safe="") / quote(filename, safe="")
+                folder.mkdir(parents=True, exist_ok=True)
+                path = folder / str(version)
+                if artifact.inline_data:
+                    path.write_bytes(artifact.inline_data.data)
+                    mime_type, is_text = artifact.inline_data.mime_type, 0
+                else:
+                    path.write_text(artifact.text or "")
+                    mime_type, is_text = "text/plain", 1
+                self._db.execute(
+                    "INSERT INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, scope, filename, version, mime_type, is_text, str(path), time.time()),
+                )
+            except Exception:
+                self._db.rollback()
+                raise
+            self._db.commit()
+            return version
+
+    def _load(self, app_name: str, user_id: str, scope: str, filename: str, version: typing.Optional[int]) -> typing.Optional[tuple[int, types.Part]]:
+        sql = "SELECT version, mime_type, is_text, path FROM artifacts WHERE app_name=? AND user_id=? AND scope=? AND filename=?"
+        params: tuple = (app_name, user_id, scope, filename)
+        if version is None:
+            sql += " ORDER BY version DESC LIMIT 1"
+        else:
+            sql += " AND version=?"
+            params += (version,)
+        rows = self._execute(sql, params)
+        if not rows:
+            return None
+        version, mime_type, is_text, path = rows[0]
+        if is_text:
+            return version, types.Part(text=Path(path).read_text())
+        return version, types.Part.from_bytes(data=Path(path).read_bytes(), mime_type=mime_type)
+
+    def _locate(self, app_name: str, user_id: str, scope: str, filename: str, version: typing.Optional[int]) -> typing.Optional[ArtifactLocation]:
+        sql = "SELECT version, mime_type, path FROM artifacts WHERE app_name=? AND user_id=? AND scope=? AND filename=?"
+        params: tuple = (app_name, user_id, scope, filename)
+        if version is None:
+            sql += " ORDER BY version DESC LIMIT 1"
+        else:
+            sql += " AND version=?"
+            params += (version,)
+        rows = self._execute(sql, params)
+        if not rows:
+            return None
+        version, mime_type, path = rows[0]
+        path = Path(path)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        return ArtifactLocation(version, mime_type, path, size)
+
+    def _purge_expired(self) -> None:
+        if not self.retention_seconds or time.monotonic() < self._next_purge_at:
+            return
+        self._next_purge_at = time.monotonic() + STORE_PURGE_INTERVAL_SECONDS
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            rows = self._db.execute("SELECT path FROM artifacts WHERE created_at < ?", (cutoff,)).fetchall()
+            self._db.execute("DELETE FROM artifacts WHERE created_at < ?", (cutoff,))
+            self._db.commit()
+        for (path,) in rows:
+            path = Path(path)
+            path.unlink(missing_ok=True)
+            # Remove the folders left empty, up to the root
+            for folder in path.parents:
+                if folder == self.root_folder or self.root_folder not in folder.parents:
+                    break
+                try:
+                    folder.rmdir()
+                except OSError:
+                    break
+        if rows:
+            self._cache.pop_matching(lambda key: True)
+            logger.info(f"[🧹] Purged {len(rows)} artifact versions older than {self.retention_seconds:.0f}s")
+
+    def _delete(self, app_name: str, user_id: str, scope: str, filename: str) -> None:
+        params = (app_name, user_id, scope, filename)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM artifacts WHERE app_name=? AND user_id=? AND scope=? AND filename=?", params
+            ).fetchall()
+            self._db.execute("DELETE FROM artifacts WHERE app_name=? AND user_id=? AND scope=? AND filename=?", params)
+            self._db.commit()
+        for (path,) in rows:
+            Path(path).unlink(missing_ok=True)
+
+    async def save_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str, artifact: types.Part
+    ) -> int:
+        scope = self._scope(session_id, filename)
+        await asyncio.to_thread(self._purge_expired)
+        version = await asyncio.to_thread(self._save, app_name, user_id, scope, filename, artifact)
+        self._cache.put((app_name, user_id, scope, filename, version), artifact)
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: typing.Optional[int] = None,
+    ) -> typing.Optional[types.Part]:
+        scope = self._scope(session_id, filename)
+        if version is not None:
+            cached = self._cache.get((app_name, user_id, scope, filename, version))
+            if cached is not None:
+                return cached
+        loaded = await asyncio.to_thread(self._load, app_name, user_id, scope, filename, version)
+        if loaded is None:
+            return None
+        version, artifact = loaded
+        cached = self._cache.get((app_name, user_id, scope, filename, version))
+        if cached is not None:
+            return cached
+        self._cache.put((app_name, user_id, scope, filename, version), artifact)
+        return artifact
+
+    async def locate_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: typing.Optional[int] = None,
+    ) -> typing.Optional[ArtifactLocation]:
+        """
+        Return where an artifact version is stored, so it can be streamed from disk without loading it.
+
+        Args:
+            app_name (str): Application name.
+            user_id (str): Owner of the artifact.
+            session_id (str): Session the artifact belongs to.
+            filename (str): Artifact name.
+            version (Optional[int]): Version to locate; defaults to the latest.
+
+        Returns:
+            Optional[ArtifactLocation]: The stored version, or None if it does not exist.
+        """
+        return await asyncio.to_thread(
+            self._locate, app_name, user_id, self._scope(session_id, filename), filename, version
+        )
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: str) -> list[str]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT DISTINCT filename FROM artifacts WHERE app_name=? AND user_id=? AND scope IN (?, 'user') ORDER BY filename",
+            (app_name, user_id, session_id),
+        )
+        return [filename for (filename,) in rows]
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        scope = self._scope(session_id, filename)
+        self._cache.pop_matching(lambda key: key[:4] == (app_name, user_id, scope, filename))
+        await asyncio.to_thread(self._delete, app_name, user_id, scope, filename)
+
+    async def list_versions(self, *, app_name: str, user_id: str, session_id: str, filename: str) -> list[int]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT version FROM artifacts WHERE app_name=? AND user_id=? AND scope=? AND filename=? ORDER BY version",
+            (app_name, user_id, self._scope(session_id, filename), filename),
+        )
+        return [version for (version,) in rows]
+
+
+def get_session_store() -> str:
+    """Return the backend selected by SESSION_STORE: "disk" (default), "memory" or "redis"."""
+    store = os.getenv("SESSION_STORE", "disk").strip().lower()
+    if store not in ("disk", "memory", "redis"):
+        raise ValueError(f"Unsupported SESSION_STORE '{store}'; expected 'disk', 'memory' or 'redis'.")
+    return store
+
+
+def get_store_folder() -> Path:
+    """Return the folder holding the disk stores, creating it if needed."""
+    store_folder = Path(os.getenv("STORE_FOLDER", DEFAULT_STORE_FOLDER))
+    store_folder.mkdir(parents=True, exist_ok=True)
+    return store_folder
+
+
+@functools.lru_cache(maxsize=1)
+def get_redis_client():
+    """Return the Redis client shared by the Redis-backed services of this process, configured by REDIS_URL."""
+    from ai_fashion_house.utils.redis_services import create_redis_client
+
+    return create_redis_client(os.getenv("REDIS_URL", DEFAULT_REDIS_URL))
+
+
+def get_store_retention_seconds() -> typing.Optional[float]:
+    """Return how long the disk store keeps sessions, artifacts and job status (STORE_RETENTION_SECONDS; 0: forever)."""
+    retention = float(os.getenv("STORE_RETENTION_SECONDS", DEFAULT_STORE_RETENTION_SECONDS))
+    return retention if retention > 0 else None
+
+
+def _redis_ttl_seconds() -> typing.Optional[int]:
+    ttl = os.getenv("REDIS_TTL_SECONDS", "")
+    return int(ttl) if ttl.strip() else None
+
+
+def create_session_service() -> BaseSessionService:
+    """
+    Build the session service selected by SESSION_STORE ("disk" by default, "memory" or "redis").
+
+    The disk store persists sessions in SQLite (SESSION_DB_URL) for STORE_RETENTION_SECONDS after their last
+    update and is shared by the workers of one host;
+    the redis store (REDIS_URL) is shared by workers on any number of hosts. Both sit behind an in-memory
+    tier bounded by SESSION_CACHE_MAX_ENTRIES and SESSION_CACHE_TTL_SECONDS that is refreshed from the
+    backend on every hit, so a worker sees events written by the others. The refresh only reads the events
+    newer than the cached copy, and SQLite calls run in worker threads so they never block the event loop.
+    """
+    store = get_session_store()
+    if store == "memory":
+        return InMemorySessionService()
+
+    if store == "redis":
+        from ai_fashion_house.utils.redis_services import RedisSessionService
+
+        backend = RedisSessionService(get_redis_client(), ttl_seconds=_redis_ttl_seconds())
+    else:
+        db_url = os.getenv("SESSION_DB_URL", f"sqlite:///{get_store_folder() / 'sessions.db'}")
+        backend = ThreadedSessionService(
+            RetainedDatabaseSessionService(db_url=db_url, retention_seconds=get_store_retention_seconds())
+        )
+    return CachedSessionService(
+        backend,
+        max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", DEFAULT_SESSION_CACHE_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", DEFAULT_SESSION_CACHE_TTL_SECONDS)),
+        refresh_on_hit=True,
+    )
+
+
+def create_artifact_service() -> BaseArtifactService:
+    """
+    Build the artifact service selected by SESSION_STORE ("disk" by default, "memory" or "redis").
+
+    The disk store keeps artifact files under STORE_FOLDER for STORE_RETENTION_SECONDS, behind an in-memory
+    tier bounded by ARTIFACT_CACHE_MAX_BYTES and ARTIFACT_CACHE_TTL_SECONDS.
+    """
+    store = get_session_store()
+    if store == "memory":
+        return InMemoryArtifactService()
+
+    if store == "redis":
+        from ai_fashion_house.utils.redis_services import RedisArtifactService
+
+        return RedisArtifactService(get_redis_client(), ttl_seconds=_redis_ttl_seconds())
+    return FileArtifactService(
+        get_store_folder() / "artifacts",
+        cache_max_bytes=int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", DEFAULT_ARTIFACT_CACHE_MAX_BYTES)),
+        cache_ttl_seconds=float(os.getenv("ARTIFACT_CACHE_TTL_SECONDS", DEFAULT_ARTIFACT_CACHE_TTL_SECONDS)),
+        retention_seconds=get_store_retention_seconds(),
+    )
+
+
+def create_job_store() -> BaseJobStore:
+    """
+    Build the job status store for the backend selected by SESSION_STORE.
+    """
+    store = get_session_store()
+    if store == "memory":
+        return InMemoryJobStore()
+
+    if store == "redis":
+        from ai_fashion_house.utils.redis_services import RedisJobStore
+
+        return RedisJobStore(get_redis_client(), ttl_seconds=_redis_ttl_seconds())
+    return SQLiteJobStore(get_store_folder() / "jobs.db", ttl_seconds=get_store_retention_seconds() or float("inf"))
@@ -1,9 +1,14 @@
-from typing import Optional
+from typing import AsyncGenerator, Optional
 
 import aiofiles
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
 from google.adk.tools import ToolContext
 from google.genai import types
 
+from ai_fashion_house.utils.deadlines import DeadlineExceeded, degrade_or_raise, iterate_with_deadline
+
 
 async def load_image_artifact(image_path: str, tool_context: Optional[ToolContext]) -> types.Part:
     """
@@ -30,3 +35,29 @@ async def load_image_artifact(image_path: str, tool_context: Optional[ToolContex
         return types.Part(
             inline_data=types.Blob(mime_type="image/png", data=image_data)
         )
+
+
+class DeadlineAgent(BaseAgent):
+    """
+    Runs its single sub-agent as a stage bounded by a timeout and the design's deadline.
+
+    When the stage runs out of time and DEGRADABLE_STAGES allows it, the sub-agent is stopped and the agent replies
+    with a note saved under `output_key` in place of the sub-agent's output; otherwise the DeadlineExceeded is raised.
+    """
+
+    stage: str
+    """Stage name used for the timeout settings and the degradation report, e.g. "web_search"."""
+    output_key: Optional[str] = None
+    """Session state key of the sub-agent's output, filled with the note when the stage is skipped."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        try:
+            async for event in iterate_with_deadline(self.stage, self.sub_agents[0].run_async(ctx)):
+                yield event
+        except DeadlineExceeded as e:
+            degrade_or_raise(e)
+            note = f"{self.sub_agents[0].name} skipped to meet the deadline: {e.reason}"
+            event = Event(invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch, content=types.ModelContent(note))
+            if self.output_key:
+                event.actions.state_delta[self.output_key] = note
+            yield event
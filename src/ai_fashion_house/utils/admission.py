@@ -0,0 +1,225 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import os
+import time
+import typing
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from ai_fashion_house.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Concurrency limit and typical duration (seconds, used until real durations are observed) of each stage
+DEFAULT_STAGE_LIMITS = {
+    "pipeline": (8, 180.0),
+    "bigquery": (4, 10.0),
+    "imagen": (4, 20.0),
+    "veo": (2, 120.0),
+}
+DURATION_SMOOTHING = 0.2
+
+admission_wait = get_metrics_registry().histogram(
+    "admission_wait_seconds", "Time requests spent queued for a stage slot.", ("stage",)
+)
+stage_active = get_metrics_registry().gauge("admission_active", "Stage slots in use.", ("stage",))
+stage_queued = get_metrics_registry().gauge("admission_queued", "Requests waiting for a stage slot.", ("stage",))
+stage_limit = get_metrics_registry().gauge("admission_limit", "Concurrency limit of a stage.", ("stage",))
+
+
+@dataclass
+class QueueStatus:
+    """
+    Position of a waiting request in a stage queue.
+    """
+    stage: str
+    position: int
+    queue_length: int
+    active: int
+    limit: int
+    estimated_wait_seconds: float
+
+
+QueueReporter = typing.Callable[[QueueStatus], typing.Awaitable[None]]
+
+# Set by the API for the duration of a design, so stages deep inside agent tools can report queueing to the client
+queue_reporter: contextvars.ContextVar[typing.Optional[QueueReporter]] = contextvars.ContextVar(
+    "queue_reporter", default=None
+)
+
+
+class StageLimiter:
+    """
+    Concurrency limit for one pipeline stage with a strict FIFO queue: a new request never overtakes
+    one that is already waiting.
+    """
+
+    def __init__(self, name: str, limit: int, typical_duration_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.average_duration_seconds = typical_duration_seconds
+        self.active = 0
+        self.admitted = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._changed: typing.Optional[asyncio.Future] = None
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiters)
+
+    def status(self, position: int) -> QueueStatus:
+        """Describe the queue as seen by the waiter at a 1-based position."""
+        return QueueStatus(
+            stage=self.name,
+            position=position,
+            queue_length=len(self._waiters),
+            active=self.active,
+            limit=self.limit,
+            estimated_wait_seconds=round(math.ceil(position / self.limit) * self.average_duration_seconds, 1),
+        )
+
+    def _notify_changed(self) -> None:
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = None
+
+    def _wait_for_change(self) -> asyncio.Future:
+        if self._changed is None:
+            self._changed = asyncio.get_running_loop().create_future()
+        return self._changed
+
+    async def acquire(self, on_wait: typing.Optional[QueueReporter] = None) -> None:
+        """
+        Wait for a free slot, reporting the queue position each time it changes.
+
+        Args:
+            on_wait (Optional[QueueReporter]): Called with the queue status while the request waits.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            reported_position = None
+            while not waiter.done():
+                position = self._waiters.index(waiter) + 1
+                if on_wait and position != reported_position:
+                    reported_position = position
+                    await on_wait(self.status(position))
+                if not waiter.done():
+                    await asyncio.wait([waiter, self._wait_for_change()], return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over while the request was being cancelled or failing, so pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self._notify_changed()
+            raise
+        self.admitted += 1
+
+    def release(self, duration_seconds: typing.Optional[float] = None) -> None:
+        """
+        Free a slot, handing it directly to the oldest waiter if there is one.
+
+        Args:
+            duration_seconds (Optional[float]): How long the slot was held, used to estimate waits.
+        """
+        if duration_seconds is not None:
+            self.average_duration_seconds += DURATION_SMOOTHING * (duration_seconds - self.average_duration_seconds)
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+            self._notify_changed()
+        else:
+            self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, on_wait: typing.Optional[QueueReporter] = None) -> typing.AsyncIterator[None]:
+        """Hold a slot of this stage for the duration of the block."""
+        await self.acquire(on_wait)
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started_at)
+
+
+class AdmissionController:
+    """
+    Per-stage concurrency limits for the design pipeline of one worker process.
+    """
+
+    def __init__(self, stage_limits: dict[str, tuple[int, float]]):
+        self.stages = {
+            name: StageLimiter(name, limit, typical_duration) for name, (limit, typical_duration) in stage_limits.items()
+        }
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build the controller with limits from ADMISSION_MAX_<STAGE> (e.g. ADMISSION_MAX_VEO=2)."""
+        return cls({
+            name: (max(int(os.getenv(f"ADMISSION_MAX_{name.upper()}", limit)), 1), typical_duration)
+            for name, (limit, typical_duration) in DEFAULT_STAGE_LIMITS.items()
+        })
+
+    def stage(self, name: str) -> StageLimiter:
+        return self.stages[name]
+
+    def snapshot(self) -> dict[str, dict[str, typing.Any]]:
+        """Return the load of every stage, for monitoring."""
+        return {
+            name: {
+                "active": stage.active,
+                "queued": stage.queue_length,
+                "limit": stage.limit,
+                "admitted": stage.admitted,
+                "average_duration_seconds": round(stage.average_duration_seconds, 2),
+            }
+            for name, stage in self.stages.items()
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def get_admission_controller() -> AdmissionController:
+    """Return the admission controller shared by every design running in this process."""
+    return AdmissionController.from_env()
+
+
+@asynccontextmanager
+async def admission_slot(stage: str) -> typing.AsyncIterator[None]:
+    """
+    Hold a slot of a pipeline stage, reporting queueing to the reporter of the current design, if any.
+
+    Args:
+        stage (str): Stage name, e.g. "pipeline", "bigquery", "imagen" or "veo".
+    """
+    limiter = get_admission_controller().stage(stage)
+    reporter = queue_reporter.get()
+
+    async def on_wait(status: QueueStatus) -> None:
+        logger.info(f"[⏳] Waiting for {stage}: position {status.position}, ~{status.estimated_wait_seconds:.0f}s")
+        if reporter:
+            await reporter(status)
+
+    requested_at = time.monotonic()
+    async with limiter.slot(on_wait):
+        admission_wait.observe(time.monotonic() - requested_at, stage=stage)
+        yield
+
+
+def _collect_admission_metrics() -> None:
+    for name, stage in get_admission_controller().stages.items():
+        stage_active.set(stage.active, stage=name)
+        stage_queued.set(stage.queue_length, stage=name)
+        stage_limit.set(stage.limit, stage=name)
+
+
+get_metrics_registry().add_collector(_collect_admission_metrics)
@@ -0,0 +1,65 @@
+import typing
+
+
+def iter_agent_tree(root_agent: typing.Any) -> typing.Iterator[typing.Any]:
+    """
+    Yield an agent, its sub-agents and the agents wrapped by its agent tools, each once.
+
+    Args:
+        root_agent (BaseAgent): Root of the agent graph.
+
+    Returns:
+        Iterator[BaseAgent]: Every agent reachable from the root.
+    """
+    pending = [root_agent]
+    seen: set[int] = set()
+    while pending:
+        agent = pending.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        yield agent
+        pending.extend(getattr(agent, "sub_agents", None) or [])
+        for tool in getattr(agent, "tools", None) or []:
+            wrapped_agent = getattr(tool, "agent", None)
+            if wrapped_agent is not None:
+                pending.append(wrapped_agent)
+
+
+def prepend_callback(agent: typing.Any, field: str, callback: typing.Callable) -> None:
+    """
+    Put a callback first in one of an agent's callback chains, keeping the callbacks already set.
+
+    Callbacks that observe rather than alter a run go first, so a later callback that short-circuits
+    the chain cannot skip them. Adding the same callback twice has no effect.
+
+    Args:
+        agent (BaseAgent): Agent to modify.
+        field (str): Callback field, e.g. "before_agent_callback" or "after_tool_callback".
+        callback (Callable): Callback returning None.
+    """
+    existing = getattr(agent, field, None)
+    if existing is None:
+        callbacks = []
+    elif isinstance(existing, list):
+        callbacks = list(existing)
+    else:
+        callbacks = [existing]
+    if callback not in callbacks:
+        setattr(agent, field, [callback, *callbacks])
+
+
+def attach_agent_callbacks(root_agent: typing.Any, **callbacks: typing.Callable) -> None:
+    """
+    Attach observer callbacks to every agent of a graph that supports them.
+
+    Model and tool callbacks are only attached to LLM agents; workflow agents only get agent callbacks.
+
+    Args:
+        root_agent (BaseAgent): Root of the agent graph.
+        **callbacks (Callable): Callbacks keyed by field name, e.g. before_agent_callback=...
+    """
+    for agent in iter_agent_tree(root_agent):
+        for field, callback in callbacks.items():
+            if hasattr(agent, field):
+                prepend_callback(agent, field, callback)
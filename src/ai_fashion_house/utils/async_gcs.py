@@ -0,0 +1,219 @@
+import asyncio
+import functools
+import logging
+import mimetypes
+import os
+import time
+import typing
+from collections import OrderedDict
+from datetime import timedelta
+
+import aiohttp
+from google.cloud import storage
+
+from ai_fashion_house.utils.client_registry import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_DOWNLOADS = 16
+DEFAULT_SIGNED_URL_TTL = timedelta(minutes=15)
+# Signed URLs are refreshed this long before they expire so in-flight requests never use a stale URL
+SIGNED_URL_REFRESH_MARGIN = timedelta(minutes=1)
+DEFAULT_STREAM_CHUNK_SIZE = 1024 * 1024
+DEFAULT_SIGNED_URL_CACHE_SIZE = 1024
+
+
+class AsyncGCSReader:
+    """
+    Async reader for GCS objects that shares one HTTP session, caches signed URLs
+    and bounds the number of concurrent downloads.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENT_DOWNLOADS,
+        signed_url_ttl: timedelta = DEFAULT_SIGNED_URL_TTL,
+        gcs_client: typing.Optional[storage.Client] = None,
+        signed_url_cache_size: int = DEFAULT_SIGNED_URL_CACHE_SIZE,
+    ):
+        self.max_concurrency = max_concurrency
+        self.signed_url_ttl = signed_url_ttl
+        self.signed_url_cache_size = signed_url_cache_size
+        self._gcs_client = gcs_client
+        # Least recently used first
+        self._signed_urls: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._session: typing.Optional[aiohttp.ClientSession] = None
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def gcs_client(self) -> storage.Client:
+        if self._gcs_client is None:
+            self._gcs_client = get_storage_client()
+        return self._gcs_client
+
+    def _ensure_session(self) -> tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        # Sessions and semaphores are bound to an event loop, so they are recreated if the loop changes
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._discard_session()
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session, self._semaphore
+
+    def _discard_session(self) -> None:
+        session, loop = self._session, self._loop
+        self._session = None
+        if session is None or session.closed:
+            return
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            # The session's loop still runs in another thread, so it is closed there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        # The session's loop is stopped or closed, and another loop may be running in this thread, so it must not be
+        # re-entered: the session is detached from its connector, and the connector closes its pooled connections
+        # without waiting for them (a no-op once the loop is closed, which already dropped its transports)
+        connector = session.connector
+        session.detach()
+        if connector is not None:
+            connector._close()
+
+    def _sign_url(self, bucket_name: str, blob_path: str) -> str:
+        blob = self.gcs_client.bucket(bucket_name).blob(blob_path)
+        return blob.generate_signed_url(version="v4", expiration=self.signed_url_ttl, method="GET")
+
+    async def get_signed_url(self, bucket_name: str, blob_path: str) -> str:
+        """
+        Returns a signed GET URL for a blob, reusing a cached URL until shortly before it expires.
+
+        Args:
+            bucket_name (str): The GCS bucket name.
+            blob_path (str): The path to the blob in the bucket.
+
+        Returns:
+            str: A V4 signed URL.
+        """
+        key = (bucket_name, blob_path)
+        cached = self._signed_urls.get(key)
+        if cached and cached[1] > time.monotonic():
+            self._signed_urls.move_to_end(key)
+            return cached[0]
+
+        url = await asyncio.to_thread(self._sign_url, bucket_name, blob_path)
+        valid_until = time.monotonic() + (self.signed_url_ttl - SIGNED_URL_REFRESH_MARGIN).total_seconds()
+        self._signed_urls[key] = (url, valid_until)
+        self._signed_urls.move_to_end(key)
+        self._prune_signed_urls()
+        return url
+
+    def _prune_signed_urls(self) -> None:
+        if len(self._signed_urls) <= self.signed_url_cache_size:
+            return
+        now = time.monotonic()
+        for key in [key for key, (_, valid_until) in self._signed_urls.items() if valid_until <= now]:
+            del self._signed_urls[key]
+        while len(self._signed_urls) > self.signed_url_cache_size:
+            self._signed_urls.popitem(last=False)
+
+    @staticmethod
+    def _range_header(start: typing.Optional[int], end: typing.Optional[int]) -> dict[str, str]:
+        if start is None and end is None:
+            return {}
+        return {"Range": f"bytes={start or 0}-{'' if end is None else end}"}
+
+    @staticmethod
+    def _resolve_mime_type(blob_path: str, response: aiohttp.ClientResponse) -> str:
+        mime_type, _ = mimetypes.guess_type(blob_path)
+        return mime_type or response.content_type or "application/octet-stream"
+
+    async def _request(self, bucket_name: str, blob_path: str, headers: dict[str, str]) -> aiohttp.ClientResponse:
+        session, _ = self._ensure_session()
+        url = await self.get_signed_url(bucket_name, blob_path)
+        response = await session.get(url, headers=headers)
+        if response.status == 403:
+            # The cached URL may have been invalidated (e.g. rotated credentials); sign once more and retry
+            response.release()
+            self._signed_urls.pop((bucket_name, blob_path), None)
+            url = await self.get_signed_url(bucket_name, blob_path)
+            response = await session.get(url, headers=headers)
+        if response.status not in (200, 206):
+            response.release()
+            raise Exception(f"Failed to download blob gs://{bucket_name}/{blob_path}: {response.status}")
+        return response
+
+    async def read(
+        self,
+        bucket_name: str,
+        blob_path: str,
+        start: typing.Optional[int] = None,
+        end: typing.Optional[int] = None,
+    ) -> tuple[bytes, str]:
+        """
+        Downloads a blob, or an inclusive byte range of it, and returns its bytes and MIME type.
+
+        Args:
+            bucket_name (str): The GCS bucket name.
+            blob_path (str): The path to the blob in the bucket.
+            start (Optional[int]): First byte offset to read.
+            end (Optional[int]): Last byte offset to read (inclusive).
+
+        Returns:
+            tuple[bytes, str]: The media bytes and MIME type.
+        """
+        _, semaphore = self._ensure_session()
+        async with semaphore:
+            response = await self._request(bucket_name, blob_path, self._range_header(start, end))
+            async with response:
+                return await response.read(), self._resolve_mime_type(blob_path, response)
+
+    async def stream(
+        self,
+        bucket_name: str,
+        blob_path: str,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+        start: typing.Optional[int] = None,
+        end: typing.Optional[int] = None,
+    ) -> typing.AsyncIterator[bytes]:
+        """
+        Streams a blob, or an inclusive byte range of it, in chunks.
+
+        Args:
+            bucket_name (str): The GCS bucket name.
+            blob_path (str): The path to the blob in the bucket.
+            chunk_size (int): Maximum size of each yielded chunk.
+            start (Optional[int]): First byte offset to read.
+            end (Optional[int]): Last byte offset to read (inclusive).
+
+        Yields:
+            bytes: Consecutive chunks of the blob.
+        """
+        _, semaphore = self._ensure_session()
+        async with semaphore:
+            response = await self._request(bucket_name, blob_path, self._range_header(start, end))
+            async with response:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    yield chunk
+
+    async def close(self) -> None:
+        """
+        Closes the shared HTTP session.
+        """
+        if self._session and not self._session.closed:
+            if self._loop is asyncio.get_running_loop():
+                await self._session.close()
+            else:
+                self._discard_session()
+        self._session = None
+
+
+@functools.lru_cache(maxsize=1)
+def get_async_gcs_reader() -> AsyncGCSReader:
+    """
+    Returns the process-wide async GCS reader, configured from GCS_MAX_CONCURRENT_DOWNLOADS and
+    GCS_SIGNED_URL_CACHE_SIZE.
+    """
+    max_concurrency = int(os.getenv("GCS_MAX_CONCURRENT_DOWNLOADS", DEFAULT_MAX_CONCURRENT_DOWNLOADS))
+    signed_url_cache_size = int(os.getenv("GCS_SIGNED_URL_CACHE_SIZE", DEFAULT_SIGNED_URL_CACHE_SIZE))
+    return AsyncGCSReader(max_concurrency=max_concurrency, signed_url_cache_size=signed_url_cache_size)
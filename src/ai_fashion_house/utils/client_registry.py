@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+import typing
+
+from google import genai
+from google.cloud import bigquery, storage
+
+logger = logging.getLogger(__name__)
+
+ClientT = typing.TypeVar("ClientT")
+
+_clients: dict[tuple, typing.Any] = {}
+_client_init_times: dict[tuple, float] = {}
+_lock = threading.Lock()
+
+
+def _reset_registry() -> None:
+    global _lock
+    _clients.clear()
+    _client_init_times.clear()
+    _lock = threading.Lock()
+
+
+# Clients hold sockets and credentials that must not be shared with forked worker processes (no fork on Windows)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_registry)
+
+
+def _get_or_create(key: tuple, factory: typing.Callable[[], ClientT]) -> ClientT:
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        if key not in _clients:
+            started_at = time.perf_counter()
+            _clients[key] = factory()
+            _client_init_times[key] = time.perf_counter() - started_at
+            logger.info(f"[⚙️] Initialized {key[0]} client in {_client_init_times[key] * 1000:.0f} ms")
+    return _clients[key]
+
+
+def get_genai_client() -> genai.Client:
+    """
+    Returns the shared genai.Client for the current environment configuration, creating it on first use.
+
+    Returns:
+        genai.Client: An authenticated genai client.
+    """
+    from ai_fashion_house.utils.gcp_utils import get_authenticated_genai_client, use_vertexai
+
+    if use_vertexai():
+        key = ("genai", "vertexai", os.getenv("GOOGLE_CLOUD_PROJECT"), os.getenv("GOOGLE_CLOUD_LOCATION"))
+    else:
+        key = ("genai", "api_key", os.getenv("GOOGLE_API_KEY"))
+    return _get_or_create(key, get_authenticated_genai_client)
+
+
+def generate_content(caller: str, **kwargs: typing.Any) -> typing.Any:
+    """
+    Calls Gemini through the shared genai client and records the call's tokens and latency.
+
+    When the LLM response cache covers the call site (LLM_CACHE_ENABLED, LLM_CACHE_CALLERS), an identical
+    earlier request is answered from the cache and not accounted as a model call.
+
+    Args:
+        caller (str): Call site name used in usage accounting and metrics, e.g. "enhance_query".
+        **kwargs: Arguments of `client.models.generate_content` (model, contents, config).
+
+    Returns:
+        GenerateContentResponse: The model response.
+    """
+    from ai_fashion_house.utils import llm_cache
+    from ai_fashion_house.utils.metrics import record_model_usage
+
+    cache_key = None
+    if llm_cache.caching_enabled_for(caller):
+        cache_key = llm_cache.build_llm_cache_key(kwargs.get("model"), kwargs.get("contents"), kwargs.get("config"))
+        cached = llm_cache.load_cached_response(caller, cache_key)
+        if cached is not None:
+            return llm_cache.restore_generate_content_response(cached, kwargs.get("config"))
+
+    started_at = time.perf_counter()
+    response = get_genai_client().models.generate_content(**kwargs)
+    record_model_usage(caller, response.usage_metadata, time.perf_counter() - started_at, direct=True)
+    if cache_key and response.candidates:
+        llm_cache.store_response(caller, cache_key, response)
+    return response
+
+
+def get_bigquery_client(project: typing.Optional[str] = None, location: typing.Optional[str] = None) -> bigquery.Client:
+    """
+    Returns the shared BigQuery client for a project and location, creating it on first use.
+
+    Args:
+        project (Optional[str]): Google Cloud project ID; defaults to the environment's project.
+        location (Optional[str]): Default location for jobs.
+
+    Returns:
+        bigquery.Client: A BigQuery client.
+    """
+    return _get_or_create(
+        ("bigquery", project, location),
+        lambda: bigquery.Client(project=project, location=location),
+    )
+
+
+def get_storage_client(project: typing.Optional[str] = None) -> storage.Client:
+    """
+    Returns the shared Cloud Storage client for a project, creating it on first use.
+
+    Args:
+        project (Optional[str]): Google Cloud project ID; defaults to the environment's project.
+
+    Returns:
+        storage.Client: A Cloud Storage client.
+    """
+    return _get_or_create(("storage", project), lambda: storage.Client(project=project))
+
+
+def get_client_init_times() -> dict[str, float]:
+    """
+    Reports how long each initialized client took to construct.
+
+    Returns:
+        dict[str, float]: Seconds spent initializing each client, keyed by client kind and configuration.
+    """
+    # API keys are never included in the report
+    return {
+        ":".join(str(part) for part in (key[:2] if key[1] == "api_key" else key) if part is not None): seconds
+        for key, seconds in _client_init_times.items()
+    }
@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+import typing
+
+from ai_fashion_house.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+DEGRADED_STATE_KEY = "degraded_stages"
+DEFAULT_DEGRADABLE_STAGES = "veo,web_search"
+# Stages not started with less time left than this, because they could not finish anyway
+DEFAULT_STAGE_MIN_SECONDS = {"veo": 30.0}
+
+T = typing.TypeVar("T")
+
+degraded_stages_total = get_metrics_registry().counter(
+    "degraded_stages_total", "Stages skipped or cut short to meet a design deadline.", ("stage",)
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    A stage did not finish within its timeout or the design's deadline, or could not start in time.
+    """
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage} {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class DesignBudget:
+    """
+    The latency budget of one design: an optional deadline, and the stages degraded to meet it.
+    """
+
+    def __init__(self, deadline_seconds: typing.Optional[float] = None):
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.degraded: dict[str, str] = {}
+        # Stages degrade from worker threads as well as from the event loop
+        self._lock = threading.Lock()
+
+    def remaining(self) -> typing.Optional[float]:
+        """Return the seconds left before the deadline, or None without a deadline."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def degrade(self, stage: str, reason: str) -> None:
+        """Record that a stage was skipped or cut short."""
+        with self._lock:
+            self.degraded[stage] = reason
+
+    def to_dict(self) -> dict[str, str]:
+        """Return the degraded stages and the reason for each."""
+        with self._lock:
+            return dict(self.degraded)
+
+
+# Set by the API for the duration of a design; propagates into ADK agents, tools and their worker threads
+current_budget: contextvars.ContextVar[typing.Optional[DesignBudget]] = contextvars.ContextVar("current_budget", default=None)
+
+
+def get_design_deadline_seconds(requested: typing.Optional[float] = None) -> typing.Optional[float]:
+    """
+    Return the deadline of a design: the requested one, or DESIGN_DEADLINE_SECONDS (0 or unset: no deadline).
+
+    Args:
+        requested (Optional[float]): Deadline sent by the client, e.g. a short one for an interactive tier.
+
+    Returns:
+        Optional[float]: Seconds, or None for no deadline.
+    """
+    seconds = requested if requested is not None else float(os.getenv("DESIGN_DEADLINE_SECONDS", 0) or 0)
+    return seconds if seconds > 0 else None
+
+
+def _stage_env(prefix: str, stage: str) -> typing.Optional[float]:
+    value = os.getenv(f"{prefix}_{stage.upper()}", "").strip()
+    return float(value) if value else None
+
+
+def is_degradable(stage: str) -> bool:
+    """Return True if DEGRADABLE_STAGES allows the stage to be skipped to meet the deadline."""
+    stages = os.getenv("DEGRADABLE_STAGES", DEFAULT_DEGRADABLE_STAGES)
+    return stage in {name.strip() for name in stages.split(",")}
+
+
+def get_stage_timeout(stage: str) -> typing.Optional[float]:
+    """
+    Return the time a stage may take: the lower of STAGE_TIMEOUT_SECONDS_<STAGE> and the time left before the
+    design's deadline.
+
+    Args:
+        stage (str): Stage name, e.g. "veo", "bigquery", "imagen" or "web_search".
+
+    Returns:
+        Optional[float]: Seconds, or None if the stage is unbounded.
+    """
+    budget = current_budget.get()
+    limits = [_stage_env("STAGE_TIMEOUT_SECONDS", stage), budget.remaining() if budget else None]
+    limits = [limit for limit in limits if limit is not None]
+    return min(limits) if limits else None
+
+
+def _check_can_start(stage: str, timeout: typing.Optional[float]) -> None:
+    if timeout is None:
+        return
+    min_seconds = _stage_env("STAGE_MIN_SECONDS", stage)
+    min_seconds = DEFAULT_STAGE_MIN_SECONDS.get(stage, 0.0) if min_seconds is None else min_seconds
+    if timeout <= max(min_seconds, 0.0):
+        raise DeadlineExceeded(stage, f"skipped with {max(timeout, 0.0):.0f}s left (needs at least {min_seconds:.0f}s)")
+
+
+@contextlib.asynccontextmanager
+async def stage_deadline(stage: str) -> typing.AsyncIterator[None]:
+    """
+    Bound a stage by its timeout and the design's deadline; the work inside is cancelled when time is up.
+
+    Args:
+        stage (str): Stage name, e.g. "veo".
+
+    Raises:
+        DeadlineExceeded: If the stage cannot start in the time left, or does not finish in time.
+    """
+    timeout = get_stage_timeout(stage)
+    _check_can_start(stage, timeout)
+    time_limit = asyncio.timeout(timeout)
+    try:
+        async with time_limit:
+            yield
+    except TimeoutError as e:
+        # Timeouts raised by the work itself, or by a nested stage, are not this stage's
+        if not time_limit.expired():
+            raise
+        raise DeadlineExceeded(stage, f"did not finish within {timeout:.0f}s") from e
+
+
+async def iterate_with_deadline(stage: str, items: typing.AsyncIterator[T]) -> typing.AsyncIterator[T]:
+    """
+    Re-yield the items of an async iterator, such as the events of an agent run, until the stage runs out of time.
+
+    Only the wait for each item is bounded, so the time up never interrupts the consumer of an item.
+
+    Args:
+        stage (str): Stage name, e.g. "web_search".
+        items (AsyncIterator[T]): The iterator to drain.
+
+    Raises:
+        DeadlineExceeded: If the stage cannot start in the time left, or does not finish in time.
+    """
+    timeout = get_stage_timeout(stage)
+    _check_can_start(stage, timeout)
+    deadline = asyncio.get_running_loop().time() + timeout if timeout is not None else None
+    while True:
+        time_limit = asyncio.timeout_at(deadline)
+        try:
+            async with time_limit:
+                item = await anext(items)
+        except StopAsyncIteration:
+            return
+        except TimeoutError as e:
+            if not time_limit.expired():
+                raise
+            raise DeadlineExceeded(stage, f"did not finish within {timeout:.0f}s") from e
+        yield item
+
+
+def degrade_or_raise(error: DeadlineExceeded) -> None:
+    """
+    Record a stage that ran out of time as degraded if DEGRADABLE_STAGES allows it, or re-raise the error.
+
+    Args:
+        error (DeadlineExceeded): The error raised by `stage_deadline` or `iterate_with_deadline`.
+
+    Raises:
+        DeadlineExceeded: If the stage must not be degraded.
+    """
+    if not is_degradable(error.stage):
+        raise error
+    budget = current_budget.get()
+    if budget is not None:
+        budget.degrade(error.stage, error.reason)
+    degraded_stages_total.inc(stage=error.stage)
+    logger.warning(f"[⏱️] Degraded {error.stage}: {error.reason}")
@@ -1,17 +1,42 @@
+import asyncio
+import functools
 import io
+import logging
+import math
 import os
+import threading
+import time
 import typing
-from datetime import timedelta
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from urllib.parse import urlparse
 
-import aiohttp
-
 from google import genai
 from google.cloud import storage
+from google.cloud.storage.retry import DEFAULT_RETRY
 import mimetypes
 from PIL.Image import Image as PIlImage
 from PIL import Image
 
+from ai_fashion_house.utils.async_gcs import get_async_gcs_reader
+from ai_fashion_house.utils.client_registry import get_storage_client
+from ai_fashion_house.utils.metrics import timed
+from ai_fashion_house.utils.tracing import set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+# Resumable upload chunks must be a multiple of 256 KiB
+DEFAULT_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_PARALLEL_UPLOAD_THRESHOLD = 64 * 1024 * 1024
+DEFAULT_PARALLEL_UPLOAD_WORKERS = 8
+GCS_MAX_COMPOSE_SOURCES = 32
+
+MediaSource = typing.Union[bytes, str, os.PathLike]
+UploadProgressCallback = typing.Callable[[int, typing.Optional[int]], None]
+
 def use_vertexai() -> bool:
     """
     Determines whether Vertex AI is being used, based on environment configuration.
@@ -81,12 +106,14 @@ def download_media_file_from_gcs(bucket_name: str, blob_path: str) -> tuple[byte
     Returns:
         tuple[bytes, str]: A tuple containing the media bytes and its MIME type.
     """
-    client = storage.Client()
+    client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_path)
 
     # Download image bytes
-    media_bytes = blob.download_as_bytes()
+    with timed("gcs_download", {"gcs.bucket": bucket_name, "gcs.blob": blob_path}):
+        media_bytes = blob.download_as_bytes()
+        set_span_attributes({"gcs.bytes": len(media_bytes)})
 
     # Try to detect MIME type from blob name
     mime_type, _ = mimetypes.guess_type(blob_path)
@@ -102,6 +129,9 @@ async def async_download_media_file_from_gcs(bucket_name: str, blob_path: str) -
     """
     Asynchronously downloads a media file from GCS using a signed URL and returns its bytes and MIME type.
 
+    Downloads go through the shared `AsyncGCSReader`, which reuses one HTTP session, caches signed URLs
+    and bounds the number of concurrent downloads.
+
     Args:
         bucket_name (str): The GCS bucket name.
         blob_path (str): The path to the blob in the bucket.
@@ -109,49 +139,274 @@ async def async_download_media_file_from_gcs(bucket_name: str, blob_path: str) -
     Returns:
         tuple[bytes, str]: The media bytes and MIME type.
     """
-    # Create GCS client and generate signed URL
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_path)
+    async with timed("gcs_download", {"gcs.bucket": bucket_name, "gcs.blob": blob_path}):
+        media_bytes, mime_type = await get_async_gcs_reader().read(bucket_name, blob_path)
+        set_span_attributes({"gcs.bytes": len(media_bytes)})
+    return media_bytes, mime_type
 
-    url = blob.generate_signed_url(
-        version="v4",
-        expiration=timedelta(minutes=10),
-        method="GET"
-    )
+@dataclass
+class UploadStats:
+    """
+    Summary of a completed GCS upload.
+    """
+    bytes_uploaded: int
+    elapsed_seconds: float
+    num_parts: int = 1
 
-    # Try to infer MIME type
-    mime_type, _ = mimetypes.guess_type(blob_path)
-    if mime_type is None:
-        blob.reload()
-        mime_type = blob.content_type or "application/octet-stream"
+    @property
+    def throughput_mb_per_second(self) -> float:
+        return self.bytes_uploaded / (1024 ** 2) / self.elapsed_seconds if self.elapsed_seconds else 0.0
 
-    # Use aiohttp to download the file asynchronously
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to download blob: {response.status}")
-            media_bytes = await response.read()
 
-    return media_bytes, mime_type
+class _UploadProgress:
+    """
+    Thread-safe byte counter that forwards progress to an optional callback.
+    """
 
-def upload_media_file_to_gcs(
-    bucket_name: str, blob_path: str, media_bytes: bytes, mime_type: str
+    def __init__(self, total_bytes: typing.Optional[int], callback: typing.Optional[UploadProgressCallback]):
+        self.total_bytes = total_bytes
+        self.bytes_uploaded = 0
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def advance(self, num_bytes: int) -> None:
+        with self._lock:
+            self.bytes_uploaded += num_bytes
+            bytes_uploaded = self.bytes_uploaded
+        if self._callback:
+            self._callback(bytes_uploaded, self.total_bytes)
+
+
+def _get_media_size(media: MediaSource) -> int:
+    if isinstance(media, (bytes, bytearray, memoryview)):
+        return len(media)
+    return Path(media).stat().st_size
+
+
+def _iter_media_chunks(media: MediaSource, chunk_size: int, offset: int = 0, length: typing.Optional[int] = None) -> typing.Iterator[bytes]:
+    end = _get_media_size(media) if length is None else offset + length
+    if isinstance(media, (bytes, bytearray, memoryview)):
+        view = memoryview(media)
+        for position in range(offset, end, chunk_size):
+            yield bytes(view[position:min(position + chunk_size, end)])
+        return
+    with open(media, "rb") as f:
+        f.seek(offset)
+        position = offset
+        while position < end:
+            chunk = f.read(min(chunk_size, end - position))
+            if not chunk:
+                break
+            position += len(chunk)
+            yield chunk
+
+
+def _upload_resumable(
+    blob: storage.Blob,
+    chunks: typing.Iterable[bytes],
+    mime_type: str,
+    chunk_size: int,
+    progress: _UploadProgress,
 ) -> None:
+    # BlobWriter sends each chunk as a resumable-upload request and retries transient failures
+    # from the last committed offset instead of restarting the whole upload.
+    writer = blob.open("wb", content_type=mime_type, chunk_size=chunk_size, retry=DEFAULT_RETRY)
+    # The writer is only closed on success; closing it would finalize a partial object
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            progress.advance(len(chunk))
+    except BaseException:
+        _abort_writer(writer)
+        raise
+    writer.close()
+
+
+def _abort_writer(writer: typing.Any) -> None:
+    """
+    Drops a BlobWriter without finalizing the object: the resumable session is cancelled if it was started,
+    and the buffer is closed so that garbage collection does not close (and so finalize) the writer either.
     """
-    Uploads media bytes to a specified GCS bucket and blob path.
+    upload_and_transport = getattr(writer, "_upload_and_transport", None)
+    try:
+        if upload_and_transport and upload_and_transport[0].resumable_url:
+            upload, transport = upload_and_transport
+            # GCS answers 499 to a cancelled session
+            transport.request("DELETE", upload.resumable_url, timeout=30)
+    except Exception as e:
+        logger.warning(f"[⚠️] Could not cancel resumable upload session: {e}")
+    finally:
+        writer._buffer.close()
+
+
+def _upload_parallel_composite(
+    blob: storage.Blob,
+    media: MediaSource,
+    size: int,
+    mime_type: str,
+    chunk_size: int,
+    max_workers: int,
+    progress: _UploadProgress,
+) -> int:
+    part_size = max(chunk_size, math.ceil(size / GCS_MAX_COMPOSE_SOURCES))
+    part_size = math.ceil(part_size / chunk_size) * chunk_size
+    offsets = list(range(0, size, part_size))
+    part_prefix = f"{blob.name}.parts-{uuid.uuid4().hex}"
+    part_blobs = [blob.bucket.blob(f"{part_prefix}/{index:03d}") for index in range(len(offsets))]
+
+    def upload_part(index: int) -> None:
+        offset = offsets[index]
+        chunks = _iter_media_chunks(media, chunk_size, offset=offset, length=min(part_size, size - offset))
+        _upload_resumable(part_blobs[index], chunks, mime_type, chunk_size, progress)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(upload_part, range(len(part_blobs))))
+        blob.content_type = mime_type
+        blob.compose(part_blobs, retry=DEFAULT_RETRY)
+    finally:
+        blob.bucket.delete_blobs(part_blobs, on_error=lambda b: None)
+    return len(part_blobs)
+
+
+def _accept_media_bytes_keyword(func):
+    """
+    Keeps accepting the `media_bytes` keyword the upload helpers took before `media` also allowed file paths.
+    """
+    def rename(kwargs: dict) -> dict:
+        if "media_bytes" in kwargs:
+            warnings.warn(
+                f"{func.__name__}(media_bytes=...) is deprecated, use media=... instead",
+                DeprecationWarning,
+                stacklevel=3,
+            )
+            kwargs["media"] = kwargs.pop("media_bytes")
+        return kwargs
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await func(*args, **rename(kwargs))
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **rename(kwargs))
+    return wrapper
+
+
+@_accept_media_bytes_keyword
+def upload_media_file_to_gcs(
+    bucket_name: str,
+    blob_path: str,
+    media: MediaSource,
+    mime_type: str,
+    chunk_size: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+    parallel_threshold: int = DEFAULT_PARALLEL_UPLOAD_THRESHOLD,
+    max_workers: int = DEFAULT_PARALLEL_UPLOAD_WORKERS,
+    progress_callback: typing.Optional[UploadProgressCallback] = None,
+    gcs_client: typing.Optional[storage.Client] = None,
+) -> UploadStats:
+    """
+    Uploads media to a specified GCS bucket and blob path using chunked resumable uploads.
+
+    Media at or above `parallel_threshold` bytes is split into parts that upload concurrently
+    and are composed server-side into the final object.
 
     Args:
         bucket_name (str): Name of the GCS bucket.
         blob_path (str): Path to the blob (object) within the bucket.
-        media_bytes (bytes): The media file bytes to upload.
+        media (bytes | str | PathLike): The media bytes, or a path to a local media file.
         mime_type (str): The MIME type of the media file.
+        chunk_size (int): Resumable upload chunk size; must be a multiple of 256 KiB.
+        parallel_threshold (int): Minimum size in bytes for a parallel composite upload.
+        max_workers (int): Maximum number of parts uploaded concurrently.
+        progress_callback (Optional[Callable[[int, Optional[int]], None]]): Called with bytes uploaded so far and the total size.
+        gcs_client (Optional[storage.Client]): Optional GCS client.
+
+    Returns:
+        UploadStats: Bytes uploaded, elapsed time and number of parts.
     """
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_path)
+    client = gcs_client or get_storage_client()
+    blob = client.bucket(bucket_name).blob(blob_path)
+    size = _get_media_size(media)
+    progress = _UploadProgress(size, progress_callback)
+
+    started_at = time.perf_counter()
+    if size >= parallel_threshold:
+        num_parts = _upload_parallel_composite(blob, media, size, mime_type, chunk_size, max_workers, progress)
+    else:
+        _upload_resumable(blob, _iter_media_chunks(media, chunk_size), mime_type, chunk_size, progress)
+        num_parts = 1
+
+    stats = UploadStats(bytes_uploaded=progress.bytes_uploaded, elapsed_seconds=time.perf_counter() - started_at, num_parts=num_parts)
+    logger.info(
+        f"[⬆️] Uploaded gs://{bucket_name}/{blob_path}: {stats.bytes_uploaded} bytes in {stats.num_parts} part(s), "
+        f"{stats.elapsed_seconds:.2f}s ({stats.throughput_mb_per_second:.2f} MB/s)"
+    )
+    return stats
+
+
+@_accept_media_bytes_keyword
+async def async_upload_media_file_to_gcs(
+    bucket_name: str,
+    blob_path: str,
+    media: typing.Union[MediaSource, typing.AsyncIterator[bytes]],
+    mime_type: str,
+    chunk_size: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+    parallel_threshold: int = DEFAULT_PARALLEL_UPLOAD_THRESHOLD,
+    max_workers: int = DEFAULT_PARALLEL_UPLOAD_WORKERS,
+    progress_callback: typing.Optional[UploadProgressCallback] = None,
+    gcs_client: typing.Optional[storage.Client] = None,
+) -> UploadStats:
+    """
+    Asynchronously uploads media to GCS without blocking the event loop.
+
+    Bytes and file paths are delegated to `upload_media_file_to_gcs`. An async iterator of chunks
+    is streamed into a single resumable upload as it is produced, so it never has to be held in memory.
+
+    Args:
+        bucket_name (str): Name of the GCS bucket.
+        blob_path (str): Path to the blob (object) within the bucket.
+        media (bytes | str | PathLike | AsyncIterator[bytes]): The media to upload.
+        mime_type (str): The MIME type of the media file.
+        chunk_size (int): Resumable upload chunk size; must be a multiple of 256 KiB.
+        parallel_threshold (int): Minimum size in bytes for a parallel composite upload.
+        max_workers (int): Maximum number of parts uploaded concurrently.
+        progress_callback (Optional[Callable[[int, Optional[int]], None]]): Called with bytes uploaded so far and the total size, if known.
+        gcs_client (Optional[storage.Client]): Optional GCS client.
 
-    blob.upload_from_string(media_bytes, content_type=mime_type)
+    Returns:
+        UploadStats: Bytes uploaded, elapsed time and number of parts.
+    """
+    if not hasattr(media, "__aiter__"):
+        return await asyncio.to_thread(
+            upload_media_file_to_gcs, bucket_name, blob_path, media, mime_type,
+            chunk_size, parallel_threshold, max_workers, progress_callback, gcs_client,
+        )
+
+    client = gcs_client or get_storage_client()
+    blob = client.bucket(bucket_name).blob(blob_path)
+    progress = _UploadProgress(None, progress_callback)
+
+    started_at = time.perf_counter()
+    writer = blob.open("wb", content_type=mime_type, chunk_size=chunk_size, retry=DEFAULT_RETRY)
+    # The writer is only closed on success; closing it would finalize a partial object
+    try:
+        async for chunk in media:
+            await asyncio.to_thread(writer.write, chunk)
+            progress.advance(len(chunk))
+    except BaseException:
+        await asyncio.to_thread(_abort_writer, writer)
+        raise
+    await asyncio.to_thread(writer.close)
+
+    stats = UploadStats(bytes_uploaded=progress.bytes_uploaded, elapsed_seconds=time.perf_counter() - started_at)
+    logger.info(
+        f"[⬆️] Uploaded gs://{bucket_name}/{blob_path}: {stats.bytes_uploaded} bytes streamed, "
+        f"{stats.elapsed_seconds:.2f}s ({stats.throughput_mb_per_second:.2f} MB/s)"
+    )
+    return stats
 
 
 
@@ -166,10 +421,12 @@ def load_gcs_image(gs_url: str, gcs_client: storage.Client) -> typing.Optional[P
     Returns:
         Optional[PIL.Image.Image]: The downloaded image as a PIL object, or None if loading fails.
     """
-    if gcs_client:
-        gcs_client = storage.Client()
+    if gcs_client is None:
+        gcs_client = get_storage_client()
     parsed = urlparse(gs_url)
     bucket = gcs_client.bucket(parsed.netloc)
     blob = bucket.blob(parsed.path.lstrip("/"))
-    img_bytes = blob.download_as_bytes()
+    with timed("gcs_download", {"gcs.bucket": parsed.netloc, "gcs.blob": blob.name}):
+        img_bytes = blob.download_as_bytes()
+        set_span_attributes({"gcs.bytes": len(img_bytes)})
     return Image.open(io.BytesIO(img_bytes)).convert("RGB")
@@ -6,7 +6,7 @@ import typing
 from pathlib import Path
 
 from PIL.Image import Image as PILImage
-from PIL import Image, ImageOps, ImageFont, ImageDraw
+from PIL import Image, ImageOps, ImageFont, ImageDraw, ImageFilter, ImageStat
 from typing import  List
 
 from google.cloud import storage
@@ -53,6 +53,39 @@ def pil_image_to_png_bytes(image: PILImage, format: str = "PNG") -> bytes:
 
 
 
+def compute_image_sharpness(image: PILImage, max_side: int = 512) -> float:
+    """
+    Estimates image sharpness as the variance of an edge-filtered grayscale copy.
+
+    Args:
+        image (PIL.Image.Image): The image to score.
+        max_side (int): Longest side the image is downscaled to before filtering, to keep scoring cheap.
+
+    Returns:
+        float: Edge variance; higher values indicate a sharper image.
+    """
+    gray = image.convert("L")
+    gray.thumbnail((max_side, max_side), resample=Image.Resampling.BILINEAR)
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    return ImageStat.Stat(edges).var[0]
+
+
+def score_image_candidate(image: PILImage, target_aspect_ratio: float = 16 / 9) -> float:
+    """
+    Scores a generated image candidate using cheap local heuristics: sharpness weighted by aspect-ratio fit.
+
+    Args:
+        image (PIL.Image.Image): The candidate image.
+        target_aspect_ratio (float): The requested width / height ratio.
+
+    Returns:
+        float: Candidate score; higher is better.
+    """
+    aspect_ratio = image.width / image.height
+    aspect_fit = 1.0 - min(abs(aspect_ratio - target_aspect_ratio) / target_aspect_ratio, 1.0)
+    return compute_image_sharpness(image) * aspect_fit
+
+
 def add_pill_image_border_and_shadow(image: PILImage, border_size: int = 10, shadow_offset: tuple = (10, 10), shadow_blur_radius: int = 10, shadow_color: tuple = (0, 0, 0, 128)) -> Image.Image:
     """
     Adds a border and a drop shadow to the input image.
@@ -0,0 +1,90 @@
+import abc
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import typing
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+DEFAULT_JOB_TTL_SECONDS = 7 * 24 * 3600
+
+
+class JobStatus(BaseModel):
+    """
+    Status of a design run, shared by every worker so any of them can report on it.
+    """
+    session_id: str
+    user_id: str
+    status: str
+    updated_at: float = Field(default_factory=time.time)
+    worker: str = Field(default_factory=lambda: f"{socket.gethostname()}:{os.getpid()}")
+    detail: typing.Optional[dict[str, typing.Any]] = None
+
+
+class BaseJobStore(abc.ABC):
+    """
+    Stores the latest status of each design run.
+    """
+
+    @abc.abstractmethod
+    async def set_status(self, job: JobStatus) -> None:
+        """Record the latest status of a job."""
+
+    @abc.abstractmethod
+    async def get_status(self, session_id: str) -> typing.Optional[JobStatus]:
+        """Return the latest status of a job, or None if it is unknown."""
+
+
+class InMemoryJobStore(BaseJobStore):
+    """
+    Job store local to one worker process.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, JobStatus] = {}
+
+    async def set_status(self, job: JobStatus) -> None:
+        self._jobs[job.session_id] = job
+
+    async def get_status(self, session_id: str) -> typing.Optional[JobStatus]:
+        return self._jobs.get(session_id)
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    Job store in a SQLite file, shared by every worker on the same host.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, job TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def _set(self, job: JobStatus) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job.session_id, job.updated_at, job.model_dump_json())
+            )
+            self._db.execute("DELETE FROM jobs WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+
+    def _get(self, session_id: str) -> typing.Optional[JobStatus]:
+        with self._lock:
+            row = self._db.execute("SELECT job FROM jobs WHERE session_id=?", (session_id,)).fetchone()
+        return JobStatus.model_validate(json.loads(row[0])) if row else None
+
+    async def set_status(self, job: JobStatus) -> None:
+        await asyncio.to_thread(self._set, job)
+
+    async def get_status(self, session_id: str) -> typing.Optional[JobStatus]:
+        return await asyncio.to_thread(self._get, session_id)
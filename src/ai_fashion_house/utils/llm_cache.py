@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import typing
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from ai_fashion_house.utils.media_cache import CachedMedia, LocalMediaCache
+from ai_fashion_house.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LLM_CACHE_FOLDER = ".cache/llm"
+DEFAULT_LLM_CACHE_TTL_SECONDS = 24 * 3600
+DEFAULT_LLM_CACHE_MAX_BYTES = 64 * 1024 ** 2
+# Call sites whose output only depends on their input: direct calls by call site name, agent turns by agent name
+DEFAULT_LLM_CACHE_CALLERS = "enhance_query,extract_time_period,caption_image,prompt_writer_agent"
+
+llm_cache_requests = get_metrics_registry().counter(
+    "llm_cache_requests_total", "Cacheable Gemini calls, by call site and whether the response cache was hit.", ("caller", "result")
+)
+
+# Key of the ADK model call in progress in this task, set before the call and stored under after it
+_pending_key: contextvars.ContextVar[typing.Optional[tuple[str, str]]] = contextvars.ContextVar("llm_cache_pending_key", default=None)
+
+
+def llm_cache_enabled() -> bool:
+    """
+    Determines whether the LLM response cache is enabled, based on environment configuration.
+
+    Returns:
+        bool: True if LLM_CACHE_ENABLED is set to "1", False otherwise.
+    """
+    return os.getenv("LLM_CACHE_ENABLED", "").strip().lower() == "1"
+
+
+@functools.lru_cache(maxsize=1)
+def get_cached_callers() -> frozenset[str]:
+    """
+    Return the call sites and agents whose responses are cached, from LLM_CACHE_CALLERS ("*" caches every call).
+
+    Returns:
+        frozenset[str]: Direct call site names (e.g. "enhance_query") and agent names (e.g. "prompt_writer_agent").
+    """
+    callers = os.getenv("LLM_CACHE_CALLERS", DEFAULT_LLM_CACHE_CALLERS)
+    return frozenset(caller.strip() for caller in callers.split(",") if caller.strip())
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_cache() -> typing.Optional[LocalMediaCache]:
+    """
+    Resolve and return the LLM response cache, or None if caching is disabled.
+
+    Responses are stored as JSON files in LLM_CACHE_FOLDER, kept for LLM_CACHE_TTL_SECONDS and evicted in
+    least-recently-used order beyond LLM_CACHE_MAX_BYTES.
+    """
+    if not llm_cache_enabled():
+        return None
+    return LocalMediaCache(
+        Path(os.getenv("LLM_CACHE_FOLDER", DEFAULT_LLM_CACHE_FOLDER)),
+        ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_LLM_CACHE_TTL_SECONDS)),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_LLM_CACHE_MAX_BYTES)),
+    )
+
+
+def caching_enabled_for(caller: str) -> bool:
+    """Return True if the cache is enabled and covers the given call site or agent."""
+    callers = get_cached_callers()
+    return llm_cache_enabled() and ("*" in callers or caller in callers)
+
+
+def _jsonable(value: typing.Any) -> typing.Any:
+    if isinstance(value, BaseModel):
+        fields = ((name, getattr(value, name)) for name in type(value).model_fields)
+        return {name: _jsonable(item) for name, item in fields if item is not None}
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        # Response schemas given as classes: a change to the schema must not serve stale responses
+        return value.model_json_schema()
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def build_llm_cache_key(model: str, contents: typing.Any, config: typing.Any = None) -> str:
+    """
+    Builds a content-addressed cache key for a Gemini request.
+
+    Args:
+        model (str): The model identifier.
+        contents (Any): The request contents: a string, parts, contents or a list of them.
+        config (Any): The GenerateContentConfig, including system instructions, tools and response schema.
+
+    Returns:
+        str: Hex-encoded SHA-256 digest identifying the request.
+    """
+    payload = json.dumps(
+        {"model": model, "contents": _jsonable(contents), "config": _jsonable(config)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cached_response(caller: str, key: str) -> typing.Optional[dict[str, typing.Any]]:
+    """
+    Return the cached response of a request as JSON data, or None on a miss.
+
+    Args:
+        caller (str): Call site or agent name, for the hit and miss counts.
+        key (str): Key built with `build_llm_cache_key`.
+
+    Returns:
+        Optional[dict[str, Any]]: The response as dumped by `store_response`.
+    """
+    cache = get_llm_cache()
+    try:
+        cached = cache.get(key) if cache else None
+        response = json.loads(cached.data) if cached else None
+    except (OSError, ValueError) as e:
+        # An entry being written by another worker reads as a miss
+        logger.warning(f"[⚠️] Could not read LLM cache entry {key}: {e}")
+        response = None
+    llm_cache_requests.inc(caller=caller, result="hit" if response is not None else "miss")
+    if response is not None:
+        logger.info(f"[♻️] Serving {caller} response from LLM cache: {key}")
+    return response
+
+
+def store_response(caller: str, key: str, response: BaseModel) -> None:
+    """
+    Store a response under its request key; failures are logged so they never fail the call itself.
+
+    Args:
+        caller (str): Call site or agent name.
+        key (str): Key built with `build_llm_cache_key`.
+        response (BaseModel): The GenerateContentResponse or ADK LlmResponse.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return
+    try:
+        data = response.model_dump_json(exclude_none=True, exclude={"parsed"}).encode("utf-8")
+        cache.put(key, CachedMedia(data=data, mime_type="application/json", metadata={"caller": caller}))
+    except (OSError, ValueError) as e:
+        logger.warning(f"[⚠️] Could not store {caller} response in LLM cache: {e}")
+
+
+def restore_generate_content_response(data: dict[str, typing.Any], config: typing.Any = None) -> typing.Any:
+    """
+    Rebuild a cached GenerateContentResponse, parsing structured output again as the SDK does.
+
+    Args:
+        data (dict[str, Any]): The cached response.
+        config (Any): The request's GenerateContentConfig.
+
+    Returns:
+        GenerateContentResponse: The response.
+    """
+    from google.genai import types
+
+    response = types.GenerateContentResponse.model_validate(data)
+    schema = getattr(config, "response_schema", None)
+    if isinstance(schema, type) and issubclass(schema, BaseModel) and response.text:
+        response.parsed = schema.model_validate_json(response.text)
+    return response
+
+
+# --- ADK model callbacks ---
+
+async def _serve_cached_model_response(callback_context: typing.Any, llm_request: typing.Any) -> typing.Any:
+    _pending_key.set(None)
+    caller = callback_context.agent_name
+    if not caching_enabled_for(caller):
+        return None
+    from google.adk.models.llm_response import LlmResponse
+
+    key = build_llm_cache_key(llm_request.model, llm_request.contents, llm_request.config)
+    cached = await asyncio.to_thread(load_cached_response, caller, key)
+    if cached is not None:
+        return LlmResponse.model_validate(cached)
+    # The after model callbacks of this call run in the same task, so the key is found there
+    _pending_key.set((caller, key))
+    return None
+
+
+async def _store_model_response(callback_context: typing.Any, llm_response: typing.Any) -> None:
+    pending = _pending_key.get()
+    if pending is None or pending[0] != callback_context.agent_name:
+        return None
+    if llm_response.partial or llm_response.error_code or not llm_response.content:
+        return None
+    _pending_key.set(None)
+    cached = llm_response.model_copy(deep=True)
+    for part in cached.content.parts or []:
+        if part.function_call:
+            # ADK assigns call ids to responses without one, so a replayed call never reuses an id
+            part.function_call.id = None
+    await asyncio.to_thread(store_response, pending[0], pending[1], cached)
+    return None
+
+
+def cache_agent_tree(root_agent: typing.Any) -> None:
+    """
+    Attach callbacks serving the model turns of agents listed in LLM_CACHE_CALLERS from the LLM response cache.
+
+    Attach them before the observer callbacks (metrics, tracing), so that those still run first and a cached turn
+    is not accounted as a model call.
+
+    Args:
+        root_agent (BaseAgent): Root of the agent graph.
+    """
+    from ai_fashion_house.utils.agent_callbacks import attach_agent_callbacks
+
+    attach_agent_callbacks(
+        root_agent,
+        before_model_callback=_serve_cached_model_response,
+        after_model_callback=_store_model_response,
+    )
@@ -0,0 +1,244 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ai_fashion_house.utils.client_registry import get_storage_client
+from ai_fashion_house.utils.gcp_utils import parse_gcs_uri
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEDIA_CACHE_URI = ".cache/media"
+DEFAULT_MEDIA_CACHE_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MEDIA_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+@dataclass
+class CachedMedia:
+    """
+    A media file stored in the cache together with the metadata recorded at generation time.
+    """
+    data: bytes
+    mime_type: str
+    metadata: dict = field(default_factory=dict)
+
+
+def build_media_cache_key(
+    model_id: str,
+    prompt: str,
+    config: typing.Optional[dict] = None,
+    image_hash: typing.Optional[str] = None,
+) -> str:
+    """
+    Builds a content-addressed cache key for a media generation request.
+
+    Args:
+        model_id (str): The generation model identifier.
+        prompt (str): The text prompt sent to the model.
+        config (Optional[dict]): Generation config values that influence the output.
+        image_hash (Optional[str]): Hash of the input image, if any.
+
+    Returns:
+        str: Hex-encoded SHA-256 digest identifying the request.
+    """
+    payload = json.dumps(
+        {
+            "model_id": model_id,
+            "prompt": prompt.strip(),
+            "config": config or {},
+            "image_hash": image_hash,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LocalMediaCache:
+    """
+    Media cache stored as files in a local folder, evicted by TTL and least-recently-used order.
+    """
+
+    def __init__(self, folder: Path, ttl_seconds: int, max_bytes: int):
+        self.folder = Path(folder)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.folder / f"{key}.bin", self.folder / f"{key}.json"
+
+    def _delete(self, key: str) -> None:
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        # Readers, including other workers, see either no file or the complete one, never a partial write
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _created_at(self, key: str) -> float:
+        try:
+            return json.loads(self._paths(key)[1].read_text()).get("created_at", 0)
+        except (OSError, ValueError):
+            return 0
+
+    def get(self, key: str) -> typing.Optional[CachedMedia]:
+        """
+        Returns the cached media for a key, or None if missing or expired.
+        """
+        data_path, meta_path = self._paths(key)
+        if not data_path.exists() or not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        if time.time() - meta.get("created_at", 0) > self.ttl_seconds:
+            logger.info(f"[🗑️] Media cache entry expired: {key}")
+            self._delete(key)
+            return None
+        # Touch the entry so size-based eviction keeps recently used media
+        os.utime(data_path)
+        return CachedMedia(data=data_path.read_bytes(), mime_type=meta["mime_type"], metadata=meta.get("metadata", {}))
+
+    def put(self, key: str, media: CachedMedia) -> None:
+        """
+        Stores media under a key and evicts old entries to respect the size limit.
+        """
+        data_path, meta_path = self._paths(key)
+        # The metadata is written last: an entry is only served once both files exist
+        self._write_atomic(data_path, media.data)
+        self._write_atomic(meta_path, json.dumps({
+            "created_at": time.time(),
+            "mime_type": media.mime_type,
+            "metadata": media.metadata,
+        }, default=str).encode("utf-8"))
+        self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        entries = []
+        for data_path in self.folder.glob("*.bin"):
+            try:
+                stat = data_path.stat()
+            except FileNotFoundError:
+                continue
+            # The access time is refreshed on every hit, so expiry goes by the creation time recorded in the metadata
+            if now - self._created_at(data_path.stem) > self.ttl_seconds:
+                logger.info(f"[🗑️] Media cache entry expired: {data_path.stem}")
+                self._delete(data_path.stem)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, data_path.stem))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            logger.info(f"[🗑️] Evicting media cache entry: {key}")
+            self._delete(key)
+            total_bytes -= size
+
+
+class GCSMediaCache:
+    """
+    Media cache stored as objects under a GCS prefix, evicted by TTL and oldest-first order.
+    """
+
+    def __init__(self, gcs_uri: str, ttl_seconds: int, max_bytes: int):
+        bucket_name, prefix = parse_gcs_uri(gcs_uri.rstrip("/") + "/")
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.bucket = get_storage_client().bucket(bucket_name)
+
+    def get(self, key: str) -> typing.Optional[CachedMedia]:
+        """
+        Returns the cached media for a key, or None if missing or expired.
+        """
+        blob = self.bucket.get_blob(f"{self.prefix}{key}")
+        if blob is None:
+            return None
+        meta = blob.metadata or {}
+        if time.time() - float(meta.get("created_at", 0)) > self.ttl_seconds:
+            logger.info(f"[🗑️] Media cache entry expired: {key}")
+            blob.delete()
+            return None
+        return CachedMedia(
+            data=blob.download_as_bytes(),
+            mime_type=blob.content_type or "application/octet-stream",
+            metadata=json.loads(meta.get("metadata", "{}")),
+        )
+
+    def put(self, key: str, media: CachedMedia) -> None:
+        """
+        Stores media under a key and evicts old entries to respect the size limit.
+        """
+        blob = self.bucket.blob(f"{self.prefix}{key}")
+        blob.metadata = {
+            "created_at": str(time.time()),
+            "metadata": json.dumps(media.metadata, default=str),
+        }
+        blob.upload_from_string(media.data, content_type=media.mime_type)
+        self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        blobs = []
+        for blob in self.bucket.list_blobs(prefix=self.prefix):
+            if now - float((blob.metadata or {}).get("created_at", 0)) > self.ttl_seconds:
+                logger.info(f"[🗑️] Media cache entry expired: {blob.name}")
+                blob.delete()
+                continue
+            blobs.append(blob)
+        blobs.sort(key=lambda b: b.time_created)
+        total_bytes = sum(blob.size or 0 for blob in blobs)
+        for blob in blobs:
+            if total_bytes <= self.max_bytes:
+                break
+            logger.info(f"[🗑️] Evicting media cache entry: {blob.name}")
+            blob.delete()
+            total_bytes -= blob.size or 0
+
+
+MediaCache = typing.Union[LocalMediaCache, GCSMediaCache]
+
+
+def media_cache_enabled() -> bool:
+    """
+    Determines whether the generated media cache is enabled, based on environment configuration.
+
+    Returns:
+        bool: True if MEDIA_CACHE_ENABLED is set to "1", False otherwise.
+    """
+    return os.getenv("MEDIA_CACHE_ENABLED", "").strip().lower() == "1"
+
+
+@functools.lru_cache(maxsize=1)
+def get_media_cache() -> typing.Optional[MediaCache]:
+    """
+    Resolve and return the configured media cache, or None if caching is disabled.
+
+    MEDIA_CACHE_URI selects the backend: a `gs://bucket/prefix` URI stores entries in GCS,
+    anything else is treated as a local folder. MEDIA_CACHE_TTL_SECONDS and MEDIA_CACHE_MAX_BYTES
+    bound how long and how much media is kept.
+    """
+    if not media_cache_enabled():
+        return None
+
+    cache_uri = os.getenv("MEDIA_CACHE_URI", DEFAULT_MEDIA_CACHE_URI)
+    ttl_seconds = int(os.getenv("MEDIA_CACHE_TTL_SECONDS", DEFAULT_MEDIA_CACHE_TTL_SECONDS))
+    max_bytes = int(os.getenv("MEDIA_CACHE_MAX_BYTES", DEFAULT_MEDIA_CACHE_MAX_BYTES))
+
+    if cache_uri.startswith("gs://"):
+        return GCSMediaCache(cache_uri, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+    return LocalMediaCache(Path(cache_uri), ttl_seconds=ttl_seconds, max_bytes=max_bytes)
@@ -0,0 +1,438 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from ai_fashion_house.utils.agent_callbacks import attach_agent_callbacks
+from ai_fashion_house.utils.tracing import SpanAttributes, start_span
+from ai_fashion_house.utils.usage import current_tools, current_usage, token_counts
+
+logger = logging.getLogger(__name__)
+
+METRICS_NAMESPACE = "ai_fashion_house"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) spanning sub-second model calls up to multi-minute Veo renders
+DEFAULT_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# Agent and tool runs whose end was never observed (e.g. the run failed) are forgotten past this many
+MAX_PENDING_TIMINGS = 1024
+
+LabelValues = tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names: tuple[str, ...], label_values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, typing.Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> typing.Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, e.g. of calls or errors.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: typing.Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[LabelValues, float] = {} if self.label_names else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> typing.Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down, e.g. queue depth or in-flight sessions.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: typing.Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[LabelValues, float] = {} if self.label_names else {(): 0.0}
+
+    def set(self, value: float, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: typing.Any) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> typing.Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, e.g. stage latencies.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def _samples(self) -> typing.Iterator[str]:
+        with self._lock:
+            counts = {key: list(values) for key, values in self._counts.items()}
+            sums = dict(self._sums)
+        for key, bucket_counts in counts.items():
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets, bucket_counts):
+                cumulative += count
+                bucket_label = f'le="{_format_value(upper_bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, bucket_label)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(sums[key])}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Metrics of one worker process, rendered in the Prometheus text exposition format.
+
+    Values owned by other components (queue depths, coalescing counters) are pulled by collectors
+    right before rendering, so those components do not have to push every change.
+    """
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE):
+        self.namespace = namespace
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[typing.Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric_type: type, name: str, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        full_name = f"{self.namespace}_{name}"
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = metric_type(full_name, *args, **kwargs)
+            elif not isinstance(metric, metric_type):
+                raise ValueError(f"Metric {full_name} is already registered as a {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: typing.Sequence[str] = ()) -> Counter:
+        """Return the counter with this name, registering it on first use."""
+        return self._register(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: typing.Sequence[str] = ()) -> Gauge:
+        """Return the gauge with this name, registering it on first use."""
+        return self._register(Gauge, name, documentation, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram with this name, registering it on first use."""
+        return self._register(Histogram, name, documentation, label_names, buckets)
+
+    def add_collector(self, collector: typing.Callable[[], None]) -> None:
+        """
+        Register a function that refreshes gauges from another component before every render.
+
+        Args:
+            collector (Callable[[], None]): Sets gauge values; failures are logged and skipped.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"[⚠️] Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the metrics registry shared by every component of this process."""
+    return _registry
+
+
+stage_duration = _registry.histogram(
+    "stage_duration_seconds",
+    "Latency of pipeline stages (query enhancement, BigQuery, downloads, Imagen, Veo, ...).",
+    ("stage", "outcome"),
+)
+agent_duration = _registry.histogram(
+    "agent_duration_seconds", "Latency of ADK agent runs.", ("agent", "outcome")
+)
+tool_duration = _registry.histogram(
+    "tool_duration_seconds", "Latency of ADK tool calls.", ("tool", "outcome")
+)
+
+
+def _outcome(exc_type: typing.Optional[type]) -> str:
+    if exc_type is None:
+        return "ok"
+    if issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    return "error"
+
+
+def observe_stage(stage: str, duration_seconds: float, outcome: str = "ok") -> None:
+    """
+    Record one run of a pipeline stage.
+
+    Args:
+        stage (str): Stage name, e.g. "enhance_query" or "bigquery_search".
+        duration_seconds (float): How long the stage took.
+        outcome (str): "ok", "error" or "cancelled".
+    """
+    stage_duration.observe(duration_seconds, stage=stage, outcome=outcome)
+
+
+class StageTimer:
+    """
+    Times a block as a pipeline stage and traces it as a span; usable with `with` (including in worker
+    threads) and `async with`. The outcome is "error" or "cancelled" when the block raises.
+    """
+
+    def __init__(self, stage: str, attributes: typing.Optional[SpanAttributes] = None):
+        self.stage = stage
+        self.attributes = attributes
+        self._started_at = 0.0
+        self._span: typing.Optional[typing.ContextManager] = None
+
+    def __enter__(self) -> "StageTimer":
+        self._span = start_span(self.stage, self.attributes)
+        self._span.__enter__()
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        observe_stage(self.stage, time.perf_counter() - self._started_at, _outcome(exc_type))
+        self._span.__exit__(exc_type, exc, tb)
+        return False
+
+    async def __aenter__(self) -> "StageTimer":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return self.__exit__(exc_type, exc, tb)
+
+
+def timed(stage: str, attributes: typing.Optional[SpanAttributes] = None) -> StageTimer:
+    """
+    Time a block of code as a pipeline stage.
+
+    Args:
+        stage (str): Stage name, e.g. "enhance_query" or "imagen_generate".
+        attributes (Optional[Mapping[str, Any]]): Attributes of the stage's span, e.g. the model id.
+
+    Returns:
+        StageTimer: Context manager recording the block's latency, outcome and span.
+    """
+    return StageTimer(stage, attributes)
+
+
+# --- Model usage ---
+
+model_calls = _registry.counter("model_calls_total", "Gemini calls by calling agent or call site.", ("caller",))
+model_tokens = _registry.counter(
+    "model_tokens_total", "Gemini tokens by calling agent or call site.", ("caller", "direction")
+)
+model_call_duration = _registry.histogram(
+    "model_call_duration_seconds", "Latency of Gemini calls by calling agent or call site.", ("caller",)
+)
+
+
+def record_model_usage(caller: str, usage_metadata: typing.Any, seconds: float, direct: bool = False) -> None:
+    """
+    Record the tokens and latency of one Gemini call, in the metrics and in the current design's usage ledger.
+
+    Args:
+        caller (str): Agent name, or the call site name for direct calls (e.g. "enhance_query").
+        usage_metadata (Optional[GenerateContentResponseUsageMetadata]): Usage reported with the response.
+        seconds (float): Latency of the call.
+        direct (bool): True for `generate_content` calls made outside of an agent turn.
+    """
+    input_tokens, output_tokens = token_counts(usage_metadata)
+    model_calls.inc(caller=caller)
+    model_tokens.inc(input_tokens, caller=caller, direction="input")
+    model_tokens.inc(output_tokens, caller=caller, direction="output")
+    model_call_duration.observe(seconds, caller=caller)
+    ledger = current_usage.get()
+    if ledger is not None:
+        ledger.record_model_call(caller, input_tokens, output_tokens, seconds, direct=direct, tools=current_tools.get())
+
+
+# --- ADK agent, model and tool timing ---
+
+_pending_timings: "OrderedDict[tuple[str, ...], tuple[float, typing.Any]]" = OrderedDict()
+_pending_lock = threading.Lock()
+
+
+def _start_timing(key: tuple[str, ...], payload: typing.Any = None) -> None:
+    with _pending_lock:
+        _pending_timings[key] = (time.perf_counter(), payload)
+        while len(_pending_timings) > MAX_PENDING_TIMINGS:
+            _pending_timings.popitem(last=False)
+
+
+def _stop_timing(key: tuple[str, ...]) -> typing.Optional[tuple[float, typing.Any]]:
+    with _pending_lock:
+        pending = _pending_timings.pop(key, None)
+    if pending is None:
+        return None
+    started_at, payload = pending
+    return time.perf_counter() - started_at, payload
+
+
+def _agent_key(callback_context: typing.Any, kind: str = "agent") -> tuple[str, ...]:
+    return kind, callback_context.invocation_id, callback_context.agent_name
+
+
+def _tool_key(tool: typing.Any, tool_context: typing.Any) -> tuple[str, ...]:
+    return "tool", tool_context.invocation_id, tool_context.function_call_id or "", tool.name
+
+
+def _start_agent_timing(callback_context: typing.Any) -> None:
+    _start_timing(_agent_key(callback_context))
+    return None
+
+
+def _stop_agent_timing(callback_context: typing.Any) -> None:
+    timing = _stop_timing(_agent_key(callback_context))
+    if timing is not None:
+        duration, _ = timing
+        agent_duration.observe(duration, agent=callback_context.agent_name, outcome="ok")
+        ledger = current_usage.get()
+        if ledger is not None:
+            ledger.record_agent_run(callback_context.agent_name, duration)
+    return None
+
+
+def _start_model_timing(callback_context: typing.Any, llm_request: typing.Any) -> None:
+    _start_timing(_agent_key(callback_context, "model"))
+    return None
+
+
+def _stop_model_timing(callback_context: typing.Any, llm_response: typing.Any) -> None:
+    if getattr(llm_response, "partial", False):
+        return None
+    timing = _stop_timing(_agent_key(callback_context, "model"))
+    duration = timing[0] if timing is not None else 0.0
+    record_model_usage(callback_context.agent_name, getattr(llm_response, "usage_metadata", None), duration)
+    return None
+
+
+def _start_tool_timing(tool: typing.Any, args: dict, tool_context: typing.Any) -> None:
+    enclosing_tools = current_tools.get()
+    _start_timing(_tool_key(tool, tool_context), enclosing_tools)
+    current_tools.set((*enclosing_tools, tool.name))
+    return None
+
+
+def _stop_tool_timing(tool: typing.Any, args: dict, tool_context: typing.Any, tool_response: typing.Any) -> None:
+    timing = _stop_timing(_tool_key(tool, tool_context))
+    if timing is not None:
+        duration, enclosing_tools = timing
+        current_tools.set(enclosing_tools)
+        # Tools report failures as {"status": "error", ...} rather than raising
+        is_error = isinstance(tool_response, dict) and tool_response.get("status") == "error"
+        tool_duration.observe(duration, tool=tool.name, outcome="error" if is_error else "ok")
+        ledger = current_usage.get()
+        if ledger is not None:
+            ledger.record_tool_call(tool.name, duration)
+    return None
+
+
+def instrument_agent_tree(root_agent: typing.Any) -> None:
+    """
+    Attach timing and usage callbacks to an agent, its sub-agents and the agents wrapped by its agent tools.
+
+    Safe to call more than once; each callback is only added once per agent.
+
+    Args:
+        root_agent (BaseAgent): Root of the agent graph.
+    """
+    attach_agent_callbacks(
+        root_agent,
+        before_agent_callback=_start_agent_timing,
+        after_agent_callback=_stop_agent_timing,
+        before_model_callback=_start_model_timing,
+        after_model_callback=_stop_model_timing,
+        before_tool_callback=_start_tool_timing,
+        after_tool_callback=_stop_tool_timing,
+    )
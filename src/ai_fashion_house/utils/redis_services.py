@@ -0,0 +1,318 @@
+import copy
+import json
+import time
+import typing
+import uuid
+
+from google.adk.artifacts import BaseArtifactService
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.genai import types
+
+from ai_fashion_house.utils.job_store import BaseJobStore, JobStatus
+
+try:
+    from redis import asyncio as aioredis
+    from redis.exceptions import WatchError
+except ImportError as e:  # pragma: no cover - depends on the optional "redis" extra
+    raise ImportError(
+        "SESSION_STORE=redis requires the redis package: pip install 'ai-fashion-house[redis]'"
+    ) from e
+
+DEFAULT_REDIS_KEY_PREFIX = "ai-fashion-house"
+
+
+def _split_state_delta(delta: dict[str, typing.Any]) -> tuple[dict, dict, dict]:
+    app_delta, user_delta, session_delta = {}, {}, {}
+    for key, value in delta.items():
+        if key.startswith(State.APP_PREFIX):
+            app_delta[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_delta[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_delta[key] = value
+    return app_delta, user_delta, session_delta
+
+
+def _merge_state(app_state: dict, user_state: dict, session_state: dict) -> dict:
+    merged = copy.deepcopy(session_state)
+    merged.update({State.APP_PREFIX + key: value for key, value in app_state.items()})
+    merged.update({State.USER_PREFIX + key: value for key, value in user_state.items()})
+    return merged
+
+
+class RedisSessionService(BaseSessionService):
+    """
+    Session service backed by Redis, shared by workers on any number of hosts.
+
+    Sessions are stored as JSON documents with their events in a Redis list; app- and user-scoped
+    state is stored separately, mirroring ADK's DatabaseSessionService.
+    """
+
+    def __init__(self, client: "aioredis.Redis", key_prefix: str = DEFAULT_REDIS_KEY_PREFIX, ttl_seconds: typing.Optional[int] = None):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _session_key(self, app_name: str, user_id: str, session_id: str) -> str:
+        return f"{self.key_prefix}:session:{app_name}:{user_id}:{session_id}"
+
+    def _index_key(self, app_name: str, user_id: str) -> str:
+        return f"{self.key_prefix}:sessions:{app_name}:{user_id}"
+
+    def _app_state_key(self, app_name: str) -> str:
+        return f"{self.key_prefix}:app_state:{app_name}"
+
+    def _user_state_key(self, app_name: str, user_id: str) -> str:
+        return f"{self.key_prefix}:user_state:{app_name}:{user_id}"
+
+    async def _load_json(self, key: str, client: typing.Any = None) -> dict:
+        raw = await (client or self.client).get(key)
+        return json.loads(raw) if raw else {}
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: typing.Optional[dict[str, typing.Any]] = None,
+        session_id: typing.Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_state_delta(state or {})
+        app_state = {**await self._load_json(self._app_state_key(app_name)), **app_delta}
+        user_state = {**await self._load_json(self._user_state_key(app_name, user_id)), **user_delta}
+        now = time.time()
+
+        key = self._session_key(app_name, user_id, session_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(key, json.dumps({"state": session_state, "last_update_time": now}), ex=self.ttl_seconds)
+            pipe.sadd(self._index_key(app_name, user_id), session_id)
+            if app_delta:
+                pipe.set(self._app_state_key(app_name), json.dumps(app_state))
+            if user_delta:
+                pipe.set(self._user_state_key(app_name, user_id), json.dumps(user_state))
+            await pipe.execute()
+
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=_merge_state(app_state, user_state, session_state),
+            last_update_time=now,
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: typing.Optional[GetSessionConfig] = None,
+    ) -> typing.Optional[Session]:
+        key = self._session_key(app_name, user_id, session_id)
+        stored = await self._load_json(key)
+        if not stored:
+            return None
+
+        events = [Event.model_validate_json(raw) for raw in await self.client.lrange(f"{key}:events", 0, -1)]
+        if config and config.after_timestamp:
+            events = [event for event in events if event.timestamp >= config.after_timestamp]
+        if config and config.num_recent_events:
+            events = events[-config.num_recent_events:]
+
+        app_state = await self._load_json(self._app_state_key(app_name))
+        user_state = await self._load_json(self._user_state_key(app_name, user_id))
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=_merge_state(app_state, user_state, stored["state"]),
+            events=events,
+            last_update_time=stored["last_update_time"],
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        sessions = []
+        for raw_id in await self.client.smembers(self._index_key(app_name, user_id)):
+            session_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            stored = await self._load_json(self._session_key(app_name, user_id, session_id))
+            if stored:
+                sessions.append(Session(
+                    app_name=app_name, user_id=user_id, id=session_id, state={},
+                    last_update_time=stored["last_update_time"],
+                ))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = self._session_key(app_name, user_id, session_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key, f"{key}:events")
+            pipe.srem(self._index_key(app_name, user_id), session_id)
+            await pipe.execute()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        key = self._session_key(session.app_name, session.user_id, session.id)
+        app_delta, user_delta, session_delta = {}, {}, {}
+        if event.actions and event.actions.state_delta:
+            app_delta, user_delta, session_delta = _split_state_delta(event.actions.state_delta)
+        app_state_key = self._app_state_key(session.app_name)
+        user_state_key = self._user_state_key(session.app_name, session.user_id)
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # The write is only applied if none of the keys read below changed in the meantime,
+                    # so two workers appending at once can never drop each other's state delta
+                    await pipe.watch(key, app_state_key, user_state_key)
+                    stored = await self._load_json(key, pipe)
+                    if not stored:
+                        raise ValueError(f"Session {session.id} not found.")
+                    if stored["last_update_time"] > session.last_update_time:
+                        raise ValueError(f"Session {session.id} was updated by another worker; reload it before appending events.")
+                    app_state = {**await self._load_json(app_state_key, pipe), **app_delta} if app_delta else None
+                    user_state = {**await self._load_json(user_state_key, pipe), **user_delta} if user_delta else None
+
+                    pipe.multi()
+                    pipe.rpush(f"{key}:events", event.model_dump_json(exclude_none=True))
+                    pipe.set(
+                        key,
+                        json.dumps({"state": {**stored["state"], **session_delta}, "last_update_time": event.timestamp}),
+                        ex=self.ttl_seconds,
+                    )
+                    if self.ttl_seconds:
+                        pipe.expire(f"{key}:events", self.ttl_seconds)
+                    if app_state is not None:
+                        pipe.set(app_state_key, json.dumps(app_state))
+                    if user_state is not None:
+                        pipe.set(user_state_key, json.dumps(user_state))
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    # Another worker wrote first; read again, which fails the stale check if it was this session
+                    continue
+
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        return event
+
+
+class RedisArtifactService(BaseArtifactService):
+    """
+    Artifact service backed by Redis, shared by workers on any number of hosts.
+    """
+
+    def __init__(self, client: "aioredis.Redis", key_prefix: str = DEFAULT_REDIS_KEY_PREFIX, ttl_seconds: typing.Optional[int] = None):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _scope_key(self, app_name: str, user_id: str, session_id: str) -> str:
+        return f"{self.key_prefix}:artifacts:{app_name}:{user_id}:{session_id}"
+
+    def _artifact_key(self, app_name: str, user_id: str, session_id: str, filename: str) -> str:
+        # Filenames prefixed with "user:" are shared by all sessions of a user, as in ADK's built-in services
+        scope = "user" if filename.startswith("user:") else session_id
+        return f"{self._scope_key(app_name, user_id, scope)}:{filename}"
+
+    async def save_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str, artifact: types.Part
+    ) -> int:
+        key = self._artifact_key(app_name, user_id, session_id, filename)
+        version = await self.client.incr(f"{key}:next_version") - 1
+        if artifact.inline_data:
+            mapping = {"mime_type": artifact.inline_data.mime_type, "data": artifact.inline_data.data, "is_text": 0}
+        else:
+            mapping = {"mime_type": "text/plain", "data": (artifact.text or "").encode("utf-8"), "is_text": 1}
+        scope = "user" if filename.startswith("user:") else session_id
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(f"{key}:{version}", mapping=mapping)
+            pipe.rpush(f"{key}:versions", version)
+            pipe.sadd(self._scope_key(app_name, user_id, scope), filename)
+            if self.ttl_seconds:
+                for suffix in (f":{version}", ":versions", ":next_version"):
+                    pipe.expire(f"{key}{suffix}", self.ttl_seconds)
+                pipe.expire(self._scope_key(app_name, user_id, scope), self.ttl_seconds)
+            await pipe.execute()
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: typing.Optional[int] = None,
+    ) -> typing.Optional[types.Part]:
+        key = self._artifact_key(app_name, user_id, session_id, filename)
+        if version is None:
+            latest = await self.client.lindex(f"{key}:versions", -1)
+            if latest is None:
+                return None
+            version = int(latest)
+        stored = await self.client.hgetall(f"{key}:{version}")
+        if not stored:
+            return None
+        stored = {k.decode() if isinstance(k, bytes) else k: v for k, v in stored.items()}
+        if int(stored["is_text"]):
+            return types.Part(text=stored["data"].decode("utf-8"))
+        mime_type = stored["mime_type"]
+        return types.Part.from_bytes(
+            data=stored["data"], mime_type=mime_type.decode() if isinstance(mime_type, bytes) else mime_type
+        )
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: str) -> list[str]:
+        filenames = set()
+        for scope in (session_id, "user"):
+            for raw in await self.client.smembers(self._scope_key(app_name, user_id, scope)):
+                filenames.add(raw.decode() if isinstance(raw, bytes) else raw)
+        return sorted(filenames)
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        key = self._artifact_key(app_name, user_id, session_id, filename)
+        versions = await self.client.lrange(f"{key}:versions", 0, -1)
+        scope = "user" if filename.startswith("user:") else session_id
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(f"{key}:versions", f"{key}:next_version", *(f"{key}:{int(v)}" for v in versions))
+            pipe.srem(self._scope_key(app_name, user_id, scope), filename)
+            await pipe.execute()
+
+    async def list_versions(self, *, app_name: str, user_id: str, session_id: str, filename: str) -> list[int]:
+        key = self._artifact_key(app_name, user_id, session_id, filename)
+        return [int(v) for v in await self.client.lrange(f"{key}:versions", 0, -1)]
+
+
+class RedisJobStore(BaseJobStore):
+    """
+    Job store backed by Redis, shared by workers on any number of hosts.
+    """
+
+    def __init__(self, client: "aioredis.Redis", key_prefix: str = DEFAULT_REDIS_KEY_PREFIX, ttl_seconds: typing.Optional[int] = None):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+
+    async def set_status(self, job: JobStatus) -> None:
+        await self.client.set(f"{self.key_prefix}:job:{job.session_id}", job.model_dump_json(), ex=self.ttl_seconds)
+
+    async def get_status(self, session_id: str) -> typing.Optional[JobStatus]:
+        raw = await self.client.get(f"{self.key_prefix}:job:{session_id}")
+        return JobStatus.model_validate_json(raw) if raw else None
+
+
+def create_redis_client(redis_url: str) -> "aioredis.Redis":
+    """
+    Create an async Redis client for a redis:// URL.
+
+    Args:
+        redis_url (str): Connection URL of a Redis-compatible server.
+
+    Returns:
+        redis.asyncio.Redis: A client that returns raw bytes, as required for artifact data.
+    """
+    return aioredis.Redis.from_url(redis_url, decode_responses=False)
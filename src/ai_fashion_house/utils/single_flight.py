@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import typing
+import unicodedata
+from dataclasses import dataclass, field
+
+from ai_fashion_house.utils.admission import QueueReporter, QueueStatus, queue_reporter
+from ai_fashion_house.utils.deadlines import current_budget
+from ai_fashion_house.utils.metrics import get_metrics_registry
+from ai_fashion_house.utils.usage import UsageLedger, current_usage
+
+logger = logging.getLogger(__name__)
+
+ResultT = typing.TypeVar("ResultT")
+
+single_flight_requests = get_metrics_registry().counter(
+    "single_flight_requests_total", "Stage requests, by whether they ran the work or joined a run in flight.", ("stage", "result")
+)
+single_flight_in_flight = get_metrics_registry().gauge("single_flight_in_flight", "Shared stage runs currently in flight.")
+
+# Set to False by the API for designs that asked for unique generations
+single_flight_enabled: contextvars.ContextVar[bool] = contextvars.ContextVar("single_flight_enabled", default=True)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so trivially different spellings of the same request share a key.
+
+    Args:
+        prompt (str): The prompt as typed or generated.
+
+    Returns:
+        str: The prompt with unicode compatibility forms folded, case folded, whitespace collapsed
+        and trailing punctuation removed.
+    """
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(".!?;, ")
+
+
+@dataclass
+class _Call:
+    usage: UsageLedger = field(default_factory=UsageLedger)
+    reporters: list[QueueReporter] = field(default_factory=list)
+    task: typing.Optional[asyncio.Task] = None
+    waiters: int = 0
+
+    async def report_queue(self, status: QueueStatus) -> None:
+        # Every design waiting for the shared run sees where it is queued
+        results = await asyncio.gather(*(report(status) for report in list(self.reporters)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"[⚠️] Could not report queue status of shared {status.stage} run: {result}")
+
+    async def run(self, work: typing.Callable[[], typing.Awaitable[ResultT]]) -> ResultT:
+        # The run keeps the first caller's trace context, but accounts its cost to its own ledger, reports queueing
+        # to every waiter and is not bound to one design's deadline: each waiter enforces its own
+        current_usage.set(self.usage)
+        queue_reporter.set(self.report_queue)
+        current_budget.set(None)
+        return await work()
+
+
+class SingleFlight:
+    """
+    Runs identical in-flight work once and shares its result with every caller that asks for it
+    while it is still running.
+
+    The work runs in its own task: a caller that is cancelled leaves it running for the others,
+    and it is only cancelled when no caller is left waiting for it. Its model usage is added to the
+    ledger of every caller that receives the result, and its queue positions are reported to all of them.
+    """
+
+    def __init__(self):
+        self.executed: dict[str, int] = {}
+        self.coalesced: dict[str, int] = {}
+        self._calls: dict[typing.Hashable, _Call] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: typing.Hashable, work: typing.Callable[[], typing.Awaitable[ResultT]], stage: str = "") -> ResultT:
+        """
+        Run `work` unless identical work is already in flight, then return its result.
+
+        Args:
+            key (Hashable): Identifies the work; callers with equal keys share one execution.
+            work (Callable[[], Awaitable]): Produces the result. Results are shared, so they should not be mutated.
+            stage (str): Stage name used in counters and logs.
+
+        Returns:
+            The result of the shared execution.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call()
+            call.task = asyncio.create_task(call.run(work))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._calls.pop(key, None) if self._calls.get(key) is call else None)
+            self.executed[stage] = self.executed.get(stage, 0) + 1
+            single_flight_requests.inc(stage=stage, result="executed")
+        else:
+            self.coalesced[stage] = self.coalesced.get(stage, 0) + 1
+            single_flight_requests.inc(stage=stage, result="coalesced")
+            logger.info(f"[🔗] Joining in-flight {stage or 'work'} instead of running it again")
+
+        reporter, ledger = queue_reporter.get(), current_usage.get()
+        if reporter is not None:
+            call.reporters.append(reporter)
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if reporter is not None:
+                call.reporters.remove(reporter)
+            if ledger is not None and call.task.done():
+                ledger.merge(call.usage)
+            if call.waiters == 0 and not call.task.done():
+                # Unregister first so a caller arriving now starts a fresh run instead of joining a cancelled one
+                if self._calls.get(key) is call:
+                    self._calls.pop(key)
+                call.task.cancel()
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the coalescing registry shared by every design running in this process."""
+    return _single_flight
+
+
+def _collect_single_flight_metrics() -> None:
+    single_flight_in_flight.set(_single_flight.in_flight)
+
+
+get_metrics_registry().add_collector(_collect_single_flight_metrics)
+
+
+async def coalesce(
+    stage: str,
+    prompt: str,
+    work: typing.Callable[[], typing.Awaitable[ResultT]],
+    *key_parts: typing.Hashable,
+    enabled: bool = True,
+) -> ResultT:
+    """
+    Run a pipeline stage once for every concurrent design with the same normalized prompt and parameters.
+
+    Coalescing is skipped when `enabled` is False, when the current design opted out, or when
+    SINGLE_FLIGHT_ENABLED is set to 0.
+
+    Args:
+        stage (str): Stage name, part of the key, e.g. "met_retrieval", "imagen" or "veo".
+        prompt (str): Prompt driving the stage; normalized before keying.
+        work (Callable[[], Awaitable]): Produces the stage result.
+        *key_parts (Hashable): Any other parameters that change the result.
+        enabled (bool): Set to False to always run the work, e.g. when a fresh variation is required.
+
+    Returns:
+        The stage result, possibly shared with other designs.
+    """
+    if (
+        not enabled
+        or not single_flight_enabled.get()
+        or os.getenv("SINGLE_FLIGHT_ENABLED", "1").strip().lower() in ("0", "false", "no")
+    ):
+        return await work()
+    return await _single_flight.do((stage, normalize_prompt(prompt), *key_parts), work, stage=stage)
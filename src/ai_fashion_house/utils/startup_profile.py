@@ -0,0 +1,94 @@
+import re
+import subprocess
+import sys
+import typing
+from dataclasses import dataclass
+
+from rich.console import Console
+from rich.table import Table
+
+DEFAULT_PROFILED_MODULES = [
+    "ai_fashion_house.cli",
+    "ai_fashion_house.web.app",
+    "ai_fashion_house.agents.marketing_agent.agent",
+    "ai_fashion_house.create_rag",
+]
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+@dataclass
+class ImportTiming:
+    """
+    Import cost of a single module as reported by `python -X importtime`.
+    """
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_module_imports(module: str) -> list[ImportTiming]:
+    """
+    Imports a module in a fresh interpreter with `-X importtime` and parses the timings.
+
+    Args:
+        module (str): Dotted module path to import.
+
+    Returns:
+        list[ImportTiming]: One timing per imported module, in import order.
+
+    Raises:
+        RuntimeError: If the module fails to import.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings.append(ImportTiming(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {result.stderr.strip().splitlines()[-1]}")
+    return timings
+
+
+def print_import_time_report(modules: typing.Optional[list[str]] = None, top: int = 10) -> None:
+    """
+    Prints the total import time of each module and the slowest top-level imports it triggers.
+
+    Args:
+        modules (Optional[list[str]]): Modules to profile; defaults to the CLI, web app, agent graph and RAG setup.
+        top (int): Number of slowest imports to list per module.
+    """
+    console = Console()
+    for module in modules or DEFAULT_PROFILED_MODULES:
+        try:
+            timings = profile_module_imports(module)
+        except RuntimeError as e:
+            console.print(f"[red]{e}[/red]")
+            continue
+
+        packages = {".".join(module.split(".")[:i]) for i in range(1, module.count(".") + 2)}
+        total = sum(t.cumulative_us for t in timings if t.depth == 0 and t.module in packages)
+        table = Table(title=f"{module} — {total / 1000:.0f} ms")
+        table.add_column("Import")
+        table.add_column("Cumulative (ms)", justify="right")
+        table.add_column("Self (ms)", justify="right")
+        # Child entries are printed before their parent, so direct imports of the module and its
+        # parent packages are the depth-1 entries preceding each of their depth-0 lines
+        direct_imports, pending = [], []
+        for timing in timings:
+            if timing.depth == 1:
+                pending.append(timing)
+            elif timing.depth == 0:
+                if timing.module in packages:
+                    direct_imports.extend(pending)
+                pending = []
+        for timing in sorted(direct_imports, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+            table.add_row(timing.module, f"{timing.cumulative_us / 1000:.1f}", f"{timing.self_us / 1000:.1f}")
+        console.print(table)
@@ -0,0 +1,138 @@
+import logging
+import time
+import typing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+T = typing.TypeVar("T")
+
+
+@dataclass
+class Step:
+    """
+    A step of a setup graph: it runs once all the steps it depends on have finished.
+    """
+    name: str
+    run: typing.Callable[[dict[str, typing.Any]], typing.Any]
+    """Called with the results of the steps finished so far; returns the step's result."""
+    depends_on: tuple[str, ...] = ()
+    skip_if: typing.Optional[typing.Callable[[], bool]] = None
+    """Returns True if the step's outputs already exist and are up to date; a skipped step's result is None."""
+
+
+def _check_graph(steps: list[Step]) -> None:
+    names = {step.name for step in steps}
+    if len(names) != len(steps):
+        raise ValueError("Step names must be unique")
+    for step in steps:
+        unknown = set(step.depends_on) - names
+        if unknown:
+            raise ValueError(f"Step {step.name} depends on unknown steps: {', '.join(sorted(unknown))}")
+    # Every step must become runnable once the ones before it have run, or the graph has a cycle
+    done: set[str] = set()
+    pending = list(steps)
+    while pending:
+        runnable = [step for step in pending if set(step.depends_on) <= done]
+        if not runnable:
+            raise ValueError(f"Steps have circular dependencies: {', '.join(step.name for step in pending)}")
+        done.update(step.name for step in runnable)
+        pending = [step for step in pending if step.name not in done]
+
+
+def run_step_graph(
+    steps: list[Step],
+    max_workers: int = 4,
+    on_step_done: typing.Optional[typing.Callable[[str, bool], None]] = None,
+) -> dict[str, typing.Any]:
+    """
+    Run steps in dependency order, running the steps that do not depend on each other concurrently.
+
+    When a step fails, no further steps are started; the ones already running are waited for and the error is raised.
+
+    Args:
+        steps (list[Step]): The steps of the graph.
+        max_workers (int): Maximum number of steps running at the same time.
+        on_step_done (Optional[Callable[[str, bool], None]]): Called with the name of every finished step and
+            whether it was skipped, e.g. to advance a progress bar.
+
+    Returns:
+        dict[str, Any]: The result of every step, by name.
+
+    Raises:
+        ValueError: If a step depends on an unknown step or the dependencies are circular.
+    """
+    _check_graph(steps)
+    results: dict[str, typing.Any] = {}
+    pending = list(steps)
+    running: dict[Future, Step] = {}
+    error: typing.Optional[BaseException] = None
+
+    def run_step(step: Step, finished_results: dict[str, typing.Any]) -> tuple[typing.Any, bool]:
+        if step.skip_if is not None and step.skip_if():
+            logger.info(f"[⏭️] Skipping step {step.name}: already up to date")
+            return None, True
+        started = time.monotonic()
+        result = step.run(finished_results)
+        logger.info(f"[✅] Step {step.name} finished in {time.monotonic() - started:.1f}s")
+        return result, False
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        while pending or running:
+            if error is None:
+                for step in [step for step in pending if all(name in results for name in step.depends_on)]:
+                    pending.remove(step)
+                    running[executor.submit(run_step, step, dict(results))] = step
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                try:
+                    results[step.name], skipped = future.result()
+                except Exception as e:
+                    logger.error(f"[❌] Step {step.name} failed: {e}")
+                    error = error or e
+                    continue
+                if on_step_done:
+                    on_step_done(step.name, skipped)
+
+    if error is not None:
+        raise error
+    return results
+
+
+def wait_until_ready(
+    probe: typing.Callable[[], T],
+    description: str,
+    is_not_ready: typing.Callable[[Exception], bool],
+    timeout: float = 300.0,
+    interval: float = 5.0,
+) -> T:
+    """
+    Call a probe until it stops failing with a "not ready yet" error, e.g. while IAM grants propagate.
+
+    Args:
+        probe (Callable[[], T]): The call to retry; often the step's work itself.
+        description (str): What is being waited for, for the logs.
+        is_not_ready (Callable[[Exception], bool]): Whether an error means "retry later" rather than a failure.
+        timeout (float): Seconds to wait before giving up.
+        interval (float): Seconds between attempts, doubled after each one up to a minute.
+
+    Returns:
+        T: The result of the first successful call.
+
+    Raises:
+        Exception: The probe's error, if it is not a "not ready" one or the timeout is reached.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return probe()
+        except Exception as e:
+            if not is_not_ready(e) or time.monotonic() + interval > deadline:
+                raise
+            logger.info(f"[⏳] Waiting for {description}: {e}")
+        time.sleep(interval)
+        interval = min(interval * 2, 60.0)
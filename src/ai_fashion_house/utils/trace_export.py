@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import threading
+import typing
+from pathlib import Path
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+logger = logging.getLogger(__name__)
+
+WATERFALL_WIDTH = 40
+
+
+def get_trace_file() -> Path:
+    """Return the JSON lines file spans are written to, from TRACE_FILE (default: OUTPUT_FOLDER/traces.jsonl)."""
+    return Path(os.getenv("TRACE_FILE", Path(os.getenv("OUTPUT_FOLDER", "outputs")) / "traces.jsonl"))
+
+
+def span_to_dict(span: ReadableSpan) -> dict[str, typing.Any]:
+    """
+    Convert a finished span to a JSON-serializable record.
+
+    Args:
+        span (ReadableSpan): The finished span.
+
+    Returns:
+        dict[str, Any]: Trace, span and parent ids as hex, name, timing, status and attributes.
+    """
+    span_context = span.get_span_context()
+    return {
+        "trace_id": format(span_context.trace_id, "032x"),
+        "span_id": format(span_context.span_id, "016x"),
+        "parent_span_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "name": span.name,
+        "start_time_unix_nano": span.start_time,
+        "end_time_unix_nano": span.end_time,
+        "duration_ms": round((span.end_time - span.start_time) / 1e6, 3),
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+        "events": [{"name": event.name, "attributes": dict(event.attributes or {})} for event in span.events],
+        "resource": dict(span.resource.attributes),
+    }
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """
+    Appends finished spans to a JSON lines file, one span per line.
+
+    Every worker appends to the same file; each batch is written in a single call so lines do not interleave.
+    """
+
+    def __init__(self, path: typing.Union[str, os.PathLike]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: typing.Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(span_to_dict(span), default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as trace_file:
+                trace_file.write(lines)
+        except OSError as e:
+            logger.warning(f"[⚠️] Could not write spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def create_span_exporter(name: str) -> SpanExporter:
+    """
+    Create the span exporter selected by TRACE_EXPORTER.
+
+    Args:
+        name (str): "json" for a local JSON lines file (TRACE_FILE), or "otlp" for an OTLP/HTTP collector
+            configured with the standard OTEL_EXPORTER_OTLP_* variables.
+
+    Returns:
+        SpanExporter: The exporter.
+
+    Raises:
+        ImportError: If "otlp" is selected but the OTLP exporter is not installed.
+        ValueError: If the exporter name is not supported.
+    """
+    if name == "json":
+        return JsonFileSpanExporter(get_trace_file())
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError as e:
+            raise ImportError(
+                "TRACE_EXPORTER=otlp requires the OTLP exporter; install it with `pip install \"ai-fashion-house[tracing]\"`."
+            ) from e
+        return OTLPSpanExporter()
+    raise ValueError(f"Unsupported span exporter '{name}'.")
+
+
+def load_traces(path: typing.Union[str, os.PathLike]) -> dict[str, list[dict[str, typing.Any]]]:
+    """
+    Read spans written by `JsonFileSpanExporter`, grouped by trace.
+
+    Args:
+        path (Union[str, PathLike]): The JSON lines file.
+
+    Returns:
+        dict[str, list[dict]]: Spans of each trace id, in start order.
+    """
+    traces: dict[str, list[dict[str, typing.Any]]] = {}
+    with open(path, encoding="utf-8") as trace_file:
+        for line in trace_file:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span["trace_id"], []).append(span)
+    for spans in traces.values():
+        spans.sort(key=lambda span: span["start_time_unix_nano"])
+    return traces
+
+
+def _trace_bounds(spans: list[dict[str, typing.Any]]) -> tuple[int, int]:
+    return min(s["start_time_unix_nano"] for s in spans), max(s["end_time_unix_nano"] for s in spans)
+
+
+def _ordered_with_depth(spans: list[dict[str, typing.Any]]) -> list[tuple[dict[str, typing.Any], int]]:
+    span_ids = {span["span_id"] for span in spans}
+    children: dict[typing.Optional[str], list[dict[str, typing.Any]]] = {}
+    for span in spans:
+        # Spans whose parent was not exported (e.g. still running) are shown as roots
+        parent_id = span["parent_span_id"] if span["parent_span_id"] in span_ids else None
+        children.setdefault(parent_id, []).append(span)
+
+    ordered = []
+    pending = [(span, 0) for span in reversed(children.get(None, []))]
+    while pending:
+        span, depth = pending.pop()
+        ordered.append((span, depth))
+        pending.extend((child, depth + 1) for child in reversed(children.get(span["span_id"], [])))
+    return ordered
+
+
+def print_trace_list(path: typing.Union[str, os.PathLike], limit: int = 20) -> None:
+    """
+    Print the most recent traces of a JSON lines trace file with their root span and duration.
+
+    Args:
+        path (Union[str, PathLike]): The JSON lines file.
+        limit (int): Number of traces to list.
+    """
+    traces = load_traces(path)
+    table = Table(title=f"Traces in {path}")
+    table.add_column("Trace id")
+    table.add_column("Root span")
+    table.add_column("Session")
+    table.add_column("Spans", justify="right")
+    table.add_column("Duration (s)", justify="right")
+    recent = sorted(traces.items(), key=lambda item: _trace_bounds(item[1])[0], reverse=True)[:limit]
+    for trace_id, spans in recent:
+        start, end = _trace_bounds(spans)
+        root = _ordered_with_depth(spans)[0][0]
+        table.add_row(
+            trace_id, escape(root["name"]), str(root["attributes"].get("session.id", "")), str(len(spans)), f"{(end - start) / 1e9:.2f}"
+        )
+    Console().print(table)
+
+
+def print_trace_waterfall(path: typing.Union[str, os.PathLike], trace_id: typing.Optional[str] = None) -> None:
+    """
+    Print the spans of one trace as a waterfall, showing where the time of a design went.
+
+    Args:
+        path (Union[str, PathLike]): The JSON lines file.
+        trace_id (Optional[str]): Trace id or a prefix of it; defaults to the most recent trace.
+
+    Raises:
+        ValueError: If no trace matches.
+    """
+    traces = load_traces(path)
+    if trace_id:
+        matches = [spans for candidate, spans in traces.items() if candidate.startswith(trace_id)]
+    else:
+        matches = sorted(traces.values(), key=lambda spans: _trace_bounds(spans)[0])[-1:]
+    if len(matches) != 1:
+        raise ValueError(f"Expected one trace matching '{trace_id or 'latest'}' in {path}, found {len(matches)}.")
+
+    spans = matches[0]
+    trace_start, trace_end = _trace_bounds(spans)
+    total = max(trace_end - trace_start, 1)
+    table = Table(title=f"Trace {spans[0]['trace_id']} — {total / 1e9:.2f} s")
+    table.add_column("Span")
+    table.add_column("Start (s)", justify="right")
+    table.add_column("Duration (s)", justify="right")
+    table.add_column("Timeline")
+    for span, depth in _ordered_with_depth(spans):
+        offset = span["start_time_unix_nano"] - trace_start
+        duration = span["end_time_unix_nano"] - span["start_time_unix_nano"]
+        bar_start = int(offset / total * WATERFALL_WIDTH)
+        bar_length = max(int(duration / total * WATERFALL_WIDTH), 1)
+        style = "red" if span["status"] == "ERROR" else "cyan"
+        table.add_row(
+            "  " * depth + escape(span["name"]),
+            f"{offset / 1e9:.2f}",
+            f"{duration / 1e9:.2f}",
+            " " * bar_start + f"[{style}]{'█' * bar_length}[/{style}]",
+        )
+    Console().print(table)
@@ -0,0 +1,169 @@
+import contextlib
+import logging
+import os
+import threading
+import typing
+
+from ai_fashion_house.utils.agent_callbacks import attach_agent_callbacks
+
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = "ai_fashion_house"
+TRACE_EXPORTERS = ("none", "json", "otlp")
+
+# Set once tracing is configured; until then spans are no-ops and OpenTelemetry is never imported
+_provider: typing.Any = None
+_provider_lock = threading.Lock()
+
+SpanAttributes = typing.Mapping[str, typing.Any]
+
+
+def get_trace_exporter_name() -> str:
+    """Return the span exporter selected by TRACE_EXPORTER ("none", "json" or "otlp")."""
+    return os.getenv("TRACE_EXPORTER", "none").strip().lower() or "none"
+
+
+def configure_tracing(service_name: str = "ai-fashion-house") -> bool:
+    """
+    Install a tracer provider exporting spans as selected by TRACE_EXPORTER.
+
+    ADK already creates spans for invocations, agent runs, LLM calls and tool calls; once a provider
+    is installed they are exported together with the pipeline stage spans of this package.
+
+    Args:
+        service_name (str): Service name recorded on every span.
+
+    Returns:
+        bool: True if tracing is enabled.
+
+    Raises:
+        ValueError: If TRACE_EXPORTER names an unsupported exporter.
+    """
+    global _provider
+    exporter_name = get_trace_exporter_name()
+    if exporter_name == "none":
+        return False
+    if exporter_name not in TRACE_EXPORTERS:
+        raise ValueError(f"Unsupported TRACE_EXPORTER '{exporter_name}'; expected one of {TRACE_EXPORTERS}.")
+
+    with _provider_lock:
+        if _provider is None:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from ai_fashion_house.utils.trace_export import create_span_exporter
+
+            provider = TracerProvider(resource=Resource.create({
+                "service.name": service_name,
+                "process.pid": os.getpid(),
+            }))
+            provider.add_span_processor(BatchSpanProcessor(create_span_exporter(exporter_name)))
+            trace.set_tracer_provider(provider)
+            _provider = provider
+            logger.info(f"[🧭] Tracing enabled, exporting spans with the '{exporter_name}' exporter")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop the exporter."""
+    global _provider
+    with _provider_lock:
+        provider, _provider = _provider, None
+    if provider is not None:
+        provider.shutdown()
+
+
+def tracing_enabled() -> bool:
+    """Return True once `configure_tracing` has installed an exporter."""
+    return _provider is not None
+
+
+def _clean_attributes(attributes: typing.Optional[SpanAttributes]) -> dict[str, typing.Any]:
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in (attributes or {}).items()
+        if value is not None
+    }
+
+
+def start_span(name: str, attributes: typing.Optional[SpanAttributes] = None) -> typing.ContextManager:
+    """
+    Open a span as a child of the current one, for the duration of a `with` block.
+
+    Works in worker threads started with `asyncio.to_thread`, which inherit the caller's span.
+
+    Args:
+        name (str): Span name, e.g. "bigquery_search".
+        attributes (Optional[Mapping[str, Any]]): Span attributes; None values are skipped.
+
+    Returns:
+        ContextManager: The span context, or a no-op when tracing is disabled.
+    """
+    if _provider is None:
+        return contextlib.nullcontext()
+    from opentelemetry import trace
+
+    return trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=_clean_attributes(attributes))
+
+
+def set_span_attributes(attributes: SpanAttributes) -> None:
+    """
+    Add attributes to the current span, e.g. a BigQuery job id once the job is created.
+
+    Args:
+        attributes (Mapping[str, Any]): Span attributes; None values are skipped.
+    """
+    if _provider is None:
+        return
+    from opentelemetry import trace
+
+    trace.get_current_span().set_attributes(_clean_attributes(attributes))
+
+
+def current_trace_id() -> typing.Optional[str]:
+    """Return the id of the current trace as 32 hex digits, or None outside a trace."""
+    if _provider is None:
+        return None
+    from opentelemetry import trace
+
+    span_context = trace.get_current_span().get_span_context()
+    return format(span_context.trace_id, "032x") if span_context.is_valid else None
+
+
+# --- ADK callbacks annotating the spans ADK creates ---
+
+def _annotate_agent_span(callback_context: typing.Any) -> None:
+    set_span_attributes({"adk.agent": callback_context.agent_name, "adk.invocation_id": callback_context.invocation_id})
+    return None
+
+
+def _annotate_model_span(callback_context: typing.Any, llm_response: typing.Any) -> None:
+    usage = getattr(llm_response, "usage_metadata", None)
+    set_span_attributes({
+        "adk.agent": callback_context.agent_name,
+        "gen_ai.usage.input_tokens": getattr(usage, "prompt_token_count", None),
+        "gen_ai.usage.output_tokens": getattr(usage, "candidates_token_count", None),
+    })
+    return None
+
+
+def _annotate_tool_span(tool: typing.Any, args: dict, tool_context: typing.Any, tool_response: typing.Any) -> None:
+    if isinstance(tool_response, dict):
+        set_span_attributes({"tool.status": tool_response.get("status")})
+    return None
+
+
+def trace_agent_tree(root_agent: typing.Any) -> None:
+    """
+    Attach callbacks that add the agent name, invocation id, token usage and tool status to ADK's spans.
+
+    Args:
+        root_agent (BaseAgent): Root of the agent graph.
+    """
+    attach_agent_callbacks(
+        root_agent,
+        before_agent_callback=_annotate_agent_span,
+        after_model_callback=_annotate_model_span,
+        after_tool_callback=_annotate_tool_span,
+    )
@@ -0,0 +1,142 @@
+import contextvars
+import threading
+import typing
+from dataclasses import asdict, dataclass
+
+USAGE_STATE_KEY = "usage"
+
+
+@dataclass
+class UsageEntry:
+    """
+    Accumulated cost of one agent, tool or direct Gemini call site within a design.
+    """
+    runs: int = 0
+    wall_seconds: float = 0.0
+    model_calls: int = 0
+    model_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {**asdict(self), "wall_seconds": round(self.wall_seconds, 3), "model_seconds": round(self.model_seconds, 3)}
+
+
+class UsageLedger:
+    """
+    Token, model call and wall time accounting of one design, per agent, per tool and per direct Gemini call site.
+
+    Model calls made while a tool runs (including those of agents wrapped by an agent tool) also count
+    towards that tool, so the totals only sum agents and direct calls.
+    """
+
+    def __init__(self):
+        self.agents: dict[str, UsageEntry] = {}
+        self.tools: dict[str, UsageEntry] = {}
+        self.direct_calls: dict[str, UsageEntry] = {}
+        # Direct calls are recorded from worker threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(entries: dict[str, UsageEntry], name: str) -> UsageEntry:
+        entry = entries.get(name)
+        if entry is None:
+            entry = entries[name] = UsageEntry()
+        return entry
+
+    def record_agent_run(self, agent: str, wall_seconds: float) -> None:
+        with self._lock:
+            entry = self._entry(self.agents, agent)
+            entry.runs += 1
+            entry.wall_seconds += wall_seconds
+
+    def record_tool_call(self, tool: str, wall_seconds: float) -> None:
+        with self._lock:
+            entry = self._entry(self.tools, tool)
+            entry.runs += 1
+            entry.wall_seconds += wall_seconds
+
+    def record_model_call(
+        self,
+        caller: str,
+        input_tokens: int,
+        output_tokens: int,
+        seconds: float,
+        direct: bool = False,
+        tools: typing.Sequence[str] = (),
+    ) -> None:
+        """
+        Record one Gemini call.
+
+        Args:
+            caller (str): Agent name, or the call site name for direct calls (e.g. "enhance_query").
+            input_tokens (int): Prompt tokens.
+            output_tokens (int): Response tokens, including thinking tokens.
+            seconds (float): Latency of the call.
+            direct (bool): True for `generate_content` calls made outside of an agent turn.
+            tools (Sequence[str]): Tools running when the call was made, outermost first.
+        """
+        with self._lock:
+            entries = [self._entry(self.direct_calls if direct else self.agents, caller)]
+            entries.extend(self._entry(self.tools, tool) for tool in tools)
+            for entry in entries:
+                entry.model_calls += 1
+                entry.model_seconds += seconds
+                entry.input_tokens += input_tokens
+                entry.output_tokens += output_tokens
+            if direct:
+                entries[0].runs += 1
+                entries[0].wall_seconds += seconds
+
+    def merge(self, other: "UsageLedger") -> None:
+        """Add the usage recorded by another ledger, e.g. of work shared with other designs."""
+        with other._lock:
+            sections = [
+                (name, {key: UsageEntry(**asdict(entry)) for key, entry in entries.items()})
+                for name, entries in (("agents", other.agents), ("tools", other.tools), ("direct_calls", other.direct_calls))
+            ]
+        with self._lock:
+            for name, entries in sections:
+                for key, entry in entries.items():
+                    total = self._entry(getattr(self, name), key)
+                    for field, value in asdict(entry).items():
+                        setattr(total, field, getattr(total, field) + value)
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        """Return the totals and the per agent, tool and direct call breakdown as JSON-serializable data."""
+        with self._lock:
+            billed = [*self.agents.values(), *self.direct_calls.values()]
+            return {
+                "totals": {
+                    "model_calls": sum(entry.model_calls for entry in billed),
+                    "input_tokens": sum(entry.input_tokens for entry in billed),
+                    "output_tokens": sum(entry.output_tokens for entry in billed),
+                    "model_seconds": round(sum(entry.model_seconds for entry in billed), 3),
+                },
+                "agents": {name: entry.to_dict() for name, entry in self.agents.items()},
+                "tools": {name: entry.to_dict() for name, entry in self.tools.items()},
+                "direct_calls": {name: entry.to_dict() for name, entry in self.direct_calls.items()},
+            }
+
+
+# Set by the API for the duration of a design; agent callbacks and direct calls record into it
+current_usage: contextvars.ContextVar[typing.Optional[UsageLedger]] = contextvars.ContextVar("current_usage", default=None)
+# Tools running in this task, outermost first, so model calls they trigger are attributed to each of them
+current_tools: contextvars.ContextVar[tuple[str, ...]] = contextvars.ContextVar("current_tools", default=())
+
+
+def token_counts(usage_metadata: typing.Any) -> tuple[int, int]:
+    """
+    Extract input and output token counts from Gemini usage metadata.
+
+    Args:
+        usage_metadata (Optional[GenerateContentResponseUsageMetadata]): Usage reported with a response.
+
+    Returns:
+        tuple[int, int]: Prompt tokens, and response plus thinking tokens (both billed as output).
+    """
+    if usage_metadata is None:
+        return 0, 0
+    input_tokens = usage_metadata.prompt_token_count or 0
+    output_tokens = (usage_metadata.candidates_token_count or 0) + (getattr(usage_metadata, "thoughts_token_count", None) or 0)
+    return input_tokens, output_tokens
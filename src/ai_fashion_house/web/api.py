@@ -1,26 +1,68 @@
+from __future__ import annotations
+
+import asyncio
 import base64
 import logging
+import time
 import os
+import sys
 import traceback
+import typing
 import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 
 from dotenv import load_dotenv, find_dotenv
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from google.adk.agents import BaseAgent
-from google.adk.runners import InMemoryRunner
-from google.adk.events.event import Event as ADKEvent
-from google.genai import types
-from ai_fashion_house.agents.marketing_agent.agent import root_agent
+from fastapi.responses import StreamingResponse
+
+from ai_fashion_house.utils.admission import QueueStatus, admission_slot, queue_reporter
+from ai_fashion_house.utils.deadlines import DEGRADED_STATE_KEY, DesignBudget, current_budget, get_design_deadline_seconds
+from ai_fashion_house.utils.metrics import PROMETHEUS_CONTENT_TYPE, get_metrics_registry, observe_stage, timed
+from ai_fashion_house.utils.single_flight import single_flight_enabled
+from ai_fashion_house.utils.tracing import (
+    configure_tracing,
+    current_trace_id,
+    set_span_attributes,
+    shutdown_tracing,
+    start_span,
+)
+from ai_fashion_house.utils.usage import USAGE_STATE_KEY, UsageLedger, current_usage
+from ai_fashion_house.web.artifact_urls import (
+    ArtifactRef,
+    InvalidArtifactToken,
+    etag_matches,
+    load_artifact_content,
+    parse_range_header,
+    sign_artifact_token,
+    verify_artifact_token,
+)
+from ai_fashion_house.web.outbound import OutboundQueue
+from ai_fashion_house.web.runner import RunnerManager
+
+if typing.TYPE_CHECKING:
+    from google.adk.runners import Runner
+    from google.adk.events.event import Event as ADKEvent
+    from google.genai import types
 
 # Load environment variables
 load_dotenv(find_dotenv())
-APP_NAME = os.getenv("APP_NAME", str(uuid.uuid4()))
+APP_NAME = os.getenv("APP_NAME", "ai-fashion-house")
+# Time left to a design past its deadline for the final turns after a degraded stage, before it is stopped
+DESIGN_DEADLINE_GRACE_SECONDS = float(os.getenv("DESIGN_DEADLINE_GRACE_SECONDS", 30))
+# CSV artifacts up to this size are also sent inline: the prebuilt UI bundle in web/static still reads them from "content"
+INLINE_CSV_MAX_BYTES = int(os.getenv("INLINE_CSV_MAX_BYTES", 256 * 1024))
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AI-Fashion-API")
 
+# Per-process metrics; with several workers, each one is scraped separately
+websocket_connections = get_metrics_registry().gauge("websocket_connections", "Open websocket connections.")
+designs_in_flight = get_metrics_registry().gauge("designs_in_flight", "Design sessions queued or running.")
+designs_finished = get_metrics_registry().counter("designs_total", "Design sessions by final status.", ("status",))
+
 # Initialize FastAPI app
 api = FastAPI(root_path="/api", lifespan=lambda app: lifespan(app))
 api.add_middleware(
@@ -29,21 +71,32 @@ api.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Accept-Ranges", "Content-Length", "Content-Range", "ETag"],
 )
 
 
+@asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for FastAPI."""
     logger.info("🚀 Starting Gemini Live Avatar API")
+    configure_tracing(APP_NAME)
+    app.state.runner_manager = RunnerManager(APP_NAME)
+    if os.getenv("PRELOAD_AGENTS", "").strip().lower() == "1":
+        await app.state.runner_manager.get_runner()
     yield
+    # Only close the GCS reader if a request loaded it; importing it here would pull in the cloud SDKs
+    if "ai_fashion_house.utils.async_gcs" in sys.modules:
+        from ai_fashion_house.utils.async_gcs import get_async_gcs_reader
+        await get_async_gcs_reader().close()
+    shutdown_tracing()
     logger.info("🛑 Shutting down Gemini Live Avatar API")
 
 
-async def create_adk_session(root_agent: BaseAgent, user_id: str, session_id: str) -> InMemoryRunner:
-    """Initialize an ADK session with a runner."""
-    runner = InMemoryRunner(agent=root_agent, app_name=APP_NAME)
-    await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
-    return runner
+def build_user_content(prompt: str) -> types.Content:
+    """Wrap a user prompt as ADK message content."""
+    from google.genai import types
+
+    return types.Content(role="user", parts=[types.Part(text=prompt)])
 
 
 @api.get("/")
@@ -52,18 +105,107 @@ async def root() -> dict[str, str]:
     return {"message": "AI Fashion House API is running!"}
 
 
+@api.get("/metrics")
+async def metrics() -> Response:
+    """Expose stage latencies, queue depths and in-flight sessions of this worker in the Prometheus text format."""
+    return Response(content=get_metrics_registry().render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api.get("/jobs/{session_id}")
+async def get_job(session_id: str, request: Request) -> dict[str, typing.Any]:
+    """Return the latest status of a design run, whichever worker ran it."""
+    runner_manager: RunnerManager = request.app.state.runner_manager
+    job = await runner_manager.get_job_store().get_status(session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found for session {session_id}.")
+    return job.model_dump()
+
+
+@api.get("/sessions/{user_id}/{session_id}")
+async def get_session(user_id: str, session_id: str, request: Request) -> dict[str, typing.Any]:
+    """Return the state and artifact names of a session, whichever worker ran it."""
+    runner_manager: RunnerManager = request.app.state.runner_manager
+    runner = await runner_manager.get_runner()
+    session = await runner.session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
+    artifact_keys = await runner.artifact_service.list_artifact_keys(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
+    return {
+        "session_id": session.id,
+        "user_id": session.user_id,
+        "last_update_time": session.last_update_time,
+        "state": session.state,
+        "artifacts": artifact_keys,
+    }
+
+
+@api.api_route("/artifacts/{token}", methods=["GET", "HEAD"], name="download_artifact")
+async def download_artifact(token: str, request: Request) -> Response:
+    """
+    Stream an artifact version published over the websocket, honouring Range, If-Range and If-None-Match.
+    """
+    try:
+        ref, expires_at = verify_artifact_token(token)
+    except InvalidArtifactToken as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+    runner_manager: RunnerManager = request.app.state.runner_manager
+    runner = await runner_manager.get_runner()
+    content = await load_artifact_content(
+        runner.artifact_service, APP_NAME, ref.user_id, ref.session_id, ref.filename, ref.version
+    )
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Artifact {ref.filename} not found.")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": ref.etag,
+        "Cache-Control": f"private, max-age={max(int(expires_at - time.time()), 0)}, immutable",
+        "Content-Disposition": f'inline; filename="{ref.filename}"',
+    }
+    if etag_matches(request.headers.get("if-none-match"), ref.etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or etag_matches(if_range, ref.etag):
+        try:
+            byte_range = parse_range_header(request.headers.get("range"), content.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{content.size}"})
+
+    status_code = 200
+    start, end = 0, content.size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{content.size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=content.mime_type)
+    return StreamingResponse(
+        content.iter_range(start, end), status_code=status_code, headers=headers, media_type=content.mime_type
+    )
+
+
 @api.websocket("/ws")
 async def websocket_receiver(websocket: WebSocket):
     """WebSocket endpoint for real-time interaction."""
     client_info = f"{websocket.client.host}:{websocket.client.port}"
     logger.info(f"🌐 WebSocket connection from {client_info}")
     await websocket.accept()
+    websocket_connections.inc()
 
-    await websocket.send_json({
-        "event": "log",
-        "data": "WebSocket connection established. You can now send data."
-    })
+    # Messages go through a bounded queue drained by its own task, so a slow client never stalls the agents
+    outbox = OutboundQueue.from_env(websocket)
+    outbox.start()
+    await outbox.send("log", "WebSocket connection established. You can now send data.")
 
+    # Designs run as tasks keyed by session id, so a connection can run several and cancel any of them
+    designs: dict[str, asyncio.Task] = {}
     try:
         while True:
             message = await websocket.receive_json()
@@ -72,41 +214,43 @@ async def websocket_receiver(websocket: WebSocket):
 
             logger.info(f"📥 Event '{event_type}' from {client_info}: {data}")
 
+            if event_type == "cancel_design":
+                session_id = data.get("session_id")
+                task = designs.get(session_id)
+                if task is None:
+                    await outbox.send("error", f"No design is running for session {session_id}.", session_id=session_id)
+                    continue
+                logger.info(f"🛑 Cancelling session {session_id}")
+                task.cancel()
+                continue
+
             if event_type != "start_design":
-                await websocket.send_json({"event": "error", "data": "Unknown event type."})
+                await outbox.send("error", "Unknown event type.")
                 continue
 
             prompt = data.get("prompt")
             if not prompt:
-                await websocket.send_json({
-                    "event": "error",
-                    "data": "No prompt provided to start the session."
-                })
+                await outbox.send("error", "No prompt provided to start the session.")
                 continue
 
             user_id = data.get("user_id", str(uuid.uuid4()))
             session_id = data.get("session_id", str(uuid.uuid4()))
-            logger.info(f"🧵 Starting session {session_id} for user {user_id}")
+            if session_id in designs:
+                await outbox.send("error", f"A design is already running for session {session_id}.", session_id=session_id)
+                continue
 
-            runner = await create_adk_session(root_agent, user_id, session_id)
-            user_content = types.Content(role="user", parts=[types.Part(text=prompt)])
+            deadline_seconds = data.get("deadline_seconds")
+            if deadline_seconds is not None and (isinstance(deadline_seconds, bool) or not isinstance(deadline_seconds, (int, float))):
+                await outbox.send("error", "deadline_seconds must be a number.", session_id=session_id)
+                continue
 
-            try:
-                async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_content):
-                    await handle_event(event, websocket)
-
-                    if event.is_final_response():
-                        logger.info(f"✅ Final response for session {session_id}")
-                        await send_artifacts(runner, user_id, session_id, websocket)
-                        await send_state(runner, user_id, session_id, websocket)
-                        break
-            except Exception as e:
-                logger.error(f"❌ Error during session run: {e}")
-                logger.debug(traceback.format_exc())
-                await websocket.send_json({
-                    "event": "error",
-                    "data": f"An error occurred during session: {str(e)}"
-                })
+            logger.info(f"🧵 Starting session {session_id} for user {user_id}")
+            task = asyncio.create_task(run_design(
+                websocket.app.state.runner_manager, outbox, user_id, session_id, prompt,
+                unique=bool(data.get("unique")), deadline_seconds=deadline_seconds,
+            ))
+            designs[session_id] = task
+            task.add_done_callback(lambda _, session_id=session_id: designs.pop(session_id, None))
 
     except WebSocketDisconnect:
         logger.info(f"🔌 WebSocket disconnected: {client_info}")
@@ -114,10 +258,125 @@ async def websocket_receiver(websocket: WebSocket):
         logger.error(f"❗ Unexpected WebSocket error from {client_info}: {e}")
         logger.debug(traceback.format_exc())
         await websocket.close(code=1011, reason="Internal server error")
-
-
-async def handle_event(event: ADKEvent, websocket: WebSocket) -> None:
-    """Send structured event data to WebSocket based on ADK event."""
+    finally:
+        # Abandoned designs would keep consuming quota, so they are cancelled with the connection
+        pending = list(designs.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await outbox.close()
+        websocket_connections.dec()
+
+
+async def run_design(
+    runner_manager: RunnerManager,
+    outbox: OutboundQueue,
+    user_id: str,
+    session_id: str,
+    prompt: str,
+    unique: bool = False,
+    deadline_seconds: typing.Optional[float] = None,
+) -> None:
+    """
+    Run one design session and stream its events, artifacts and final state to the client.
+
+    Unless `unique` is set, retrieval and media generation are shared with concurrent designs
+    that have the same prompt. With a deadline (`deadline_seconds`, or DESIGN_DEADLINE_SECONDS),
+    stages that cannot finish in time are skipped where DEGRADABLE_STAGES allows it and reported
+    in the state under "degraded_stages"; the design is stopped if it is still running
+    DESIGN_DEADLINE_GRACE_SECONDS after its deadline.
+    """
+
+    async def report_queue(status: QueueStatus) -> None:
+        await outbox.send("queue", asdict(status), session_id=session_id)
+        if status.stage == "pipeline":
+            await runner_manager.set_job_status(
+                user_id, session_id, "queued",
+                position=status.position, estimated_wait_seconds=status.estimated_wait_seconds,
+            )
+
+    # Every stage this design waits for (pipeline, BigQuery, Imagen, Veo) reports its queue position to the client
+    queue_reporter.set(report_queue)
+    single_flight_enabled.set(not unique)
+    # Agent, model and tool callbacks and direct Gemini calls account their cost to this design
+    usage = UsageLedger()
+    current_usage.set(usage)
+    # Stage timeouts are bounded by the time left before this design's deadline
+    budget = DesignBudget(get_design_deadline_seconds(deadline_seconds))
+    current_budget.set(budget)
+    await runner_manager.set_job_status(user_id, session_id, "queued")
+    designs_in_flight.inc()
+    started_at = time.perf_counter()
+    status = "failed"
+    # One trace per design: ADK agent, LLM and tool spans and the pipeline stage spans all nest under it
+    with start_span("design", {"session.id": session_id, "user.id": user_id, "design.unique": unique}):
+        try:
+            async with admission_slot("pipeline"):
+                runner = await runner_manager.get_runner()
+                await runner_manager.get_or_create_session(user_id, session_id)
+                user_content = build_user_content(prompt)
+
+                await runner_manager.set_job_status(user_id, session_id, "running", trace_id=current_trace_id())
+                final_response = False
+                remaining = budget.remaining()
+                hard_limit = remaining + DESIGN_DEADLINE_GRACE_SECONDS if remaining is not None else None
+                # The run is drained rather than left at the final response, so every agent finishes and is accounted
+                async with asyncio.timeout(hard_limit):
+                    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_content):
+                        await handle_event(event, outbox, session_id)
+                        if event.is_final_response():
+                            logger.info(f"✅ Final response for session {session_id}")
+                            final_response = True
+
+                usage_totals = usage.to_dict()
+                degraded = budget.to_dict()
+                logger.info(f"🧮 Usage for session {session_id}: {usage_totals['totals']}")
+                await runner_manager.record_state(
+                    user_id, session_id, {USAGE_STATE_KEY: usage_totals, DEGRADED_STATE_KEY: degraded}
+                )
+                if final_response:
+                    async with timed("artifact_send"):
+                        await send_artifacts(runner, user_id, session_id, outbox)
+                    await send_state(runner, user_id, session_id, outbox)
+            status = "completed"
+            await runner_manager.set_job_status(user_id, session_id, "completed", degraded=sorted(degraded) or None)
+        except asyncio.CancelledError:
+            status = "cancelled"
+            logger.info(f"🛑 Session {session_id} cancelled")
+            await runner_manager.set_job_status(user_id, session_id, "cancelled")
+            try:
+                await outbox.send("design_cancelled", {"session_id": session_id}, session_id=session_id)
+            except WebSocketDisconnect:
+                pass
+            raise
+        except WebSocketDisconnect:
+            await runner_manager.set_job_status(user_id, session_id, "failed", error="Client disconnected")
+        except TimeoutError as e:
+            # The hard stop after the deadline, or a stage that ran out of time and may not be degraded
+            error = f"The design did not finish before its deadline: {e}" if str(e) else "The design did not finish before its deadline."
+            logger.warning(f"⏱️ Session {session_id} ran out of time: {error}")
+            await runner_manager.set_job_status(user_id, session_id, "failed", error=error)
+            try:
+                await outbox.send("error", error, session_id=session_id)
+            except WebSocketDisconnect:
+                pass
+        except Exception as e:
+            await runner_manager.set_job_status(user_id, session_id, "failed", error=str(e))
+            logger.error(f"❌ Error during session run: {e}")
+            logger.debug(traceback.format_exc())
+            try:
+                await outbox.send("error", f"An error occurred during session: {str(e)}", session_id=session_id)
+            except WebSocketDisconnect:
+                pass
+        finally:
+            set_span_attributes({"design.status": status})
+            designs_in_flight.dec()
+            designs_finished.inc(status=status)
+            observe_stage("design", time.perf_counter() - started_at, {"completed": "ok", "failed": "error"}.get(status, status))
+
+
+async def handle_event(event: ADKEvent, outbox: OutboundQueue, session_id: typing.Optional[str] = None) -> None:
+    """Queue structured event data for the WebSocket based on ADK event."""
     if not event.content or not event.content.parts:
         return
 
@@ -127,20 +386,15 @@ async def handle_event(event: ADKEvent, websocket: WebSocket) -> None:
 
     if part.function_call:
         logger.info(f"🔧 Function call: {part.function_call.name}")
-        await websocket.send_json({
-            "event": "function_call",
-            "data": {**payload, "function_name": part.function_call.name, "arguments": part.function_call.args}
-        })
+        await outbox.send("function_call", {
+            **payload, "function_name": part.function_call.name, "arguments": part.function_call.args
+        }, session_id=session_id)
     elif part.function_response:
-        await websocket.send_json({
-            "event": "function_response",
-            "data": {**payload, "function_name": part.function_response.name, "response": part.function_response.response}
-        })
+        await outbox.send("function_response", {
+            **payload, "function_name": part.function_response.name, "response": part.function_response.response
+        }, session_id=session_id)
     elif part.text:
-        await websocket.send_json({
-            "event": "text_response",
-            "data": {**payload, "text": part.text}
-        })
+        await outbox.send("text_response", {**payload, "text": part.text}, session_id=session_id)
 
 
 # async def send_artifacts(
@@ -169,12 +423,12 @@ async def handle_event(event: ADKEvent, websocket: WebSocket) -> None:
 #             }
 #         })
 async def send_artifacts(
-    runner: InMemoryRunner,
+    runner: Runner,
     user_id: str,
     session_id: str,
-    websocket: WebSocket
+    outbox: OutboundQueue
 ) -> None:
-    """Send all artifacts generated in a session to the WebSocket in a defined order, including section names."""
+    """Queue metadata of all artifacts generated in a session for the WebSocket in a defined order, including section names."""
     artifact_keys = await runner.artifact_service.list_artifact_keys(
         app_name=APP_NAME, user_id=user_id, session_id=session_id
     )
@@ -193,38 +447,41 @@ async def send_artifacts(
     final_keys = ordered_keys + extras
 
     for key in final_keys:
-        artifact = await runner.artifact_service.load_artifact(
-            app_name=APP_NAME, user_id=user_id, session_id=session_id, filename=key
-        )
-        logger.info(f"📦 Sending artifact: {key} ({artifact.inline_data.mime_type})")
-        encoded = base64.b64encode(artifact.inline_data.data).decode("utf-8")
-        await websocket.send_json({
-            "event": "artifact",
-            "data": {
-                "filename": key,
-                "mime_type": artifact.inline_data.mime_type,
-                "section_name": artifact_sections.get(key, key),  # fallback to filename if not mapped
-                "content": encoded
-            }
-        })
-
+        # Only metadata goes over the socket; the browser fetches the bytes from a short-lived download URL
+        content = await load_artifact_content(runner.artifact_service, APP_NAME, user_id, session_id, key)
+        if content is None:
+            continue
+        ref = ArtifactRef(user_id=user_id, session_id=session_id, filename=key, version=content.version)
+        url = outbox.websocket.url_for("download_artifact", token=sign_artifact_token(ref))
+        url = url.replace(scheme="https" if url.scheme == "wss" else "http")
+        logger.info(f"📦 Sending artifact: {key} ({content.mime_type}, {content.size} bytes)")
+        data = {
+            "filename": key,
+            "mime_type": content.mime_type,
+            "section_name": artifact_sections.get(key, key),  # fallback to filename if not mapped
+            "version": content.version,
+            "size": content.size,
+            "etag": ref.etag,
+            "url": str(url),
+        }
+        if content.mime_type == "text/csv" and content.size <= INLINE_CSV_MAX_BYTES:
+            chunks = [chunk async for chunk in content.iter_range(0, content.size - 1)]
+            data["content"] = base64.b64encode(b"".join(chunks)).decode("utf-8")
+        await outbox.send("artifact", data, session_id=session_id)
 
 
 async def send_state(
-    runner: InMemoryRunner,
+    runner: Runner,
     user_id: str,
     session_id: str,
-    websocket: WebSocket
+    outbox: OutboundQueue
 ) -> None:
-    """Send the current state of the session to the WebSocket."""
+    """Queue the current state of the session for the WebSocket."""
     session = await runner.session_service.get_session(
         app_name=APP_NAME, user_id=user_id, session_id=session_id
     )
     state = session.state if session else {}
     logger.info(f"📊 Sending session state for {session_id}: {state}")
-    await websocket.send_json({
-        "event": "state",
-        "data": state
-    })
+    await outbox.send("state", state, session_id=session_id)
 
 
@@ -27,7 +27,9 @@ async def lifespan(app: FastAPI):
     """
     logger.info("app is starting")
     mount_apps(app)
-    yield
+    # Mounted sub-apps don't receive lifespan events, so the API lifespan runs inside this one
+    async with api.router.lifespan_context(api):
+        yield
     logger.info("app is shutting down")
 
 
@@ -0,0 +1,248 @@
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+import typing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+DEFAULT_ARTIFACT_URL_TTL_SECONDS = 15 * 60
+DEFAULT_STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ArtifactRef:
+    """
+    Identifies one immutable version of a session artifact.
+    """
+    user_id: str
+    session_id: str
+    filename: str
+    version: int
+
+    @property
+    def etag(self) -> str:
+        # Artifact versions never change once saved, so their identity is a strong validator
+        digest = hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode("utf-8")).hexdigest()
+        return f'"{digest[:32]}"'
+
+
+class InvalidArtifactToken(ValueError):
+    """Raised when an artifact token is malformed, forged or expired."""
+
+
+@functools.lru_cache(maxsize=1)
+def get_artifact_url_secret() -> bytes:
+    """
+    Return the key used to sign artifact URLs.
+
+    ARTIFACT_URL_SECRET takes precedence; otherwise a key is generated once and kept under STORE_FOLDER,
+    so every worker on the host accepts URLs signed by the others.
+    """
+    secret = os.getenv("ARTIFACT_URL_SECRET", "").strip()
+    if secret:
+        return secret.encode("utf-8")
+
+    store_folder = Path(os.getenv("STORE_FOLDER", ".data"))
+    store_folder.mkdir(parents=True, exist_ok=True)
+    secret_path = store_folder / "artifact_url.secret"
+    try:
+        with open(secret_path, "x") as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    return secret_path.read_text().strip().encode("utf-8")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign_artifact_token(ref: ArtifactRef, ttl_seconds: typing.Optional[float] = None) -> str:
+    """
+    Create a short-lived token granting read access to one artifact version.
+
+    Args:
+        ref (ArtifactRef): The artifact version to grant access to.
+        ttl_seconds (Optional[float]): Token lifetime; defaults to ARTIFACT_URL_TTL_SECONDS.
+
+    Returns:
+        str: A URL-safe token.
+    """
+    if ttl_seconds is None:
+        ttl_seconds = float(os.getenv("ARTIFACT_URL_TTL_SECONDS", DEFAULT_ARTIFACT_URL_TTL_SECONDS))
+    payload = _b64encode(json.dumps({**asdict(ref), "exp": int(time.time() + ttl_seconds)}).encode("utf-8"))
+    signature = _b64encode(hmac.new(get_artifact_url_secret(), payload.encode("ascii"), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+
+def verify_artifact_token(token: str) -> tuple[ArtifactRef, int]:
+    """
+    Check an artifact token's signature and expiry.
+
+    Args:
+        token (str): Token created by `sign_artifact_token`.
+
+    Returns:
+        tuple[ArtifactRef, int]: The artifact version the token grants access to and its expiry time.
+
+    Raises:
+        InvalidArtifactToken: If the token is malformed, its signature does not match or it has expired.
+    """
+    try:
+        payload, signature = token.split(".")
+        expected = hmac.new(get_artifact_url_secret(), payload.encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(_b64decode(signature), expected):
+            raise InvalidArtifactToken("Invalid artifact token signature.")
+        claims = json.loads(_b64decode(payload))
+        expires_at = int(claims.pop("exp"))
+        ref = ArtifactRef(**claims)
+    except InvalidArtifactToken:
+        raise
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidArtifactToken("Malformed artifact token.") from e
+    if expires_at < time.time():
+        raise InvalidArtifactToken("Artifact token has expired.")
+    return ref, expires_at
+
+
+def parse_range_header(range_header: typing.Optional[str], size: int) -> typing.Optional[tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header.
+
+    Args:
+        range_header (Optional[str]): Value of the Range header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-500".
+        size (int): Size of the full content in bytes.
+
+    Returns:
+        Optional[tuple[int, int]]: Inclusive (start, end) offsets, or None to serve the full content
+        (no header, a non-byte unit, or several ranges, which servers may ignore).
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    if not range_header:
+        return None
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    start_text, _, end_text = ranges.strip().partition("-")
+    try:
+        if not start_text:
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(start_text)
+            end = min(int(end_text), size - 1) if end_text else size - 1
+    except ValueError:
+        raise ValueError(f"Invalid range: {range_header}")
+    if start > end or start >= size:
+        raise ValueError(f"Range not satisfiable: {range_header}")
+    return start, end
+
+
+def etag_matches(header: typing.Optional[str], etag: str) -> bool:
+    """Return True if an If-None-Match or If-Range header matches the ETag (weak comparison)."""
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def iter_bytes(data: bytes, start: int, end: int, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> typing.AsyncIterator[bytes]:
+    """Yield data[start:end + 1] in chunks without copying the whole slice."""
+    view = memoryview(data)
+    for offset in range(start, end + 1, chunk_size):
+        yield bytes(view[offset:min(offset + chunk_size, end + 1)])
+
+
+async def iter_file(path: Path, start: int, end: int, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> typing.AsyncIterator[bytes]:
+    """Yield bytes start..end (inclusive) of a file in chunks."""
+    import aiofiles
+
+    remaining = end - start + 1
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@dataclass
+class ArtifactContent:
+    """
+    One artifact version ready to be served, either from a file on disk or from memory.
+    """
+    version: int
+    mime_type: str
+    size: int
+    path: typing.Optional[Path] = None
+    data: typing.Optional[bytes] = None
+
+    def iter_range(self, start: int, end: int) -> typing.AsyncIterator[bytes]:
+        """Stream bytes start..end (inclusive) of the artifact."""
+        if self.path is not None:
+            return iter_file(self.path, start, end)
+        return iter_bytes(self.data, start, end)
+
+
+async def load_artifact_content(
+    artifact_service: typing.Any,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    filename: str,
+    version: typing.Optional[int] = None,
+) -> typing.Optional[ArtifactContent]:
+    """
+    Resolve an artifact version for serving, without loading it when the service stores it on disk.
+
+    Args:
+        artifact_service (BaseArtifactService): The runner's artifact service.
+        app_name (str): Application name.
+        user_id (str): Owner of the artifact.
+        session_id (str): Session the artifact belongs to.
+        filename (str): Artifact name.
+        version (Optional[int]): Version to resolve; defaults to the latest.
+
+    Returns:
+        Optional[ArtifactContent]: The artifact version, or None if it does not exist.
+    """
+    if hasattr(artifact_service, "locate_artifact"):
+        location = await artifact_service.locate_artifact(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename, version=version
+        )
+        if location is None:
+            return None
+        return ArtifactContent(location.version, location.mime_type, location.size, path=location.path)
+
+    if version is None:
+        versions = await artifact_service.list_versions(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        if not versions:
+            return None
+        version = max(versions)
+    artifact = await artifact_service.load_artifact(
+        app_name=app_name, user_id=user_id, session_id=session_id, filename=filename, version=version
+    )
+    if artifact is None:
+        return None
+    if artifact.inline_data:
+        data, mime_type = artifact.inline_data.data, artifact.inline_data.mime_type
+    else:
+        data, mime_type = (artifact.text or "").encode("utf-8"), "text/plain"
+    return ArtifactContent(version, mime_type, len(data), data=data)
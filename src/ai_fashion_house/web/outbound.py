@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import typing
+import weakref
+from collections import deque
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ai_fashion_house.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger("AI-Fashion-API")
+
+DEFAULT_SEND_QUEUE_SIZE = 256
+DEFAULT_SEND_QUEUE_POLICY = "coalesce"
+DEFAULT_DRAIN_TIMEOUT_SECONDS = 10.0
+
+# Messages that can be dropped when the client cannot keep up; everything else, including the function calls
+# and responses shown in the agent log, is always delivered
+DROPPABLE_EVENTS = {"log"}
+SEND_QUEUE_POLICIES = ("block", "drop_logs", "coalesce")
+
+send_queue_shed = get_metrics_registry().counter(
+    "ws_messages_shed_total", "Websocket messages dropped or merged because a client fell behind.", ("event", "action")
+)
+send_queue_depth = get_metrics_registry().gauge("ws_send_queue_messages", "Messages waiting in websocket send queues.")
+send_queues = get_metrics_registry().gauge("ws_send_queues", "Open websocket send queues.")
+_open_queues: "weakref.WeakSet[OutboundQueue]" = weakref.WeakSet()
+
+
+class OutboundQueue:
+    """
+    Bounded per-connection queue of outgoing websocket messages, drained by a dedicated sender task
+    so agent runs never wait on the client's bandwidth.
+
+    When the queue is full, the policy decides what happens to a new message:
+        - "block": wait for room (the agent run is throttled by the client, as with inline sends).
+        - "drop_logs": drop log messages; wait for room for anything else.
+        - "coalesce": as "drop_logs", and also merge intermediate text responses into the pending
+          text response of the same author.
+    """
+
+    def __init__(self, websocket: WebSocket, max_size: int = DEFAULT_SEND_QUEUE_SIZE, policy: str = DEFAULT_SEND_QUEUE_POLICY):
+        if policy not in SEND_QUEUE_POLICIES:
+            raise ValueError(f"Unsupported send queue policy '{policy}'; expected one of {SEND_QUEUE_POLICIES}.")
+        self.websocket = websocket
+        self.max_size = max_size
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        self._messages: deque[dict[str, typing.Any]] = deque()
+        self._changed = asyncio.Condition()
+        self._closed = False
+        self._error: typing.Optional[BaseException] = None
+        self._sender: typing.Optional[asyncio.Task] = None
+        _open_queues.add(self)
+
+    @classmethod
+    def from_env(cls, websocket: WebSocket) -> "OutboundQueue":
+        """Create a queue configured by WS_SEND_QUEUE_SIZE and WS_SEND_QUEUE_POLICY."""
+        return cls(
+            websocket,
+            max_size=int(os.getenv("WS_SEND_QUEUE_SIZE", DEFAULT_SEND_QUEUE_SIZE)),
+            policy=os.getenv("WS_SEND_QUEUE_POLICY", DEFAULT_SEND_QUEUE_POLICY).strip().lower(),
+        )
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def start(self) -> None:
+        """Start the sender task."""
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._run_sender())
+
+    async def send(self, event: str, data: typing.Any, session_id: typing.Optional[str] = None) -> None:
+        """
+        Queue a message for the client.
+
+        Args:
+            event (str): Event name, e.g. "text_response" or "artifact".
+            data (Any): JSON-serializable payload.
+            session_id (Optional[str]): Design the message belongs to, so clients can tell concurrent runs apart.
+
+        Raises:
+            WebSocketDisconnect: If the client has gone away, so callers stop producing messages for it.
+        """
+        message = {"event": event, "data": data}
+        if session_id is not None:
+            message["session_id"] = session_id
+        async with self._changed:
+            self._raise_if_closed()
+            if len(self._messages) >= self.max_size:
+                if self.policy != "block" and event in DROPPABLE_EVENTS:
+                    self.dropped += 1
+                    send_queue_shed.inc(event=event, action="dropped")
+                    return
+                if self.policy == "coalesce" and self._coalesce(message):
+                    self.coalesced += 1
+                    send_queue_shed.inc(event=event, action="coalesced")
+                    return
+                await self._changed.wait_for(lambda: len(self._messages) < self.max_size or self._closed)
+                self._raise_if_closed()
+            self._messages.append(message)
+            self._changed.notify_all()
+
+    def _coalesce(self, message: dict[str, typing.Any]) -> bool:
+        data = message["data"]
+        if message["event"] != "text_response" or not isinstance(data, dict) or data.get("is_final"):
+            return False
+        for pending in reversed(self._messages):
+            pending_data = pending["data"]
+            if (
+                pending["event"] == "text_response"
+                and not pending_data.get("is_final")
+                and pending.get("session_id") == message.get("session_id")
+                and pending_data.get("author") == data.get("author")
+            ):
+                pending["data"] = {**pending_data, "text": f"{pending_data['text']}\n{data['text']}"}
+                return True
+        return False
+
+    def _raise_if_closed(self) -> None:
+        if self._closed:
+            raise WebSocketDisconnect(code=1006, reason=str(self._error) if self._error else "Connection closed")
+
+    async def _run_sender(self) -> None:
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: self._messages or self._closed)
+                    if not self._messages:
+                        return
+                    message = self._messages.popleft()
+                    self._changed.notify_all()
+                await self.websocket.send_json(message)
+        except Exception as e:
+            logger.info(f"🔌 Stopped sending to client: {e}")
+            async with self._changed:
+                self._error = e
+                self._closed = True
+                self._messages.clear()
+                self._changed.notify_all()
+
+    async def close(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT_SECONDS) -> None:
+        """
+        Stop accepting messages and give the sender a chance to deliver what is already queued.
+
+        Args:
+            drain_timeout (float): Seconds to wait for queued messages before they are discarded.
+        """
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        _open_queues.discard(self)
+        if self._sender is not None:
+            try:
+                await asyncio.wait_for(self._sender, timeout=drain_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+        if self.dropped or self.coalesced:
+            logger.info(f"📉 Send queue dropped {self.dropped} and coalesced {self.coalesced} messages for a slow client")
+
+
+def _collect_send_queue_metrics() -> None:
+    queues = list(_open_queues)
+    send_queues.set(len(queues))
+    send_queue_depth.set(sum(len(queue) for queue in queues))
+
+
+get_metrics_registry().add_collector(_collect_send_queue_metrics)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+    from google.adk.runners import Runner
+    from google.adk.sessions import Session
+    from ai_fashion_house.utils.job_store import BaseJobStore
+
+logger = logging.getLogger("AI-Fashion-API")
+
+
+ORCHESTRATOR_MODES = ("llm", "workflow", "pipelined")
+
+
+def get_orchestrator_mode() -> str:
+    """
+    Return the orchestrator selected by ORCHESTRATOR_MODE.
+
+    "llm" (default) lets the marketing agent decide each step; "workflow" runs the same steps as a fixed pipeline
+    of ADK workflow agents and plain tool calls, using the LLM only to write the prompt and the post; "pipelined"
+    is the workflow with the post written while the video renders.
+
+    Raises:
+        ValueError: If ORCHESTRATOR_MODE names an unsupported mode.
+    """
+    mode = os.getenv("ORCHESTRATOR_MODE", "llm").strip().lower() or "llm"
+    if mode not in ORCHESTRATOR_MODES:
+        raise ValueError(f"Unsupported ORCHESTRATOR_MODE '{mode}'; expected one of {ORCHESTRATOR_MODES}.")
+    return mode
+
+
+@functools.lru_cache(maxsize=1)
+def load_root_agent() -> BaseAgent:
+    """Import the agent graph on first use, so workers start without loading the ADK and cloud SDKs."""
+    started_at = time.perf_counter()
+    mode = get_orchestrator_mode()
+    if mode == "workflow":
+        from ai_fashion_house.agents.marketing_workflow.agent import root_agent
+    elif mode == "pipelined":
+        from ai_fashion_house.agents.marketing_workflow.agent import create_root_agent
+
+        root_agent = create_root_agent(pipelined=True)
+    else:
+        from ai_fashion_house.agents.marketing_agent.agent import root_agent
+    from ai_fashion_house.utils.llm_cache import cache_agent_tree
+    from ai_fashion_house.utils.metrics import instrument_agent_tree
+    from ai_fashion_house.utils.tracing import trace_agent_tree
+
+    # Attached first, so the observer callbacks below run before a turn is served from the cache
+    cache_agent_tree(root_agent)
+    # Every agent and tool of the graph reports its latency to /metrics and annotates its spans
+    instrument_agent_tree(root_agent)
+    trace_agent_tree(root_agent)
+    logger.info(f"🧩 Loaded {mode} agent graph in {time.perf_counter() - started_at:.2f}s")
+    return root_agent
+
+
+class RunnerManager:
+    """
+    Owns the single ADK runner of a worker process, so every websocket message and connection
+    shares the same session and artifact services.
+    """
+
+    def __init__(self, app_name: str):
+        self.app_name = app_name
+        self._runner: typing.Optional[Runner] = None
+        self._job_store: typing.Optional[BaseJobStore] = None
+        self._lock = asyncio.Lock()
+
+    async def get_runner(self) -> Runner:
+        """Return the shared runner, building it (and importing the agent graph) on first use."""
+        if self._runner is None:
+            async with self._lock:
+                if self._runner is None:
+                    from google.adk.runners import Runner
+                    from ai_fashion_house.utils.adk_services import create_artifact_service, create_session_service
+
+                    root_agent = await asyncio.to_thread(load_root_agent)
+                    self._runner = Runner(
+                        agent=root_agent,
+                        app_name=self.app_name,
+                        session_service=create_session_service(),
+                        artifact_service=create_artifact_service(),
+                    )
+                    logger.info(f"🏃 Created shared runner for app {self.app_name}")
+        return self._runner
+
+    def get_job_store(self) -> BaseJobStore:
+        """Return the job status store shared with the other workers, built on first use."""
+        if self._job_store is None:
+            from ai_fashion_house.utils.adk_services import create_job_store
+
+            self._job_store = create_job_store()
+        return self._job_store
+
+    async def set_job_status(self, user_id: str, session_id: str, status: str, **detail: typing.Any) -> None:
+        """Record the status of a design run; failures are logged so they never interrupt the run itself."""
+        from ai_fashion_house.utils.job_store import JobStatus
+
+        detail = {key: value for key, value in detail.items() if value is not None}
+        try:
+            await self.get_job_store().set_status(
+                JobStatus(session_id=session_id, user_id=user_id, status=status, detail=detail or None)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not record status '{status}' for session {session_id}: {e}")
+
+    async def record_state(self, user_id: str, session_id: str, state_delta: dict[str, typing.Any]) -> None:
+        """
+        Store values computed outside the agents, such as usage totals, in a session's state; failures are logged
+        so they never fail the run.
+        """
+        from google.adk.events import Event, EventActions
+
+        try:
+            runner = await self.get_runner()
+            session = await runner.session_service.get_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+            if session is not None:
+                await runner.session_service.append_event(
+                    session, Event(author="system", actions=EventActions(state_delta=state_delta))
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not record state for session {session_id}: {e}")
+
+    async def get_or_create_session(self, user_id: str, session_id: str) -> Session:
+        """Return an existing session for the user, or create it on the shared runner."""
+        runner = await self.get_runner()
+        session = await runner.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            session = await runner.session_service.create_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+        return session
@@ -69,14 +69,16 @@ const customTheme = createTheme({
 export default function App() {
 
   const queryClient = useQueryClient();
-  const { lastJsonMessage } = useWebSocketContext();
+  const { lastJsonMessage, sessionIdRef } = useWebSocketContext();
 
   // --- Update logs when WebSocket sends a message
   useEffect(() => {
     if (!lastJsonMessage) return;
 
-    const { event, data } = lastJsonMessage;
+    const { event, data, session_id } = lastJsonMessage;
     console.log('Received WebSocket message:', lastJsonMessage);
+    // Ignore messages from earlier designs that are still winding down
+    if (session_id && session_id !== sessionIdRef.current) return;
 
     if (['function_call', 'function_response', 'text_response'].includes(event)) {
       queryClient.setQueryData(['agentLogs'], (prev = []) => [...prev, { event, data }]);
@@ -89,7 +91,7 @@ export default function App() {
       // reset the state query data
       queryClient.setQueryData(['agentState'], (prev = {}) => ({ ...prev, ...data }));
     }
-  }, [lastJsonMessage, queryClient]);
+  }, [lastJsonMessage, queryClient, sessionIdRef]);
 
 
 
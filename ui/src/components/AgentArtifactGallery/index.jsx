@@ -1,4 +1,4 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect } from 'react';
 import {
   Accordion,
   AccordionSummary,
@@ -37,12 +37,10 @@ export default function AgentArtifactGallery({ artifacts }) {
   const [open, setOpen] = useState(false);
   const [selectedItem, setSelectedItem] = useState(null);
 
-  const getMediaSource = (item) => {
-    if (item.content && item.mime_type) {
-      return `data:${item.mime_type};base64,${item.content}`;
-    }
-    return item.url;
-  };
+  const [parsedCsv, setParsedCsv] = useState(null);
+
+  // Artifacts are served over HTTP, so media can load in parallel and videos can seek with range requests
+  const getMediaSource = (item) => item.url;
 
   const handleOpen = (item) => {
     setSelectedItem(item);
@@ -62,21 +60,29 @@ export default function AgentArtifactGallery({ artifacts }) {
     return null;
   };
 
-  const parsedCsv = useMemo(() => {
-    if (selectedItem?.mime_type === 'text/csv' && selectedItem.content) {
-      try {
-        const csvString = atob(selectedItem.content);
+  useEffect(() => {
+    setParsedCsv(null);
+    if (selectedItem?.mime_type !== 'text/csv' || !selectedItem.url) return;
+
+    const controller = new AbortController();
+    fetch(selectedItem.url, { signal: controller.signal })
+      .then((response) => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.text();
+      })
+      .then((csvString) => {
         const result = Papa.parse(csvString, {
           header: true,
           skipEmptyLines: true,
         });
-        return result.data;
-      } catch (err) {
-        console.error('Error parsing CSV with PapaParse:', err);
-        return null;
-      }
-    }
-    return null;
+        setParsedCsv(result.data);
+      })
+      .catch((err) => {
+        if (err.name !== 'AbortError') {
+          console.error('Error loading CSV artifact:', err);
+        }
+      });
+    return () => controller.abort();
   }, [selectedItem]);
 
   // Group artifacts by section_name
@@ -127,6 +133,7 @@ export default function AgentArtifactGallery({ artifacts }) {
                         <video
                           src={getMediaSource(item)}
                           controls={false}
+                          preload="metadata"
                           style={{
                             width: '100%',
                             objectFit: 'contain',
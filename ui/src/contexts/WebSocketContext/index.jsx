@@ -1,6 +1,6 @@
 // contexts/WebSocketContext.js
 "use client";
-import React, {createContext, useContext} from "react";
+import React, {createContext, useContext, useRef} from "react";
 import useWebSocket, {ReadyState} from "react-use-websocket";
 
 const WS_URL = `ws://localhost:8080/api/ws`;
@@ -15,9 +15,11 @@ export const WebSocketProvider = ({children}) => {
         share: true, // important: share connection across components
         shouldReconnect: () => true,
     });
+    // Session of the design the page shows; messages of other designs still winding down are ignored
+    const sessionIdRef = useRef(null);
 
     return (
-        <WebSocketContext.Provider value={{sendJsonMessage, lastJsonMessage, readyState}}>
+        <WebSocketContext.Provider value={{sendJsonMessage, lastJsonMessage, readyState, sessionIdRef}}>
             {children}
         </WebSocketContext.Provider>
     );
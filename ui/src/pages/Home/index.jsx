@@ -23,10 +23,11 @@ import StateViewer from "../../components/StateViewer/index.jsx";
 
 export default function HomePage() {
   const queryClient = useQueryClient();
-  const { sendJsonMessage, lastJsonMessage, readyState } = useWebSocketContext();
+  const { sendJsonMessage, lastJsonMessage, readyState, sessionIdRef } = useWebSocketContext();
 
   const [loading, setLoading] = useState(false);
   const [tab, setTab] = useState(0);
+  const [queueStatus, setQueueStatus] = useState(null);
 
   const initialPrompt =
     'I’m looking for inspiration for a red Victorian dress with lace and floral patterns, suitable for a royal ball in the 1800s.';
@@ -74,10 +75,20 @@ export default function HomePage() {
   // Handle WebSocket messages
   useEffect(() => {
     if (!lastJsonMessage) return;
-    const { event, data } = lastJsonMessage;
+    const { event, data, session_id } = lastJsonMessage;
+    // Ignore messages from earlier designs that are still winding down
+    if (session_id && session_id !== sessionIdRef.current) return;
+    if (event === 'queue') {
+      setQueueStatus(data);
+      return;
+    }
+    setQueueStatus(null);
     if (['function_call', 'function_response', 'text_response'].includes(event)) {
       setLoading(!data?.is_final);
     }
+    if (['design_cancelled', 'error'].includes(event)) {
+      setLoading(false);
+    }
   }, [lastJsonMessage]);
 
   const isWsReady = useMemo(() => readyState === ReadyState.OPEN, [readyState]);
@@ -93,13 +104,23 @@ export default function HomePage() {
     queryClient.setQueryData(['agentState'], {});
     queryClient.setQueryData(['agentArtifacts'], []);
     setLoading(true);
+    setQueueStatus(null);
 
+    sessionIdRef.current = crypto.randomUUID();
     sendJsonMessage({
       event: 'start_design',
-      data: { prompt: inputValue },
+      data: { prompt: inputValue, session_id: sessionIdRef.current },
     });
   }, [inputValue, isWsReady, queryClient, sendJsonMessage, readyState]);
 
+  const handleCancel = useCallback(() => {
+    if (!isWsReady || !sessionIdRef.current) return;
+    sendJsonMessage({
+      event: 'cancel_design',
+      data: { session_id: sessionIdRef.current },
+    });
+  }, [isWsReady, sendJsonMessage]);
+
   return (
     <div style={{
           width: '100%',
@@ -161,8 +182,17 @@ export default function HomePage() {
               disabled={loading || !isWsReady}
               sx={{ py: 1.5, px: 4, minWidth: 200 }}
             >
-              {loading ? 'Agents are working...' : 'Start Design'}
+              {!loading
+                ? 'Start Design'
+                : queueStatus
+                  ? `Waiting for ${queueStatus.stage} (#${queueStatus.position}, ~${Math.ceil(queueStatus.estimated_wait_seconds)}s)`
+                  : 'Agents are working...'}
             </Button>
+            {loading && (
+              <Button variant="outlined" color="secondary" onClick={handleCancel} disabled={!isWsReady}>
+                Cancel
+              </Button>
+            )}
 
             {agentLogs.length > 0 && (
               <Box sx={{ width: '100%' }}>